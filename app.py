@@ -1,15 +1,32 @@
-from flask import Flask, render_template, jsonify, request, send_file, send_from_directory
+from flask import Flask, Request, current_app, render_template, jsonify, request, send_file, session, Response, \
+    stream_with_context
 from logging.config import dictConfig
+import click
+import functools
 import os
 import logging
 import sys
+from models.analysis_graph import AnalysisGraph, AnalysisSessionStore
+from models.charts import ChartBuilder
+from models.downloads import DownloadServer
+from models.exporter import Exporter
+from models.holding_period import HoldingPeriodAnalyzer
 from models.investment_calculator import InvestmentCalculator
+from models.inverse_solver import InverseSolver
+from models.listing_screener import ListingScreener
+from models.live_session import LiveSessionStore
 from models.loan_calculator import LoanCalculator
+from models import offload
+from models.offload import Offloader
+from models.scenario_store import ScenarioStore, db
+from models.single_flight import SingleFlight
 from models.rent_receipt import RentReceipt
+from models.validation import EXPORT_SCHEMAS, SCENARIO_QUERY, SCHEMAS, SCREEN, SOLVER_SCHEMAS, ValidationError
 
 # Configure logging
 dictConfig({
     'version': 1,
+    'disable_existing_loggers': False,  # Keep gunicorn's loggers when the app is loaded by it
     'formatters': {'default': {
         'format': '[%(asctime)s] %(levelname)s in %(module)s: %(message)s',
     }},
@@ -28,12 +45,126 @@ dictConfig({
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
+class AppRequest(Request):
+    """Request whose body size limit depends on the endpoint.
+
+    Streaming uploads are only bounded by MAX_UPLOAD_BYTES, since Werkzeug
+    spools them to disk and they are read chunk by chunk; every other body
+    is bounded by MAX_CONTENT_LENGTH.
+    """
+    STREAMING_ENDPOINTS = frozenset({'screen_listings'})
+
+    @property
+    def max_content_length(self):
+        if self.endpoint in self.STREAMING_ENDPOINTS:
+            return current_app.config['MAX_UPLOAD_BYTES'] or None
+        return super().max_content_length
+
 app = Flask(__name__)
+app.request_class = AppRequest
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///myre.db')
+# Request size limits: any body, then streamed listing CSV uploads (0 for none), then JSON bodies of regular
+# and batch endpoints. Listing files larger than MAX_UPLOAD_BYTES go through `flask screen-listings`.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 32 * 1024 * 1024))
+app.config['MAX_UPLOAD_BYTES'] = int(os.environ.get('MAX_UPLOAD_BYTES', 2 * 1024 * 1024 * 1024))
+app.config['MAX_JSON_BYTES'] = int(os.environ.get('MAX_JSON_BYTES', 256 * 1024))
+app.config['MAX_BATCH_JSON_BYTES'] = int(os.environ.get('MAX_BATCH_JSON_BYTES', 8 * 1024 * 1024))
+
+# Scenario persistence, SQLite file in the instance folder by default
+db.init_app(app)
+with app.app_context():
+    db.create_all()
+
+# Identical concurrent requests share one computation: within the worker for calculations, which take
+# milliseconds, and across workers through this lease file for receipt PDFs, which take seconds
+app.config['SINGLE_FLIGHT_DB'] = os.environ.get('SINGLE_FLIGHT_DB',
+                                                os.path.join(app.instance_path, 'single_flight.db'))
+calculation_flights = SingleFlight()
+receipt_flights = SingleFlight(app.config['SINGLE_FLIGHT_DB'])
+
+# Generated receipts, served by the reverse proxy when DOWNLOAD_OFFLOAD is x-accel or x-sendfile
+app.config['RECEIPTS_DIR'] = os.path.join(app.static_folder, 'generated_receipts')
+app.config['DOWNLOAD_OFFLOAD'] = os.environ.get('DOWNLOAD_OFFLOAD') or None
+app.config['DOWNLOAD_ACCEL_PREFIX'] = os.environ.get('DOWNLOAD_ACCEL_PREFIX', '/protected/receipts/')
+receipt_downloads = DownloadServer(app.config['RECEIPTS_DIR'], app.config['DOWNLOAD_OFFLOAD'],
+                                   app.config['DOWNLOAD_ACCEL_PREFIX'])
 
 # Initialize calculators
 investment_calculator = InvestmentCalculator()
 loan_calculator = LoanCalculator()
+holding_period_analyzer = HoldingPeriodAnalyzer(investment_calculator)
+inverse_solver = InverseSolver(investment_calculator)
+offload.use_calculators(holding_period_analyzer, inverse_solver)
+scenario_store = ScenarioStore(investment_calculator)
+listing_screener = ListingScreener(investment_calculator)
+chart_builder = ChartBuilder(investment_calculator, loan_calculator)
+exporter = Exporter(investment_calculator, loan_calculator, holding_period_analyzer, inverse_solver, scenario_store)
+
+# Holding-period and solver calculations run in this many processes per worker, inline when 0
+app.config['CALC_PROCESS_POOL'] = int(os.environ.get('CALC_PROCESS_POOL', 0))
+offloader = Offloader(app.config['CALC_PROCESS_POOL'])
+
+# Per-session analysis graphs, so live edits only recompute the affected nodes
+analysis_sessions = AnalysisSessionStore(investment_calculator, loan_calculator)
+# Live sessions stay in the worker holding their event stream, each stream holding one of its threads
+app.config['LIVE_MAX_STREAMS'] = int(os.environ.get('LIVE_MAX_STREAMS', 4))
+live_sessions = LiveSessionStore(analysis_sessions, chart_builder, max_streams=app.config['LIVE_MAX_STREAMS'])
+
+def check_json_body(validator, limit='MAX_JSON_BYTES', optional=False):
+    """Error response for an oversized or invalid JSON body, None when the body is valid.
+
+    The size is checked on the Content-Length header before the body is read,
+    and the schema before any computation. The parsed body is cached by Flask
+    for the view.
+    """
+    if request.content_length is None and request.headers.get('Transfer-Encoding'):
+        # A chunked body could only be measured by reading it
+        return jsonify({
+            'success': False,
+            'error': 'Longueur de la requête requise'
+        }), 411
+    if (request.content_length or 0) > app.config[limit]:
+        return jsonify({
+            'success': False,
+            'error': f'Requête trop volumineuse (maximum {app.config[limit]} octets)'
+        }), 413
+
+    data = request.get_json(silent=True)
+    if data is None:
+        if optional and not request.content_length:
+            return None
+        return jsonify({
+            'success': False,
+            'error': 'Corps JSON invalide ou absent'
+        }), 400
+    try:
+        validator(data)
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Paramètre invalide : {e}',
+            'field': e.field
+        }), 400
+    return None
+
+def validated(schema, limit='MAX_JSON_BYTES'):
+    """Run a view only once its JSON body passed the size limit and the schema"""
+    validator = SCHEMAS[schema]
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            return check_json_body(validator, limit) or view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({
+        'success': False,
+        'error': f"Requête trop volumineuse (maximum {request.max_content_length} octets)"
+    }), 413
 
 @app.route('/')
 def index():
@@ -44,12 +175,30 @@ def receipts():
     return render_template('receipts.html')
 
 @app.route('/api/calculate-investment', methods=['POST'])
+@validated('calculate-investment')
 def calculate_investment():
     try:
         data = request.get_json()
         app.logger.info(f"Investment calculation request: {data}")
         
-        result = investment_calculator.analyze_investment(data)
+        if 'analysis_id' not in session:
+            session['analysis_id'] = analysis_sessions.new_session_id()
+        analysis_id = session['analysis_id']
+        charts = data.get('charts')
+
+        def analyze():
+            if charts is None:
+                return analysis_sessions.analyze(analysis_id, data)
+            # Chart series are read from the nodes of the analysis just run
+            result, figures = analysis_sessions.analyze_with(
+                analysis_id, data, lambda graph, analysis: chart_builder.graph_charts(
+                    graph, analysis, charts.get('format', 'series'),
+                    int(charts.get('max_points', ChartBuilder.DEFAULT_MAX_POINTS))))
+            return {**result, 'charts': figures}
+
+        # Keyed on the analysis inputs, so fields the analysis ignores don't defeat the coalescing
+        inputs = {'inputs': AnalysisGraph.read_inputs(data), 'charts': charts}
+        result = calculation_flights.run('calculate-investment', inputs, analyze)
         app.logger.info(f"Investment calculation result: {result}")
         
         return jsonify({
@@ -63,7 +212,80 @@ def calculate_investment():
             'error': 'Une erreur est survenue lors du calcul'
         }), 500
 
+@app.route('/api/live/stream')
+def live_stream():
+    if 'analysis_id' not in session:
+        session['analysis_id'] = analysis_sessions.new_session_id()
+
+    stream = live_sessions.open_stream(session['analysis_id'])
+    if stream is None:
+        # The page then works with full calculations only
+        return jsonify({
+            'success': False,
+            'error': 'Recalcul en direct indisponible, serveur occupé'
+        }), 503
+
+    # Held open for the page lifetime; the session lives in this worker's memory
+    return Response(stream,
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/live/update', methods=['POST'])
+@validated('live-update')
+def live_update():
+    try:
+        data = request.get_json()
+        if 'analysis_id' not in session:
+            session['analysis_id'] = analysis_sessions.new_session_id()
+
+        version = live_sessions.update(session['analysis_id'], data.get('fields', {}),
+                                       replace=bool(data.get('replace')))
+        if version is None:
+            # The event stream of this session is held by another worker, or closed
+            return jsonify({
+                'success': False,
+                'error': 'Session de recalcul en direct introuvable sur ce serveur'
+            }), 409
+        return jsonify({
+            'success': True,
+            'data': {'version': version}
+        }), 202
+    except Exception as e:
+        app.logger.error(f"Error in live_update: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Une erreur est survenue lors de la mise à jour'
+        }), 500
+
+@app.route('/api/charts', methods=['POST'])
+@validated('charts')
+def charts():
+    try:
+        data = request.get_json()
+        app.logger.info(f"Chart request: {data}")
+
+        if 'analysis_id' not in session:
+            session['analysis_id'] = analysis_sessions.new_session_id()
+        max_points = int(data.get('max_points', ChartBuilder.DEFAULT_MAX_POINTS))
+        chart_format = data.get('format', 'series')
+        # The session's graph is reused, only the nodes whose inputs changed are recomputed
+        _, result = analysis_sessions.analyze_with(
+            session['analysis_id'], data,
+            lambda graph, analysis: chart_builder.graph_charts(graph, analysis, chart_format, max_points))
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except Exception as e:
+        app.logger.error(f"Error in charts: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Une erreur est survenue lors de la préparation des graphiques'
+        }), 500
+
 @app.route('/api/calculate-loan', methods=['POST'])
+@validated('calculate-loan')
 def calculate_loan():
     try:
         data = request.get_json()
@@ -83,26 +305,287 @@ def calculate_loan():
             'error': 'Une erreur est survenue lors du calcul du prêt'
         }), 500
 
+@app.route('/api/holding-period', methods=['POST'])
+@validated('holding-period', 'MAX_BATCH_JSON_BYTES')
+def holding_period():
+    try:
+        data = request.get_json()
+        app.logger.info(f"Holding period analysis request: {data}")
+
+        max_exit_years = int(data.get('max_exit_years', 30))
+        discount_rate = float(data.get('discount_rate', 0.03))
+        result = offloader.run(offload.holding_period, data, max_exit_years, discount_rate)
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except Exception as e:
+        app.logger.error(f"Error in holding_period: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "Une erreur est survenue lors de l'analyse de la durée de détention"
+        }), 500
+
+@app.route('/api/solve/<solver>', methods=['POST'])
+def solve(solver):
+    if solver not in InverseSolver.SOLVERS:
+        return jsonify({
+            'success': False,
+            'error': f'Solveur inconnu: {solver}'
+        }), 404
+    # Each solver has its own required parameters
+    invalid = check_json_body(SOLVER_SCHEMAS[solver])
+    if invalid:
+        return invalid
+
+    try:
+        data = request.get_json()
+        app.logger.info(f"Solver {solver} request: {data}")
+
+        result = offloader.run(offload.solve, solver, data)
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Paramètre invalide : {e}',
+            'field': e.field
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Error in solve: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Une erreur est survenue lors de la résolution'
+        }), 500
+
+@app.route('/api/scenarios', methods=['POST'])
+@validated('scenarios', 'MAX_BATCH_JSON_BYTES')
+def save_scenarios():
+    try:
+        data = request.get_json()
+
+        if 'scenarios' in data:
+            count = scenario_store.bulk_save(data['scenarios'])
+            return jsonify({
+                'success': True,
+                'data': {'saved': count}
+            }), 201
+
+        return jsonify({
+            'success': True,
+            'data': scenario_store.save(data)
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error in save_scenarios: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "Une erreur est survenue lors de l'enregistrement du scénario"
+        }), 500
+
+@app.route('/api/scenarios', methods=['GET'])
+def list_scenarios():
+    # Empty form fields mean no filter
+    args = {key: value for key, value in request.args.items() if value != ''}
+    try:
+        SCENARIO_QUERY(args)
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Paramètre invalide : {e}',
+            'field': e.field
+        }), 400
+
+    try:
+        return jsonify({
+            'success': True,
+            'data': scenario_store.list_scenarios(args)
+        })
+    except Exception as e:
+        app.logger.error(f"Error in list_scenarios: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Une erreur est survenue lors de la lecture des scénarios'
+        }), 500
+
+@app.route('/api/scenarios/compare', methods=['GET'])
+def compare_scenarios():
+    try:
+        scenario_ids = [int(scenario_id) for scenario_id in request.args.get('ids', '').split(',') if scenario_id]
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Paramètre invalide : ids doit être une liste de nombres entiers',
+            'field': 'ids'
+        }), 400
+
+    try:
+        return jsonify({
+            'success': True,
+            'data': scenario_store.compare(scenario_ids)
+        })
+    except Exception as e:
+        app.logger.error(f"Error in compare_scenarios: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Une erreur est survenue lors de la comparaison des scénarios'
+        }), 500
+
+@app.route('/api/scenarios/<int:scenario_id>', methods=['GET'])
+def get_scenario(scenario_id):
+    scenario = scenario_store.get(scenario_id)
+    if scenario is None:
+        return jsonify({
+            'success': False,
+            'error': 'Scénario introuvable'
+        }), 404
+    return jsonify({
+        'success': True,
+        'data': scenario
+    })
+
+@app.route('/api/scenarios/<int:scenario_id>', methods=['DELETE'])
+def delete_scenario(scenario_id):
+    if not scenario_store.delete(scenario_id):
+        return jsonify({
+            'success': False,
+            'error': 'Scénario introuvable'
+        }), 404
+    return jsonify({'success': True})
+
+@app.route('/api/listings/screen', methods=['POST'])
+def screen_listings():
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({
+            'success': False,
+            'error': 'Fichier CSV manquant'
+        }), 400
+    # Empty form fields keep the default assumptions
+    params = {key: value for key, value in request.form.items() if value != ''}
+    try:
+        SCREEN(params)
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Paramètre invalide : {e}',
+            'field': e.field
+        }), 400
+
+    try:
+        # Werkzeug spools large uploads to disk, the CSV is then read chunk by chunk
+        result = listing_screener.screen(
+            upload.stream,
+            metric=params.get('metric', 'after_tax_yield'),
+            top_k=params.get('top_k', 20),
+            params=params
+        )
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Error in screen_listings: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "Une erreur est survenue lors de l'analyse des annonces"
+        }), 500
+
+@app.cli.command('screen-listings')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--metric', type=click.Choice(ListingScreener.METRICS), default='after_tax_yield')
+@click.option('--top', 'top_k', default=20, show_default=True, help='Number of listings to keep')
+@click.option('--chunksize', default=5000, show_default=True, help='Rows read per chunk')
+@click.option('--set', 'assumptions', multiple=True, metavar='KEY=VALUE',
+              help='Override an assumption, e.g. --set interest_rate=0.035')
+def screen_listings_command(csv_path, metric, top_k, chunksize, assumptions):
+    """Rank the listings of a CSV file (price, rent, charges, city, surface)"""
+    params = dict(assumption.split('=', 1) for assumption in assumptions)
+    try:
+        SCREEN(params)
+    except ValidationError as e:
+        raise click.BadParameter(str(e), param_hint='--set') from None
+    result = listing_screener.screen(csv_path, metric, top_k, params, chunksize)
+    click.echo(f"{result['rows_read']} listings read, {result['rows_rejected']} rejected, ranked by {metric}")
+    for rank, listing in enumerate(result['listings'], 1):
+        click.echo(f"{rank:>4}. row {listing['row']:>8}  {listing.get('city', ''):<20} "
+                   f"{listing['price']:>12,.0f} €  {listing['rent']:>8,.0f} €/mois  "
+                   f"{metric}={listing[metric]:.2f}")
+
+@app.route('/api/export/<table>', methods=['POST'])
+def export_table(table):
+    if table not in Exporter.TABLES:
+        return jsonify({
+            'success': False,
+            'error': f'Export inconnu: {table}'
+        }), 404
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in Exporter.FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f'Format inconnu: {export_format}'
+        }), 400
+    if export_format not in Exporter.available_formats():
+        return jsonify({
+            'success': False,
+            'error': f'Format {export_format} indisponible sur ce serveur'
+        }), 400
+
+    invalid = check_json_body(EXPORT_SCHEMAS[table], 'MAX_BATCH_JSON_BYTES', optional=True)
+    if invalid:
+        return invalid
+
+    try:
+        data = request.get_json(silent=True) or {}
+        app.logger.info(f"Export request: {table} as {export_format}")
+
+        columns, chunks = exporter.table(table, data)
+        filename = f"{table}.{export_format}"
+        if export_format == 'csv':
+            # Streamed row by row, the database session stays open for scenario exports
+            return Response(stream_with_context(exporter.stream_csv(columns, chunks)),
+                            mimetype=Exporter.FORMATS['csv'],
+                            headers={'Content-Disposition': f'attachment; filename={filename}'})
+        return send_file(exporter.write_file(export_format, columns, chunks),
+                         mimetype=Exporter.FORMATS[export_format],
+                         as_attachment=True,
+                         download_name=filename)
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f"Paramètres d'export invalides: {str(e)}"
+        }), 400
+    except Exception as e:
+        app.logger.error(f"Error in export_table: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "Une erreur est survenue lors de l'export"
+        }), 500
+
 @app.route('/api/receipts/generate', methods=['POST'])
+@validated('receipt')
 def generate_receipt():
     try:
         data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['landlord_name', 'landlord_address', 'tenant_name', 
-                         'property_address', 'rent_amount', 'payment_date', 'period']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
 
         # Initialize receipt generator with template
         template_path = os.path.join(app.static_folder, 'modele_quittance_de_loyer.docx')
         if not os.path.exists(template_path):
             return jsonify({'error': 'Template file not found'}), 500
 
-        receipt_generator = RentReceipt(template_path)
+        def generate():
+            receipt_generator = RentReceipt(template_path)
 
-        try:
             # Generate the receipt
             pdf_path = receipt_generator.generate_receipt(
                 landlord_name=data['landlord_name'],
@@ -115,8 +598,12 @@ def generate_receipt():
                 charges={charge['description']: float(charge['amount']) for charge in data.get('charges', [])} if data.get('charges') else None
             )
 
-            # Get the relative path for download
-            relative_path = os.path.relpath(pdf_path, app.static_folder)
+            # Get the path for download, relative to the receipts directory
+            return os.path.relpath(pdf_path, app.config['RECEIPTS_DIR'])
+
+        try:
+            # Identical concurrent requests wait for the same PDF conversion
+            relative_path = receipt_flights.run('receipt', data, generate)
             return jsonify({'pdf_path': relative_path})
 
         except Exception as e:
@@ -127,31 +614,35 @@ def generate_receipt():
         app.logger.error(f"Error in request handling: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/metrics')
+def metrics():
+    # Counters of the worker answering the request
+    return jsonify({
+        'success': True,
+        'data': {
+            'single_flight': {'calculations': calculation_flights.metrics(),
+                              'receipts': receipt_flights.metrics()},
+            'live_sessions': {**live_sessions.stats, 'streams': live_sessions.streams}
+        }
+    })
+
 @app.route('/download/<path:filename>')
 def download_file(filename):
     try:
-        # Ensure the file exists and is within the static folder
-        file_path = os.path.join(app.static_folder, filename)
-        if not os.path.exists(file_path):
+        # Only files of the receipts directory, with cache validators and ranges
+        response = receipt_downloads.response(filename, request.environ)
+        if response is None:
             return jsonify({'error': 'File not found'}), 404
-
-        directory = os.path.dirname(file_path)
-        return send_from_directory(directory, os.path.basename(file_path), as_attachment=True)
+        return response
     except Exception as e:
         app.logger.error(f"Error in file download: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/receipts/format', methods=['POST'])
+@validated('receipt')
 def format_receipt():
     try:
         data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['landlord_name', 'landlord_address', 'tenant_name', 
-                         'property_address', 'rent_amount', 'payment_date', 'period']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
 
         # Initialize receipt generator with template
         template_path = os.path.join(app.static_folder, 'modele_quittance_de_loyer.docx')
@@ -212,6 +703,28 @@ def format_receipt():
         app.logger.error(f"Error in request handling: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def warm_up():
+    """Run each calculator once and load the page templates, so the first requests don't pay for it.
+
+    Called by the gunicorn config before the workers are forked, the loaded
+    modules and caches being shared with them.
+    """
+    with app.test_request_context():
+        for template in ('index.html', 'receipts.html'):
+            app.jinja_env.get_template(template)
+    params = {
+        'purchase_price': 200000,
+        'rental_income': 1000,
+        'expenses': {'property_tax': 1000, 'total_monthly': 150},
+        'tax_regime': 'reel',
+        'loan_data': loan_calculator.calculate_loan_metrics(
+            {'loan_amount': 180000, 'interest_rate': 0.035, 'term_years': 20})
+    }
+    investment_calculator.analyze_investment(params)
+    chart_builder.figures(params)
+    offload.holding_period(params, 30, 0.03)
+    offload.solve('borrowing-capacity', {'monthly_income': 4000, 'interest_rate': 0.035, 'term_years': 20})
+
 if __name__ == '__main__':
     # Create logs directory if it doesn't exist
     os.makedirs('logs', exist_ok=True)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Compare the float and integer-cent amortization paths.
+
+Run from the repository root:
+    python -m benchmarks.bench_money
+"""
+import timeit
+
+import numpy as np
+
+from models.loan_calculator import LoanCalculator
+from models.money import amortization_cents
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<45} {seconds * 1e6:>10.1f} µs")
+    return seconds
+
+
+def main():
+    calculator = LoanCalculator()
+
+    print("Single 20-year schedule (list of dicts, as served by /api/calculate-loan)")
+    float_time = bench("float path", lambda: calculator.generate_amortization_schedule(200000, 0.04, 20), 200)
+    cents_time = bench("cents path",
+                       lambda: calculator.generate_amortization_schedule(200000, 0.04, 20, 'cents'), 200)
+    print(f"{'cents / float':<45} {cents_time / float_time:>10.2f} x")
+
+    print()
+    print("Batch of 1000 25-year schedules (int64 arrays)")
+    principals = np.linspace(50000, 500000, 1000)
+    rates = np.linspace(0.01, 0.06, 1000)
+    bench("cents path, vectorized over loans", lambda: amortization_cents(principals, rates, 25), 5)
+
+    print()
+    print("Reconciliation over the batch")
+    schedules = amortization_cents(principals, rates, 25)
+    principal_cents = np.floor(principals * 100 + 0.5).astype(np.int64)
+    exact = np.array_equal(schedules['principal'].sum(axis=1), principal_cents)
+    print(f"{'principal parts add up to the loan':<45} {exact!s:>10}")
+    drift = max(abs(calculator.generate_amortization_schedule(p, r, 25)[-1]['total_principal'] - p)
+                for p, r in zip(principals[:50], rates[:50]))
+    print(f"{'float path max drift on 50 loans (€)':<45} {drift:>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Cost of request validation next to the work it guards.
+
+Run from the repository root:
+    python -m benchmarks.bench_validation
+"""
+import json
+import timeit
+
+from models.investment_calculator import InvestmentCalculator
+from models.loan_calculator import LoanCalculator
+from models.validation import SCHEMAS
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<45} {seconds * 1e6:>10.1f} µs")
+    return seconds
+
+
+def main():
+    payload = {
+        'purchase_price': 200000,
+        'notary_fees_rate': 0.08,
+        'rental_income': 1000,
+        'expenses': {'management_fees': 70, 'property_tax': 80, 'insurance': 15, 'maintenance': 20,
+                     'condo_fees': 50, 'other': 0, 'total_monthly': 235},
+        'tax_regime': 'micro_bic',
+        'tax_bracket': 30
+    }
+    schedule = LoanCalculator().generate_amortization_schedule(180000, 0.035, 25)[:300]
+    with_schedule = {**payload, 'loan_data': {'loan_amount': 180000, 'interest_rate': 0.035, 'term_years': 25,
+                                              'amortization_schedule': schedule}}
+    validate = SCHEMAS['calculate-investment']
+    calculator = InvestmentCalculator()
+
+    for label, body in (("Typical /api/calculate-investment body", payload),
+                        ("Body with a 300-month loan schedule", with_schedule)):
+        raw = json.dumps(body)
+        print(f"{label} ({len(raw)} bytes)")
+        validation_time = bench("schema validation", lambda: validate(body), 2000)
+        parse_time = bench("json.loads of the body", lambda: json.loads(raw), 2000)
+        analysis_time = bench("analyze_investment", lambda: calculator.analyze_investment(body), 20)
+        print(f"{'validation / (parse + analysis)':<45} {validation_time / (parse_time + analysis_time):>10.2%}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
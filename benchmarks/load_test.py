@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Load test of the application under gunicorn, comparing worker models.
+
+Starts gunicorn with gunicorn.conf.py once per configuration, drives the
+JSON endpoints with a weighted mix of requests from concurrent clients and
+reports throughput and p50/p95/p99 latencies, overall and per endpoint.
+
+Run from the repository root:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --configs gthread,offload --clients 32 --duration 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000  # Server already running
+
+Receipt PDF generation needs Word through docx2pdf and is left out of the
+mix unless --with-pdf is given.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Worker models compared, as gunicorn.conf.py environment overrides
+CONFIGS = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_THREADS': '1', 'CALC_PROCESS_POOL': '0'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_THREADS': '8', 'CALC_PROCESS_POOL': '0'},
+    'offload': {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_THREADS': '8', 'CALC_PROCESS_POOL': '2'}
+}
+
+PRICES = [120000, 150000, 180000, 200000, 250000, 320000]
+RENTS = [650, 750, 850, 950, 1100, 1300]
+
+
+def investment(rng):
+    price = rng.choice(PRICES)
+    rate = rng.choice([0.032, 0.035, 0.038])
+    loan_amount = round(price * 1.08 - rng.choice([0, 20000, 40000]))
+    return {
+        'purchase_price': price,
+        'notary_fees_rate': 0.08,
+        'rental_income': rng.choice(RENTS),
+        'expenses': {'management_fees': 60, 'property_tax': rng.choice([800, 1100, 1400]), 'insurance': 15,
+                     'maintenance': 30, 'condo_fees': rng.choice([40, 90]), 'other': 0, 'total_monthly': 200},
+        'tax_regime': rng.choice(['micro_bic', 'reel']),
+        'tax_bracket': rng.choice([11, 30, 41]),
+        'loan_data': {'loan_amount': loan_amount, 'interest_rate': rate, 'term_years': 20}
+    }
+
+
+def receipt(rng):
+    return {
+        'landlord_name': 'Jean Dupont',
+        'landlord_address': '12 rue de la Paix, 75002 Paris',
+        'tenant_name': 'Marie Martin',
+        'property_address': '3 avenue Victor Hugo, 69003 Lyon',
+        'rent_amount': str(rng.choice(RENTS)),
+        'payment_date': '2024-03-05',
+        'period': '2024-03',
+        'charges': [{'description': 'Charges locatives', 'amount': '50'}]
+    }
+
+
+# (weight, method, path, body builder); weights follow the interactive use of the pages
+MIX = [
+    (35, 'POST', '/api/calculate-investment', investment),
+    (20, 'POST', '/api/charts', lambda rng: {**investment(rng), 'format': 'series'}),
+    (15, 'POST', '/api/calculate-loan', lambda rng: {'loan_amount': rng.choice(PRICES), 'term_years': 20,
+                                                     'interest_rate': rng.choice([0.032, 0.035, 0.038])}),
+    (10, 'POST', '/api/holding-period', lambda rng: {'scenarios': [investment(rng) for _ in range(20)],
+                                                     'max_exit_years': 25}),
+    (10, 'POST', '/api/solve/borrowing-capacity', lambda rng: {
+        'monthly_income': list(range(2000, 8000, 100)), 'interest_rate': [0.03, 0.035, 0.04],
+        'term_years': [15, 20, 25], 'grid': True}),
+    (5, 'POST', '/api/receipts/format', receipt),
+    (5, 'GET', '/', None)
+]
+PDF_MIX = (2, 'POST', '/api/receipts/generate', receipt)
+
+
+class Client(threading.Thread):
+    """One user sending requests back to back on a keep-alive connection"""
+
+    def __init__(self, host, port, mix, seed, deadline, results):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.deadline = deadline
+        self.results = results
+        self.cookie = None
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        weights = [weight for weight, *_ in self.mix]
+        while time.monotonic() < self.deadline:
+            _, method, path, build = self.rng.choices(self.mix, weights)[0]
+            body = json.dumps(build(self.rng)) if build else None
+            headers = {'Content-Type': 'application/json'} if body else {}
+            if self.cookie:
+                headers['Cookie'] = self.cookie
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                cookie = response.getheader('Set-Cookie')
+                if cookie:
+                    self.cookie = cookie.split(';', 1)[0]
+            except (OSError, http.client.HTTPException):
+                status = 0
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            self.results.append((path, status, time.perf_counter() - start))
+        connection.close()
+
+
+def run_load(url, clients, duration, mix, seed=0):
+    """Drive a running server, returning (path, status, seconds) per request and the elapsed time"""
+    parts = urlsplit(url)
+    results = []  # list.append is atomic
+    deadline = time.monotonic() + duration
+    threads = [Client(parts.hostname, parts.port or 80, mix, seed + index, deadline, results)
+               for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    """Throughput and latency percentiles, overall and per endpoint"""
+    def stats(rows):
+        latencies = np.array([seconds for _, _, seconds in rows]) * 1000
+        errors = sum(1 for _, status, _ in rows if status == 0 or status >= 500)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+        return {'requests': len(rows), 'errors': errors, 'rps': len(rows) / elapsed,
+                'p50': p50, 'p95': p95, 'p99': p99}
+
+    by_path = {}
+    for row in results:
+        by_path.setdefault(row[0], []).append(row)
+    return stats(results), {path: stats(rows) for path, rows in sorted(by_path.items())}
+
+
+def print_summary(name, overall, per_path):
+    print(f"\n{name}: {overall['rps']:.1f} req/s, {overall['requests']} requests, {overall['errors']} errors")
+    print(f"{'endpoint':<32} {'req':>6} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for path, row in [('all', overall)] + list(per_path.items()):
+        print(f"{path:<32} {row['requests']:>6} {row['errors']:>5} {row['rps']:>8.1f} "
+              f"{row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start in time")
+
+
+def start_server(config, workers, port, workdir):
+    """gunicorn running the app with a configuration's overrides, on a throwaway database"""
+    env = {
+        **os.environ,
+        **CONFIGS[config],
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': str(workers),
+        'GUNICORN_LOG_LEVEL': 'warning',
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, f'{config}.db')}",
+        'SINGLE_FLIGHT_DB': os.path.join(workdir, f'{config}_single_flight.db')
+    }
+    log = open(os.path.join(workdir, f'{config}.log'), 'w')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                               env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(port, process)
+    except RuntimeError:
+        # The log goes away with the working directory, show why gunicorn didn't start
+        process.kill()
+        process.wait()
+        log.close()
+        with open(log.name) as f:
+            sys.stderr.write(f.read())
+        raise
+    return process, log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', default=','.join(CONFIGS), help='Comma-separated worker models')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='gunicorn workers')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load per configuration')
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds of load discarded first')
+    parser.add_argument('--with-pdf', action='store_true', help='Include receipt PDF generation')
+    parser.add_argument('--url', help='Load an already running server instead of starting gunicorn')
+    args = parser.parse_args()
+
+    mix = MIX + [PDF_MIX] if args.with_pdf else MIX
+    if args.url:
+        run_load(args.url, args.clients, args.warmup, mix, seed=1000)
+        print_summary(args.url, *summarize(*run_load(args.url, args.clients, args.duration, mix)))
+        return
+
+    print(f"{args.workers} workers, {args.clients} clients, {args.duration:.0f} s per configuration")
+    with tempfile.TemporaryDirectory() as workdir:
+        for config in args.configs.split(','):
+            port = free_port()
+            process, log = start_server(config, args.workers, port, workdir)
+            try:
+                url = f'http://127.0.0.1:{port}'
+                run_load(url, args.clients, args.warmup, mix, seed=1000)
+                print_summary(config, *summarize(*run_load(url, args.clients, args.duration, mix)))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+                log.close()
+
+
+if __name__ == '__main__':
+    main()
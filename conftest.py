@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from models.loan_calculator import LoanCalculator
+
+
+@pytest.fixture
+def build_params():
+    """Factory of investment analysis parameters, with keyword overrides"""
+    def build(**overrides):
+        loan = LoanCalculator().calculate_loan_metrics({
+            'loan_amount': 200000,
+            'interest_rate': 0.04,
+            'term_years': 20
+        })
+        params = {
+            'purchase_price': 200000,
+            'notary_fees_rate': 0.08,
+            'rental_income': 1100,
+            'expenses': {
+                'management_fees': 50,
+                'property_tax': 1200,
+                'insurance': 20,
+                'maintenance': 30,
+                'condo_fees': 80,
+                'other': 10,
+                'total_monthly': 290
+            },
+            'tax_regime': 'reel',
+            'tax_bracket': 30,
+            'loan_data': {
+                'term_years': loan['term_years'],
+                'amortization_schedule': loan['amortization_schedule']
+            }
+        }
+        params.update(overrides)
+        return params
+
+    return build
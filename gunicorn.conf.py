@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Gunicorn settings for MyRE.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be overridden from the environment, which is how
+benchmarks/load_test.py compares worker models. Calculations are short and
+CPU-bound, but receipt PDF conversion blocks for seconds and live
+recalculation keeps SSE connections open; with sync workers every such
+request holds a whole worker. On the load test mix, gthread workers gave
+the same throughput as sync ones with the p50 of the light endpoints
+divided by 3 to 6. Holding-period batches then wait on the GIL behind the
+other threads; on hosts with cores to spare, CALC_PROCESS_POOL moves them
+and the solvers to a process pool.
+
+Live recalculation sessions live in the memory of the worker holding the
+page's event stream, and the workers of one gunicorn share its socket with
+no sticky routing. A delta reaching another worker is refused with a 409
+and the page falls back to a full calculation, so edits are never lost but
+only the deltas reaching the right worker are incremental. With
+GUNICORN_WORKERS=1 they all are; to scale out and keep them incremental,
+run several single-worker instances behind a proxy routing on the session
+cookie (nginx: hash $cookie_session consistent). Each stream holds a
+thread for the page lifetime, so at most half of a worker's threads serve
+streams, none with sync workers.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 8 if worker_class == 'gthread' else 1))
+# Read by the app when it is loaded, after this file
+os.environ.setdefault('LIVE_MAX_STREAMS', str(threads // 2))
+
+# PDF conversion can take a while; SSE streams send a heartbeat every 15 s
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Restart workers now and then so the per-worker caches and session stores stay bounded
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+# Import the app and warm it up once in the master; workers share the loaded pages copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # None disables the access log
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    if preload_app:
+        from app import warm_up
+
+        warm_up()
+        server.log.info('Calculators and templates warmed up')
+
+
+def post_fork(server, worker):
+    from app import app, db
+
+    # Connections opened in the master must not be shared with the workers
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from app import offloader
+
+    # Calculation processes are started in each worker, never forked from the master
+    offloader.warm_up()
+
+
+def worker_exit(server, worker):
+    from app import offloader
+
+    offloader.shutdown()
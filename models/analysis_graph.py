@@ -0,0 +1,318 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+from models.loan_calculator import LoanCalculator
+
+
+class AnalysisCancelled(Exception):
+    """Raised when an analysis is superseded by newer inputs before it completes"""
+
+
+class AnalysisNode:
+    """A cached step of the investment analysis with explicit dependencies"""
+
+    def __init__(self, name, compute, inputs=(), deps=()):
+        self.name = name
+        self.compute = compute
+        self.inputs = tuple(inputs)  # Request parameters read by this node
+        self.deps = tuple(deps)      # Upstream nodes read by this node
+
+
+class AnalysisGraph:
+    """Investment analysis modelled as a DAG of cached nodes.
+
+    purchase_costs -> depreciation -> expenses -> loan -> yearly_interest -> yearly_tax -> total_roi
+
+    Updating the inputs only invalidates the nodes reading a changed input and
+    everything downstream of them; the other nodes keep their cached values.
+    The loan node generates the amortization schedule from the loan amount,
+    rate and term, so clients don't need to send it.
+    """
+
+    DEFAULT_TERM_YEARS = 20
+    # Loan figures returned with the analysis, the schedule staying on the server
+    LOAN_SUMMARY_KEYS = ('loan_amount', 'personal_deposit', 'interest_rate', 'term_years', 'monthly_payment',
+                         'annual_payment', 'total_interest', 'total_cost')
+
+    def __init__(self, calculator, loan_calculator=None):
+        self.calculator = calculator
+        self.loan_calculator = loan_calculator or LoanCalculator()
+        self.nodes = OrderedDict()
+        self._inputs = {}
+        self._values = {}
+        self.recomputed = []  # Nodes recomputed during the last analysis
+        self._cancelled = None  # Checked before each node computation
+
+        # Declared in topological order
+        self._add('purchase_costs', self._purchase_costs,
+                  inputs=('purchase_price', 'notary_fees_rate'))
+        self._add('depreciation', self._depreciation,
+                  inputs=('acquisition_month',), deps=('purchase_costs',))
+        self._add('expenses', self._expenses,
+                  inputs=('expenses',))
+        self._add('cashflow', self._cashflow,
+                  inputs=('rental_income',), deps=('expenses',))
+        self._add('loan', self._loan,
+                  inputs=('loan_data',))
+        self._add('yearly_interest', self._yearly_interest,
+                  deps=('loan',))
+        self._add('tax_impact', self._tax_impact,
+                  inputs=('rental_income', 'tax_regime', 'tax_bracket', 'loan_interest'),
+                  deps=('purchase_costs', 'depreciation', 'expenses'))
+        self._add('yearly_tax', self._yearly_tax,
+                  inputs=('rental_income', 'tax_regime', 'tax_bracket', 'projection_years',
+                          'rent_indexation', 'expense_indexation'),
+                  deps=('purchase_costs', 'depreciation', 'expenses', 'loan', 'yearly_interest'))
+        self._add('total_roi', self._total_roi,
+                  inputs=('purchase_price', 'appreciation_rate', 'tax_regime', 'tax_bracket'),
+                  deps=('purchase_costs', 'depreciation', 'cashflow', 'loan'))
+
+        # Downstream edges used for invalidation
+        self._dependents = {name: [] for name in self.nodes}
+        for node in self.nodes.values():
+            for dep in node.deps:
+                self._dependents[dep].append(node.name)
+
+    def _add(self, name, compute, inputs=(), deps=()):
+        for dep in deps:
+            if dep not in self.nodes:
+                raise ValueError(f"Unknown dependency '{dep}' for node '{name}'")
+        self.nodes[name] = AnalysisNode(name, compute, inputs, deps)
+
+    @property
+    def inputs(self):
+        """Inputs of the last analysis, defaults applied"""
+        return self._inputs
+
+    @staticmethod
+    def read_inputs(params):
+        """Extract the analysis inputs from request parameters, applying defaults"""
+        return {
+            'purchase_price': params['purchase_price'],
+            'notary_fees_rate': params.get('notary_fees_rate', 0.08),
+            'rental_income': params['rental_income'],
+            'expenses': params['expenses'],
+            'tax_regime': params.get('tax_regime', 'micro_bic'),
+            'tax_bracket': params.get('tax_bracket', 30),
+            'loan_interest': params.get('loan_interest', 0),
+            'loan_data': params.get('loan_data'),
+            'appreciation_rate': params.get('appreciation_rate', 2.0),
+            'projection_years': params.get('projection_years'),  # Defaults to the loan term
+            'rent_indexation': params.get('rent_indexation', 0),
+            'expense_indexation': params.get('expense_indexation', 0),
+            'acquisition_month': params.get('acquisition_month', 1)  # First-year depreciation prorata
+        }
+
+    def update(self, params):
+        """Set new inputs and invalidate the affected nodes, returning their names"""
+        inputs = self.read_inputs(params)
+        changed = {key for key, value in inputs.items()
+                   if key not in self._inputs or self._inputs[key] != value}
+        self._inputs = inputs
+
+        stale = set()
+        for node in self.nodes.values():
+            if node.name in stale or any(key in changed for key in node.inputs):
+                stale.add(node.name)
+                stale.update(self._descendants(node.name))
+
+        for name in stale:
+            self._values.pop(name, None)
+        return stale
+
+    def _descendants(self, name):
+        pending = list(self._dependents[name])
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if current not in seen:
+                seen.add(current)
+                pending.extend(self._dependents[current])
+        return seen
+
+    def get(self, name):
+        """Return the value of a node, computing it and its dependencies if needed"""
+        if name not in self._values:
+            node = self.nodes[name]
+            for dep in node.deps:
+                self.get(dep)
+            if self._cancelled is not None and self._cancelled():
+                raise AnalysisCancelled(name)
+            self._values[name] = node.compute()
+            self.recomputed.append(name)
+        return self._values[name]
+
+    def analyze(self, params, cancelled=None):
+        """Comprehensive investment analysis with detailed expenses and tax impact.
+
+        cancelled is an optional callable checked before each node; when it
+        returns True the analysis stops with AnalysisCancelled, keeping the
+        nodes computed so far.
+        """
+        self.recomputed = []
+        self._cancelled = cancelled
+        self.update(params)
+
+        purchase_costs = self.get('purchase_costs')
+        cashflow = self.get('cashflow')
+        tax_impact = self.get('tax_impact')
+        total_roi = self.get('total_roi')
+        loan = self.get('loan')
+
+        # Calculate after-tax monthly cashflow
+        monthly_tax_impact = tax_impact['total_tax'] / 12
+        after_tax_monthly_cashflow = cashflow['monthly_cashflow'] - monthly_tax_impact
+
+        return {
+            'purchase_costs': purchase_costs,
+            'monthly_cashflow': cashflow['monthly_cashflow'],
+            'after_tax_monthly_cashflow': after_tax_monthly_cashflow,
+            'annual_cashflow': cashflow['annual_cashflow'],
+            'after_tax_annual_cashflow': after_tax_monthly_cashflow * 12,
+            'roi': total_roi['total_roi'],
+            'roi_breakdown': total_roi['components'],
+            'after_tax_roi': self.calculator.calculate_roi(after_tax_monthly_cashflow * 12,
+                                                           purchase_costs['total_cost']),
+            'tax_impact': tax_impact,
+            'yearly_tax_data': self.get('yearly_tax'),  # Include year-by-year tax data
+            'expense_breakdown': self.get('expenses')['breakdown'],
+            'loan': {key: loan[key] for key in self.LOAN_SUMMARY_KEYS if key in loan} if loan else None,
+            'rental_income': self._inputs['rental_income'],
+            'tax_regime': self._inputs['tax_regime']  # Include tax regime in response
+        }
+
+    def _tax_expenses(self):
+        """Expenses as expected by the tax calculations"""
+        return {**self._inputs['expenses'],
+                'purchase_price': self._inputs['purchase_price'],
+                'notary_fees': self._values['purchase_costs']['notary_fees']}
+
+    def _purchase_costs(self):
+        return self.calculator.calculate_purchase_costs(
+            self._inputs['purchase_price'],
+            self._inputs['notary_fees_rate']
+        )
+
+    def _depreciation(self):
+        purchase_costs = self._values['purchase_costs']
+        return self.calculator.calculate_depreciation(
+            purchase_costs['purchase_price'],
+            purchase_costs['notary_fees'],
+            self._inputs['acquisition_month']
+        )
+
+    def _expenses(self):
+        expenses = self._inputs['expenses']
+        return {
+            'breakdown': self.calculator.calculate_expense_breakdown(expenses),
+            'annual': self.calculator.calculate_annual_expenses(expenses)
+        }
+
+    def _cashflow(self):
+        monthly_cashflow = self.calculator.calculate_monthly_cashflow(
+            self._inputs['rental_income'],
+            self._inputs['expenses']
+        )
+        return {
+            'monthly_cashflow': monthly_cashflow,
+            'annual_cashflow': monthly_cashflow * 12
+        }
+
+    def _loan(self):
+        loan_data = self._inputs['loan_data']
+        if not loan_data:
+            return None
+        loan = self.loan_calculator.with_schedule(
+            {**loan_data, 'term_years': loan_data.get('term_years') or self.DEFAULT_TERM_YEARS})
+        schedule = loan.get('amortization_schedule') or []
+        total_interest = schedule[-1]['total_interest'] if schedule else 0
+        loan.setdefault('monthly_payment', 0)
+        loan.update({
+            'annual_payment': loan['monthly_payment'] * 12,
+            'total_interest': total_interest,
+            'total_cost': loan['loan_amount'] + total_interest
+        })
+        return loan
+
+    def _yearly_interest(self):
+        loan = self._values['loan'] or {}
+        return self.calculator.calculate_yearly_interest(loan.get('amortization_schedule', []))
+
+    def _tax_impact(self):
+        return self.calculator.calculate_tax_impact(
+            self._inputs['rental_income'],
+            self._tax_expenses(),
+            self._inputs['tax_regime'],
+            self._inputs['tax_bracket'],
+            self._inputs['loan_interest'],
+            depreciation=self._values['depreciation']
+        )
+
+    def _yearly_tax(self):
+        return self.calculator.calculate_yearly_tax_impact(
+            self._inputs['rental_income'],
+            self._tax_expenses(),
+            self._values['loan'] or {'term_years': self.DEFAULT_TERM_YEARS, 'amortization_schedule': []},
+            self._inputs['tax_regime'],
+            self._inputs['tax_bracket'],
+            depreciation=self._values['depreciation'],
+            yearly_interest=self._values['yearly_interest'],
+            years=self._inputs['projection_years'],
+            rent_indexation=self._inputs['rent_indexation'],
+            expense_indexation=self._inputs['expense_indexation']
+        )
+
+    def _total_roi(self):
+        params = {
+            'purchase_price': self._inputs['purchase_price'],
+            'appreciation_rate': self._inputs['appreciation_rate'],
+            'tax_regime': self._inputs['tax_regime'],
+            'tax_bracket': self._inputs['tax_bracket']
+        }
+        return self.calculator.calculate_total_roi(
+            params,
+            self._values['cashflow']['annual_cashflow'],
+            self._values['purchase_costs']['total_cost'],
+            self._values['loan'],
+            depreciation=self._values['depreciation']
+        )
+
+
+class AnalysisSessionStore:
+    """Keeps one analysis graph per client session, evicting the least recently used"""
+
+    def __init__(self, calculator, loan_calculator=None, max_sessions=1000):
+        self.calculator = calculator
+        self.loan_calculator = loan_calculator or LoanCalculator()
+        self.max_sessions = max_sessions
+        self._graphs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_session_id():
+        return uuid.uuid4().hex
+
+    def _entry(self, session_id):
+        with self._lock:
+            entry = self._graphs.pop(session_id, None)
+            if entry is None:
+                entry = (AnalysisGraph(self.calculator, self.loan_calculator), threading.Lock())
+            self._graphs[session_id] = entry
+            while len(self._graphs) > self.max_sessions:
+                self._graphs.popitem(last=False)
+            return entry
+
+    def analyze(self, session_id, params, cancelled=None):
+        """Run the analysis for a session, reusing the nodes left valid by previous calls"""
+        graph, graph_lock = self._entry(session_id)
+        with graph_lock:
+            return graph.analyze(params, cancelled)
+
+    def analyze_with(self, session_id, params, build, cancelled=None):
+        """Run the analysis for a session, then build(graph, result) from its nodes before another
+        request of the session changes them, returning the result and what build returned"""
+        graph, graph_lock = self._entry(session_id)
+        with graph_lock:
+            result = graph.analyze(params, cancelled)
+            return result, build(graph, result)
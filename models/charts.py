@@ -0,0 +1,306 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.graph_objects as go
+
+from models.analysis_graph import AnalysisGraph
+
+
+class ChartBuilder:
+    """Chart-ready series for the investment dashboard.
+
+    The browser used to receive the full monthly schedule and reshape it for
+    every chart. Here the series are prepared once on the server: yearly
+    aggregates, stacked tax components and monthly lines downsampled with
+    Largest-Triangle-Three-Buckets, which keeps the visual shape of a line
+    with a fraction of its points. Plotly figures built from the series are
+    cached per input hash.
+
+    Series are read from an analysis graph, so the session graph of the
+    calculation endpoints provides them without running the analysis again.
+    """
+
+    DEFAULT_MAX_POINTS = 120  # Points kept per monthly line
+    CACHE_SIZE = 256
+
+    INCOME_COLOR = '#28a745'
+    EXPENSE_COLOR = '#dc3545'
+    RESULT_COLOR = '#007bff'
+
+    def __init__(self, investment_calculator, loan_calculator):
+        self.calculator = investment_calculator
+        self.loan_calculator = loan_calculator
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(params):
+        """Hash of the canonical JSON of the request parameters"""
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def lttb(x, y, threshold):
+        """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+        The first and last points are always kept; the points in between are
+        split into threshold - 2 buckets and each bucket keeps the point forming
+        the largest triangle with the previously kept point and the average of
+        the next bucket.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        count = len(x)
+        if threshold >= count or threshold < 3:
+            return np.arange(count)
+
+        edges = np.linspace(1, count - 1, threshold - 1).astype(int)
+        kept = np.empty(threshold, dtype=int)
+        kept[0], kept[-1] = 0, count - 1
+        selected = 0
+        for bucket in range(threshold - 2):
+            start, end = edges[bucket], edges[bucket + 1]
+            if bucket < threshold - 3:
+                next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+                average_x, average_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+            else:
+                average_x, average_y = x[-1], y[-1]
+            areas = np.abs((x[selected] - average_x) * (y[start:end] - y[selected])
+                           - (x[selected] - x[start:end]) * (average_y - y[selected]))
+            selected = start + int(np.argmax(areas))
+            kept[bucket + 1] = selected
+        return kept
+
+    def _downsample(self, x, y, max_points):
+        kept = self.lttb(x, y, max_points)
+        return {'x': np.asarray(x)[kept].tolist(), 'y': np.asarray(y)[kept].tolist()}
+
+    def _analyze(self, params):
+        graph = AnalysisGraph(self.calculator, self.loan_calculator)
+        return graph, graph.analyze(params)
+
+    def series(self, params, max_points=DEFAULT_MAX_POINTS):
+        """Series for the cash-flow, tax impact, amortization and equity charts"""
+        return self.graph_series(*self._analyze(params), max_points)
+
+    def graph_series(self, graph, analysis, max_points=DEFAULT_MAX_POINTS):
+        """Chart series of an analyzed graph, read from its cached nodes"""
+        loan = graph.get('loan') or {}
+        schedule = loan.get('amortization_schedule') or []
+        return {
+            'cashflow': self.cashflow_series(analysis, loan.get('monthly_payment', 0)),
+            'tax_impact': self.tax_impact_series(analysis),
+            'amortization': self.amortization_series(schedule, max_points),
+            'equity': self.equity_series(
+                graph.inputs['purchase_price'],
+                graph.inputs['appreciation_rate'] / 100,
+                loan.get('loan_amount', 0),
+                schedule,
+                int(loan.get('term_years') or len(analysis['yearly_tax_data']))
+            )
+        }
+
+    def graph_charts(self, graph, analysis, chart_format='series', max_points=DEFAULT_MAX_POINTS):
+        """Series or Plotly figures of an analyzed graph"""
+        if chart_format == 'plotly':
+            return self.graph_figures(graph, analysis, max_points)
+        return self.graph_series(graph, analysis, max_points)
+
+    def cashflow_series(self, analysis, monthly_payment):
+        """Monthly waterfall from rent to net cash-flow, zero items left out"""
+        breakdown = analysis['expense_breakdown']
+        items = [
+            ('Loyer', analysis['rental_income']),
+            ('Frais de gestion', -breakdown['management_fees']),
+            ('Taxe foncière', -breakdown['property_tax']),
+            ('Assurance', -breakdown['insurance']),
+            ('Provision travaux', -breakdown['maintenance']),
+            ('Charges copro', -breakdown['condo_fees']),
+            ('Autres charges', -breakdown['other']),
+            ('Mensualité prêt', -monthly_payment),
+            ('Cash-flow net', analysis['after_tax_monthly_cashflow'])
+        ]
+        items = [item for item in items if item[1] != 0]
+        return {
+            'labels': [name for name, _ in items],
+            'values': [float(value) for _, value in items],
+            'measures': ['relative'] * (len(items) - 1) + ['total'] if items else []
+        }
+
+    def tax_impact_series(self, analysis):
+        """Yearly rent, stacked deductions and tax lines"""
+        yearly = analysis['yearly_tax_data']
+        columns = {key: np.array([entry[key] for entry in yearly], dtype=float) for key in yearly[0]} \
+            if yearly else {}
+        years = columns.get('year', np.array([])).astype(int).tolist()
+        rental_income = columns.get('rental_income', np.full(len(years), analysis['rental_income'] * 12.0))
+
+        if analysis['tax_regime'] == 'reel':
+            components = [('Charges', 'expenses_deduction', '#e74c3c'),
+                          ('Intérêts', 'interest_deduction', '#3498db'),
+                          ('Amortissements', 'depreciation_deduction', '#f1c40f')]
+            deductions = [{'name': name, 'values': (-columns[key]).tolist(), 'color': color}
+                          for name, key, color in components if np.any(columns[key] != 0)]
+        else:
+            rate = self.calculator.tax_engine.micro_bic_rate
+            deductions = [{'name': f'Abattement {rate * 100:.0f}%', 'values': (-rental_income * rate).tolist(),
+                           'color': '#e74c3c'}]
+
+        return {
+            'regime': analysis['tax_regime'],
+            'years': years,
+            'rental_income': rental_income.tolist(),
+            'deductions': deductions,
+            'taxable_income': columns.get('taxable_income', np.array([])).tolist(),
+            'total_tax': columns.get('total_tax', np.array([])).tolist(),
+            'effective_tax_rate': columns.get('effective_tax_rate', np.array([])).tolist()
+        }
+
+    def amortization_series(self, schedule, max_points=DEFAULT_MAX_POINTS):
+        """Downsampled monthly principal and interest lines, plus yearly totals"""
+        if not schedule:
+            return {'principal': {'x': [], 'y': []}, 'interest': {'x': [], 'y': []},
+                    'yearly': {'years': [], 'principal': [], 'interest': []}}
+        months = np.array([entry['payment_num'] for entry in schedule])
+        principal = np.array([entry['principal'] for entry in schedule], dtype=float)
+        interest = np.array([entry['interest'] for entry in schedule], dtype=float)
+        num_years = -(-len(schedule) // 12)
+        padding = num_years * 12 - len(schedule)
+        return {
+            'principal': self._downsample(months, principal, max_points),
+            'interest': self._downsample(months, interest, max_points),
+            'yearly': {
+                'years': list(range(1, num_years + 1)),
+                'principal': np.pad(principal, (0, padding)).reshape(num_years, 12).sum(axis=1).tolist(),
+                'interest': np.pad(interest, (0, padding)).reshape(num_years, 12).sum(axis=1).tolist()
+            }
+        }
+
+    def equity_series(self, purchase_price, appreciation_rate, loan_amount, schedule, term_years):
+        """Property value, loan balance and equity at each year end from purchase to the loan term"""
+        years = np.arange(term_years + 1)
+        property_value = purchase_price * (1 + appreciation_rate) ** years
+        year_end_balances = [entry['remaining_balance'] for entry in schedule[11::12]][:term_years]
+        loan_balance = np.zeros(term_years + 1)
+        loan_balance[0] = loan_amount
+        loan_balance[1:len(year_end_balances) + 1] = year_end_balances
+        return {
+            'years': years.tolist(),
+            'property_value': property_value.tolist(),
+            'loan_balance': loan_balance.tolist(),
+            'equity': (property_value - loan_balance).tolist()
+        }
+
+    def figures(self, params, max_points=DEFAULT_MAX_POINTS):
+        """Plotly figure JSON for the four charts"""
+        return self.graph_figures(*self._analyze(params), max_points)
+
+    def graph_figures(self, graph, analysis, max_points=DEFAULT_MAX_POINTS):
+        """Plotly figure JSON for the four charts of an analyzed graph, cached per input hash"""
+        key = self.cache_key({'inputs': graph.inputs, 'max_points': max_points})
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        series = self.graph_series(graph, analysis, max_points)
+        result = {name: self._to_json(figure) for name, figure in (
+            ('cashflow', self.cashflow_figure(series['cashflow'])),
+            ('tax_impact', self.tax_impact_figure(series['tax_impact'])),
+            ('amortization', self.amortization_figure(series['amortization'])),
+            ('equity', self.equity_figure(series['equity']))
+        )}
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _to_json(figure):
+        # plotly.js applies its own defaults, the Python template isn't sent
+        figure.layout.template = None
+        return json.loads(figure.to_json())
+
+    @staticmethod
+    def _format_euros(value):
+        # French thousands separator, as Intl.NumberFormat('fr-FR')
+        return f"{abs(value):,.0f}".replace(',', '\u202f') + ' €'
+
+    @staticmethod
+    def _layout(**layout):
+        base = {
+            'showlegend': True,
+            'legend': {'orientation': 'h', 'y': -0.2},
+            'margin': {'t': 20, 'b': 80, 'l': 40, 'r': 40},
+            'height': 400,
+            'autosize': True
+        }
+        base.update(layout)
+        return base
+
+    def cashflow_figure(self, series):
+        trace = go.Waterfall(
+            name='Cash Flow',
+            orientation='v',
+            measure=series['measures'],
+            x=series['labels'],
+            y=series['values'],
+            text=[self._format_euros(value) for value in series['values']],
+            textposition='outside',
+            connector={'line': {'color': 'rgb(63, 63, 63)'}},
+            decreasing={'marker': {'color': self.EXPENSE_COLOR}},
+            increasing={'marker': {'color': self.INCOME_COLOR}},
+            totals={'marker': {'color': self.RESULT_COLOR}}
+        )
+        return go.Figure([trace], self._layout(
+            showlegend=False,
+            xaxis={'type': 'category', 'tickangle': -45},
+            yaxis={'title': 'Euros (€)', 'tickformat': ' ,.0f', 'automargin': True, 'hoverformat': ' ,.0f €'}
+        ))
+
+    def tax_impact_figure(self, series):
+        years = series['years']
+        traces = [go.Bar(x=years, y=series['rental_income'], name='Revenu Locatif', marker={'color': '#2ecc71'})]
+        traces += [go.Bar(x=years, y=deduction['values'], name=deduction['name'],
+                          marker={'color': deduction['color']})
+                   for deduction in series['deductions']]
+        lines = (('Revenu Net Imposable', 'taxable_income', {'color': '#8e44ad', 'width': 3}, 'y'),
+                 ('Impôts Totaux', 'total_tax', {'color': '#e67e22', 'width': 3}, 'y'),
+                 ('Taux Effectif (%)', 'effective_tax_rate', {'color': '#16a085', 'width': 3, 'dash': 'dot'}, 'y2'))
+        traces += [go.Scatter(x=years, y=series[key], name=name, mode='lines+markers', line=line,
+                              marker={'size': 8}, yaxis=axis)
+                   for name, key, line, axis in lines]
+        return go.Figure(traces, self._layout(
+            barmode='relative',
+            yaxis={'title': 'Montant (€)', 'tickformat': ',.0f', 'side': 'left'},
+            yaxis2={'title': 'Taux Effectif (%)', 'tickformat': ',.1f', 'overlaying': 'y', 'side': 'right',
+                    'rangemode': 'tozero'}
+        ))
+
+    def amortization_figure(self, series):
+        traces = [go.Scatter(x=series['principal']['x'], y=series['principal']['y'], name='Principal'),
+                  go.Scatter(x=series['interest']['x'], y=series['interest']['y'], name='Intérêts')]
+        return go.Figure(traces, self._layout(
+            xaxis={'title': 'Numéro de paiement', 'automargin': True},
+            yaxis={'title': 'Euros (€)', 'automargin': True, 'tickformat': ',.0f'}
+        ))
+
+    def equity_figure(self, series):
+        years = series['years']
+        lines = (('Valeur du bien', 'property_value', '#2ecc71'),
+                 ('Solde du prêt', 'loan_balance', '#e74c3c'),
+                 ('Fonds propres', 'equity', '#3498db'))
+        traces = [go.Scatter(x=years, y=series[key], name=name, mode='lines', line={'color': color})
+                  for name, key, color in lines]
+        term_years = years[-1] if years else 0
+        return go.Figure(traces, self._layout(
+            xaxis={'title': 'Années', 'tickformat': 'd', 'range': [0, term_years],
+                   'dtick': max(1, -(-term_years // 10)), 'automargin': True},
+            yaxis={'title': 'Montant (€)', 'tickformat': ',.0f',
+                   'range': [0, max(series['property_value'], default=0)], 'automargin': True}
+        ))
@@ -0,0 +1,101 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+class DepreciationModel:
+    """Component-based LMNP depreciation (amortissement par composants).
+
+    The purchase price is split into land, which is not depreciated, the
+    building, itself split into components with their own useful life, and
+    furniture; acquisition fees are depreciated as a separate component. Each
+    component is depreciated on a straight line from the acquisition month,
+    so the first year is prorated and the remainder falls in the year after
+    the component's last full year.
+
+    A schedule is a (components, years) matrix covering the whole life of
+    the longest component, zero afterwards. The fractions matrix only depends
+    on the acquisition month and is shared by every scenario; schedules of
+    scalar purchase structures are cached, so the tax computations of an
+    analysis and scenarios with the same purchase reuse the same matrix.
+    Cached matrices are read-only.
+    """
+
+    # (key, label, base, share of the base, useful life in years)
+    COMPONENTS = (
+        ('gros_oeuvre', 'Gros œuvre', 'building', 0.40, 50),
+        ('toiture', 'Toiture et façades', 'building', 0.20, 25),
+        ('installations', 'Installations techniques', 'building', 0.20, 20),
+        ('agencements', 'Agencements intérieurs', 'building', 0.20, 15),
+        ('mobilier', 'Mobilier', 'furniture', 1.0, 5),
+        ('frais', "Frais d'acquisition", 'fees', 1.0, 50)
+    )
+    LAND_SHARE = 0.20       # Share of the price for the land
+    FURNITURE_SHARE = 0.10  # Share of the price for the furniture
+    CACHE_SIZE = 1024
+
+    def __init__(self, land_share=LAND_SHARE, furniture_share=FURNITURE_SHARE, components=COMPONENTS):
+        if not 0 <= land_share + furniture_share <= 1:
+            raise ValueError("Land and furniture shares must add up to at most 1")
+        self.land_share = land_share
+        self.furniture_share = furniture_share
+        self.components = tuple(components)
+        self.keys = tuple(component[0] for component in self.components)
+        self.bases = np.array([component[2] for component in self.components])
+        self.durations = np.array([component[4] for component in self.components], dtype=float)
+        self.horizon = int(self.durations.max()) + 1  # One more year for the first-year prorata
+        self.fractions = lru_cache(maxsize=12)(self._fractions)
+        # Fractions of every acquisition month, indexed by month - 1 for per-scenario months
+        self.month_fractions = np.stack([self.fractions(month) for month in range(1, 13)])
+        self.month_fractions.setflags(write=False)
+        self._cached_schedule = lru_cache(maxsize=self.CACHE_SIZE)(self._schedule)
+
+    def _fractions(self, acquisition_month=1):
+        """(components, horizon) share of each component's value depreciated each year"""
+        start = (acquisition_month - 1) / 12  # Elapsed part of the first year at acquisition
+        years = np.arange(self.horizon)
+        end = start + self.durations[:, np.newaxis]
+        fractions = np.clip(np.minimum(years + 1, end) - np.maximum(years, start), 0, None) / \
+            self.durations[:, np.newaxis]
+        fractions.setflags(write=False)
+        return fractions
+
+    def component_values(self, purchase_price, notary_fees):
+        """(…, components) depreciable value of each component"""
+        purchase_price = np.asarray(purchase_price, dtype=float)
+        bases = {
+            'building': purchase_price * (1 - self.land_share - self.furniture_share),
+            'furniture': purchase_price * self.furniture_share,
+            'fees': np.asarray(notary_fees, dtype=float)
+        }
+        return np.stack([bases[base] * share for _, _, base, share, _ in self.components], axis=-1)
+
+    def schedule(self, purchase_price, notary_fees, acquisition_month=1):
+        """(…, components, horizon) depreciation matrix, scenarios first for array inputs"""
+        months = np.asarray(acquisition_month)
+        if np.any((months < 1) | (months > 12) | (months != np.round(months))):
+            raise ValueError("acquisition_month must be a month number between 1 and 12")
+        if months.ndim == 0 and np.ndim(purchase_price) == 0 and np.ndim(notary_fees) == 0:
+            return self._cached_schedule(float(purchase_price), float(notary_fees), int(months))
+        return self._schedule(purchase_price, notary_fees, months.astype(int))
+
+    def _schedule(self, purchase_price, notary_fees, acquisition_month):
+        if np.ndim(acquisition_month) == 0:
+            fractions = self.fractions(int(acquisition_month))
+        else:
+            fractions = self.month_fractions[acquisition_month - 1]
+        matrix = self.component_values(purchase_price, notary_fees)[..., np.newaxis] * fractions
+        matrix.setflags(write=False)
+        return matrix
+
+    @staticmethod
+    def per_year(values, years):
+        """First years of a (…, horizon) schedule, padded with zeros past its end"""
+        values = np.asarray(values, dtype=float)
+        if values.shape[-1] >= years:
+            return values[..., :years]
+        padding = np.zeros(values.shape[:-1] + (years - values.shape[-1],))
+        return np.concatenate([values, padding], axis=-1)
+
+    def cache_info(self):
+        return self._cached_schedule.cache_info()
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+from urllib.parse import quote
+
+from flask import Response
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+
+def store_content_addressed(path, prefix='receipt_'):
+    """Rename a generated file after the hash of its content, returning the new path"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    extension = os.path.splitext(path)[1]
+    target = os.path.join(os.path.dirname(path), f'{prefix}{digest.hexdigest()[:32]}{extension}')
+    os.replace(path, target)  # Same content, so an existing file with that name is identical
+    return target
+
+
+class DownloadServer:
+    """Download responses for the files of one directory.
+
+    Filenames are resolved inside the directory only, symlinks included.
+    Responses carry ETag and Last-Modified validators so repeat downloads get
+    a 304; files named after their content hash never change and are cached
+    as immutable. The body is either sent by the worker, with byte range
+    support, or left to the reverse proxy through X-Accel-Redirect (nginx) or
+    X-Sendfile (Apache, lighttpd), which then also serves the ranges.
+    """
+
+    OFFLOAD_MODES = ('x-accel', 'x-sendfile')
+    CONTENT_ADDRESSED = re.compile(r'[a-z_]*_([0-9a-f]{32,64})\.[a-z]+')
+    IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+    def __init__(self, directory, offload=None, accel_prefix='/protected/receipts/'):
+        if offload is not None and offload not in self.OFFLOAD_MODES:
+            raise ValueError(f"Unknown download offload: {offload}")
+        self.directory = os.path.realpath(directory)
+        self.offload = offload
+        self.accel_prefix = accel_prefix.rstrip('/') + '/'
+
+    def resolve(self, filename):
+        """Absolute path of a regular file inside the directory, None otherwise"""
+        path = safe_join(self.directory, filename)
+        if path is None:
+            return None
+        path = os.path.realpath(path)
+        if os.path.commonpath([path, self.directory]) != self.directory or not os.path.isfile(path):
+            return None
+        return path
+
+    def response(self, filename, environ, mimetype='application/pdf'):
+        """Download response for a file of the directory, None when there is no such file"""
+        path = self.resolve(filename)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        name = os.path.basename(path)
+        content_hash = self.CONTENT_ADDRESSED.fullmatch(name)
+        etag = content_hash.group(1) if content_hash else f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+        if self.offload is None:
+            response = send_file(path, environ, mimetype=mimetype, as_attachment=True, download_name=name,
+                                 conditional=True, etag=etag, last_modified=stat.st_mtime)
+        else:
+            response = Response(mimetype=mimetype)
+            response.headers['Content-Disposition'] = f'attachment; filename="{name}"'
+            response.headers['Accept-Ranges'] = 'bytes'
+            if self.offload == 'x-accel':
+                relative = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                response.headers['X-Accel-Redirect'] = self.accel_prefix + quote(relative)
+            else:
+                response.headers['X-Sendfile'] = path
+            response.set_etag(etag)
+            response.last_modified = stat.st_mtime
+            # 304 answered here, the proxy serves the body and its ranges
+            response.make_conditional(environ)
+
+        if content_hash:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = self.IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
@@ -0,0 +1,245 @@
+import csv
+import importlib.util
+import io
+import tempfile
+
+import numpy as np
+
+from models.validation import MAX_CASHFLOW_CELLS, cashflow_cells
+
+
+class Exporter:
+    """Spreadsheet exports of loan schedules and analysis results.
+
+    Every table is produced as its column names and a generator of chunks,
+    each chunk a dict of column values. CSV is streamed row by row from the
+    generator; XLSX and Parquet are written chunk by chunk to a temporary
+    file, so a multi-thousand-scenario export only holds one chunk in memory.
+    XLSX needs xlsxwriter or openpyxl, both used in their streaming mode;
+    Parquet needs pyarrow and gets a schema declared from the column names.
+    """
+
+    FORMATS = {
+        'csv': 'text/csv',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'parquet': 'application/vnd.apache.parquet'
+    }
+    TABLES = {
+        'loan-schedule': 'loan_schedule',
+        'yearly-tax': 'yearly_tax',
+        'holding-period': 'holding_period',
+        'solver-grid': 'solver_grid',
+        'scenarios': 'scenarios'
+    }
+    HOLDING_PERIOD_METRICS = ('irr', 'npv', 'equity_multiple', 'sale_price', 'remaining_balance',
+                              'capital_gains_tax', 'net_sale_proceeds')
+    BATCH_SIZE = 200         # Scenarios evaluated together for holding-period exports
+    CHUNK_ROWS = 10000       # Rows per chunk for flattened solver grids
+    FLUSH_BYTES = 64 * 1024  # CSV bytes sent per streamed block
+    # Parquet types of the non-float columns
+    COLUMN_TYPES = {
+        'payment_num': 'int64',
+        'year': 'int64',
+        'scenario': 'int64',
+        'exit_year': 'int64',
+        'id': 'int64',
+        'name': 'string',
+        'city': 'string',
+        'created_at': 'string',
+        'tax_regime': 'string'
+    }
+
+    def __init__(self, investment_calculator, loan_calculator, holding_period_analyzer, inverse_solver,
+                 scenario_store):
+        self.calculator = investment_calculator
+        self.loan_calculator = loan_calculator
+        self.holding_period_analyzer = holding_period_analyzer
+        self.inverse_solver = inverse_solver
+        self.scenario_store = scenario_store
+
+    @staticmethod
+    def available_formats():
+        """Export formats usable with the installed packages"""
+        formats = ['csv']
+        if importlib.util.find_spec('xlsxwriter') or importlib.util.find_spec('openpyxl'):
+            formats.append('xlsx')
+        if importlib.util.find_spec('pyarrow'):
+            formats.append('parquet')
+        return formats
+
+    def table(self, name, params):
+        """Column names and chunk generator of a table.
+
+        Parameters are read and checked here, before any row is produced, so
+        invalid requests fail before a streamed response has started.
+        """
+        if name not in self.TABLES:
+            raise ValueError(f"Unknown table: {name}")
+        return getattr(self, self.TABLES[name])(params)
+
+    @staticmethod
+    def _rows_table(rows):
+        """Table from a list of dicts sharing the same keys, as a single chunk"""
+        if not rows:
+            return [], iter(())
+        columns = list(rows[0])
+        return columns, iter([{column: [row[column] for row in rows] for column in columns}])
+
+    def loan_schedule(self, params):
+        """Monthly amortization schedule of a loan"""
+        return self._rows_table(self.loan_calculator.calculate_loan_metrics(params)['amortization_schedule'])
+
+    def yearly_tax(self, params):
+        """Yearly tax projection of an investment"""
+        return self._rows_table(self.calculator.analyze_investment(params)['yearly_tax_data'])
+
+    def holding_period(self, params):
+        """Holding-period metrics of one or many scenarios, one row per scenario and exit year"""
+        scenarios = [self.holding_period_analyzer.read_scenario(scenario)
+                     for scenario in params.get('scenarios', [params])]
+        max_exit_years = int(params.get('max_exit_years', 30))
+        discount_rate = float(params.get('discount_rate', 0.03))
+        if max_exit_years < 1:
+            raise ValueError("max_exit_years must be positive")
+        columns = ['scenario', 'exit_year'] + list(self.HOLDING_PERIOD_METRICS)
+
+        # Batches as large as one holding-period request at most, exports streaming several of them
+        batch_size = max(1, min(self.BATCH_SIZE, MAX_CASHFLOW_CELLS // cashflow_cells(1, max_exit_years)))
+
+        def chunks():
+            exit_years = np.arange(1, max_exit_years + 1)
+            for start in range(0, len(scenarios), batch_size):
+                batch = scenarios[start:start + batch_size]
+                arrays = {key: np.array([scenario[key] for scenario in batch]) for key in batch[0]}
+                evaluation = self.holding_period_analyzer.evaluate(arrays, exit_years, discount_rate)
+                chunk = {
+                    'scenario': np.repeat(np.arange(start, start + len(batch)), len(exit_years)),
+                    'exit_year': np.tile(exit_years, len(batch))
+                }
+                for metric in self.HOLDING_PERIOD_METRICS:
+                    chunk[metric] = np.broadcast_to(evaluation[metric], (len(batch), len(exit_years))).ravel()
+                yield chunk
+
+        return columns, chunks()
+
+    def solver_grid(self, params):
+        """Inverse solver results flattened to one row per input combination"""
+        inputs, result = self.inverse_solver.solve_arrays(params.get('solver'), params)
+        varying = [key for key, value in inputs.items() if np.ndim(value) > 0]
+        columns = varying + list(result)
+        arrays = np.broadcast_arrays(*[inputs[key] for key in varying], *result.values())
+        flat = [np.asarray(values).ravel() for values in arrays]
+
+        def chunks():
+            size = len(flat[0]) if flat else 0
+            for start in range(0, size, self.CHUNK_ROWS):
+                yield {column: values[start:start + self.CHUNK_ROWS] for column, values in zip(columns, flat)}
+
+        return columns, chunks()
+
+    def scenarios(self, params):
+        """Summaries of the saved scenarios matching the list filters"""
+        columns = ['id', 'name', 'city', 'created_at', 'purchase_price', 'rental_income', 'tax_regime',
+                   'gross_yield', 'roi', 'after_tax_roi', 'after_tax_monthly_cashflow', 'net_monthly_cashflow']
+
+        def chunks():
+            batch = []
+            for summary in self.scenario_store.iter_summaries(params):
+                batch.append(summary)
+                if len(batch) == self.BATCH_SIZE:
+                    yield {column: [row[column] for row in batch] for column in columns}
+                    batch = []
+            if batch:
+                yield {column: [row[column] for row in batch] for column in columns}
+
+        return columns, chunks()
+
+    @staticmethod
+    def _values(values):
+        """Column values as a list, undefined numbers becoming empty cells"""
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+            return np.where(np.isfinite(values), values, None).tolist()
+        return np.asarray(values).tolist() if isinstance(values, np.ndarray) else list(values)
+
+    def stream_csv(self, columns, chunks):
+        """Yield a CSV document as it is written row by row.
+
+        Rows are gathered into blocks of about FLUSH_BYTES so the server does
+        not issue one socket write per row.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            block = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return block
+
+        writer.writerow(columns)
+        for chunk in chunks:
+            for row in zip(*[self._values(chunk[column]) for column in columns]):
+                writer.writerow(row)
+                if buffer.tell() >= self.FLUSH_BYTES:
+                    yield flush()
+        yield flush()
+
+    def write_file(self, export_format, columns, chunks):
+        """Write an XLSX or Parquet export to a temporary file, returned rewound"""
+        if export_format not in self.FORMATS or export_format == 'csv':
+            raise ValueError(f"Unknown export format: {export_format}")
+        if export_format not in self.available_formats():
+            raise ValueError(f"Export format not available on this server: {export_format}")
+
+        output = tempfile.TemporaryFile()
+        if export_format == 'xlsx':
+            self._write_xlsx(output, columns, chunks)
+        else:
+            self._write_parquet(output, columns, chunks)
+        output.seek(0)
+        return output
+
+    def _rows(self, columns, chunks):
+        for chunk in chunks:
+            yield from zip(*[self._values(chunk[column]) for column in columns])
+
+    def _write_xlsx(self, output, columns, chunks):
+        if importlib.util.find_spec('xlsxwriter'):
+            import xlsxwriter
+
+            # Each row is flushed to a temporary file once the next one starts
+            workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'nan_inf_to_errors': True})
+            worksheet = workbook.add_worksheet()
+            worksheet.write_row(0, 0, columns)
+            for index, row in enumerate(self._rows(columns, chunks), 1):
+                worksheet.write_row(index, 0, row)
+            workbook.close()
+        else:
+            from openpyxl import Workbook
+
+            # Write-only workbooks stream their rows to a temporary file as well
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet()
+            worksheet.append(columns)
+            for row in self._rows(columns, chunks):
+                worksheet.append(row)
+            workbook.save(output)
+
+    def parquet_schema(self, columns):
+        """Arrow schema of a table, float64 unless listed in COLUMN_TYPES"""
+        import pyarrow as pa
+
+        return pa.schema([(column, pa.type_for_alias(self.COLUMN_TYPES.get(column, 'float64')))
+                          for column in columns])
+
+    def _write_parquet(self, output, columns, chunks):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Declared up front: a chunk of empty cells would otherwise fix a column to the null type
+        schema = self.parquet_schema(columns)
+        with pq.ParquetWriter(output, schema) as writer:
+            for chunk in chunks:
+                # One row group per chunk
+                writer.write_table(pa.table({column: self._values(chunk[column]) for column in columns},
+                                            schema=schema))
@@ -0,0 +1,273 @@
+import numpy as np
+
+
+class HoldingPeriodAnalyzer:
+    """IRR/NPV analysis of an investment held for a given number of years then sold.
+
+    For every scenario and exit year, the full monthly cash-flow vector is built:
+    deposit out at month 0, then rents minus expenses, loan payments and taxes,
+    and at exit the resale price minus resale fees, remaining principal and
+    plus-value tax. Scenarios and exit years are stacked into one
+    (scenarios, exit years, months) array and solved together.
+    """
+
+    # Plus-value immobilière des particuliers
+    CAPITAL_GAINS_INCOME_TAX_RATE = 0.19
+    CAPITAL_GAINS_SOCIAL_CHARGES_RATE = 0.172
+    ACQUISITION_FEES_FLAT_RATE = 0.075  # Forfait frais d'acquisition
+    WORKS_FLAT_RATE = 0.15              # Forfait travaux, after 5 years of holding
+
+    # Monthly rate bracket for the IRR solver, about -68% to +12875% per year
+    IRR_LOWER_BOUND = -0.09
+    IRR_UPPER_BOUND = 0.5
+
+    def __init__(self, investment_calculator):
+        self.calculator = investment_calculator
+        self.tax_engine = investment_calculator.tax_engine
+
+    def read_scenario(self, params):
+        """Extract holding-period inputs from request parameters, applying defaults"""
+        loan_data = params.get('loan_data') or {}
+        expenses = params.get('expenses', {})
+        notary_fees_rate = params.get('notary_fees_rate', 0.08)
+        total_cost = params['purchase_price'] * (1 + notary_fees_rate)
+        personal_deposit = params.get('personal_deposit', loan_data.get('personal_deposit'))
+        loan_amount = params.get('loan_amount', loan_data.get('loan_amount'))
+        # The deposit covers whatever the loan does not finance, the loan what the deposit does not
+        if personal_deposit is None:
+            personal_deposit = 0 if loan_amount is None else np.maximum(total_cost - np.asarray(loan_amount), 0)
+        if loan_amount is None:
+            loan_amount = total_cost - personal_deposit
+        return {
+            'purchase_price': params['purchase_price'],
+            'notary_fees_rate': notary_fees_rate,
+            'personal_deposit': personal_deposit,
+            'loan_amount': loan_amount,
+            'interest_rate': loan_data.get('interest_rate', params.get('interest_rate', 0)),
+            'term_years': loan_data.get('term_years', params.get('term_years', 20)),
+            'rental_income': params['rental_income'],
+            'monthly_expenses': expenses.get('total_monthly', 0),
+            'annual_expenses': self.calculator.calculate_annual_expenses(expenses),
+            'tax_regime': params.get('tax_regime', 'micro_bic'),
+            'tax_bracket': params.get('tax_bracket', 30),
+            'appreciation_rate': params.get('appreciation_rate', 2.0) / 100,
+            'resale_fees_rate': params.get('resale_fees_rate', 0),
+            'rent_indexation': params.get('rent_indexation', 0),
+            'expense_indexation': params.get('expense_indexation', 0),
+            'acquisition_month': params.get('acquisition_month', 1)
+        }
+
+    def analyze(self, params, max_exit_years=30, discount_rate=0.03):
+        """IRR, NPV and equity multiple of one scenario for every exit year up to max_exit_years"""
+        result = self.analyze_batch([params], max_exit_years, discount_rate)
+        return {key: values[0] if key != 'exit_years' else values for key, values in result.items()}
+
+    def analyze_batch(self, params_list, max_exit_years=30, discount_rate=0.03):
+        """IRR, NPV and equity multiple of many scenarios for every exit year up to max_exit_years"""
+        scenarios = [self.read_scenario(params) for params in params_list]
+        arrays = {key: np.array([scenario[key] for scenario in scenarios]) for key in scenarios[0]}
+        evaluation = self.evaluate(arrays, np.arange(1, max_exit_years + 1), discount_rate)
+        return {key: self._to_json(values) for key, values in evaluation.items()}
+
+    @staticmethod
+    def _to_json(values):
+        """Convert an array to nested lists, replacing undefined values with None"""
+        values = np.asarray(values, dtype=float)
+        return np.where(np.isfinite(values), values, None).tolist()
+
+    def evaluate(self, scenario, exit_years, discount_rate=0.03):
+        """Vectorized holding-period metrics as (scenarios, exit years) arrays"""
+        exit_years = np.asarray(exit_years)
+        flows = self.cash_flows(scenario, exit_years)
+        monthly_irr = self.irr(flows['flows'])
+        monthly_discount_rate = (1 + discount_rate) ** (1 / 12) - 1
+
+        inflows = np.where(flows['flows'] > 0, flows['flows'], 0).sum(axis=-1)
+        outflows = -np.where(flows['flows'] < 0, flows['flows'], 0).sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            equity_multiple = np.where(outflows > 0, inflows / outflows, np.nan)
+
+        return {
+            'exit_years': exit_years,
+            'irr': (1 + monthly_irr) ** 12 - 1,
+            'npv': self.npv(monthly_discount_rate, flows['flows']),
+            'equity_multiple': equity_multiple,
+            'sale_price': flows['sale_price'],
+            'remaining_balance': flows['remaining_balance'],
+            'capital_gains_tax': flows['capital_gains_tax'],
+            'net_sale_proceeds': flows['net_sale_proceeds']
+        }
+
+    def cash_flows(self, scenario, exit_years):
+        """Build monthly cash flows as a (scenarios, exit years, months + 1) array"""
+        exit_years = np.asarray(exit_years)
+        num_years = int(exit_years.max())
+        num_months = num_years * 12
+        months = np.arange(1, num_months + 1)
+        year_index = (months - 1) // 12
+
+        # Loan schedule in closed form
+        principal = scenario['loan_amount'][:, np.newaxis].astype(float)
+        monthly_rate = scenario['interest_rate'][:, np.newaxis] / 12
+        num_payments = scenario['term_years'][:, np.newaxis] * 12
+        payment = self.annuity_payment(principal, monthly_rate, num_payments)
+        balance = self.remaining_balance(principal, monthly_rate, payment, np.minimum(months, num_payments))
+        previous_balance = self.remaining_balance(principal, monthly_rate, payment,
+                                                  np.minimum(months - 1, num_payments))
+        monthly_interest = np.where(months <= num_payments, previous_balance * monthly_rate, 0)
+        loan_payments = np.where(months <= num_payments, payment, 0)
+
+        # Yearly taxes, spread evenly over the months of each year
+        depreciation = self.calculator.calculate_depreciation(
+            scenario['purchase_price'],
+            scenario['purchase_price'] * scenario['notary_fees_rate'],
+            scenario.get('acquisition_month', 1)
+        )
+        yearly_depreciation = self.calculator.depreciation_model.per_year(depreciation['yearly'], num_years)
+        # The furniture is not reintegrated into capital gains
+        building_depreciation = yearly_depreciation - \
+            self.calculator.depreciation_model.per_year(depreciation['furniture_yearly'], num_years)
+        taxes = self.tax_engine.project(
+            scenario['rental_income'],
+            scenario['annual_expenses'],
+            self.tax_engine.yearly_interest(monthly_interest, num_years),
+            yearly_depreciation,
+            years=num_years,
+            regime=scenario['tax_regime'],
+            tax_bracket=scenario['tax_bracket'],
+            rent_indexation=scenario['rent_indexation'],
+            expense_indexation=scenario['expense_indexation'],
+            building_depreciation=building_depreciation
+        )
+
+        rents = taxes['rental_income'][:, year_index] / 12
+        expenses = scenario['monthly_expenses'][:, np.newaxis] * \
+            self.tax_engine.indexation_factors(scenario['expense_indexation'], num_years)[:, year_index]
+        operating = rents - expenses - loan_payments - taxes['total_tax'][:, year_index] / 12
+
+        # Resale at the end of each exit year
+        exit_index = exit_years - 1
+        sale_price = scenario['purchase_price'][:, np.newaxis] * \
+            (1 + scenario['appreciation_rate'][:, np.newaxis]) ** exit_years
+        net_sale_price = sale_price * (1 - scenario['resale_fees_rate'][:, np.newaxis])
+        remaining_balance = balance[:, exit_years * 12 - 1]
+
+        # Building depreciation deducted under the régime réel, deferred amounts included, is added back
+        reintegrated = np.cumsum(taxes['building_depreciation_used'], axis=1)[:, exit_index]
+        capital_gains_tax = self.capital_gains_tax(
+            scenario['purchase_price'][:, np.newaxis],
+            scenario['purchase_price'][:, np.newaxis] * scenario['notary_fees_rate'][:, np.newaxis],
+            net_sale_price,
+            exit_years,
+            reintegrated
+        )
+        net_sale_proceeds = net_sale_price - remaining_balance - capital_gains_tax
+
+        # Stack one cash-flow vector per exit year, zero after the exit month
+        month_axis = np.arange(num_months + 1)
+        exit_months = exit_years * 12
+        flows = np.zeros((len(principal), len(exit_years), num_months + 1))
+        flows[:, :, 0] = -scenario['personal_deposit'][:, np.newaxis]
+        flows[:, :, 1:] = np.where(months <= exit_months[:, np.newaxis], operating[:, np.newaxis, :], 0)
+        flows += np.where(month_axis == exit_months[:, np.newaxis], 1, 0) * net_sale_proceeds[:, :, np.newaxis]
+
+        return {
+            'flows': flows,
+            'sale_price': sale_price,
+            'remaining_balance': remaining_balance,
+            'capital_gains_tax': capital_gains_tax,
+            'net_sale_proceeds': net_sale_proceeds
+        }
+
+    @staticmethod
+    def annuity_payment(principal, monthly_rate, num_payments):
+        """Annuity payment, vectorized over scenarios"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = (1 + monthly_rate) ** num_payments
+            payment = np.where(monthly_rate == 0, principal / num_payments,
+                               principal * monthly_rate * growth / (growth - 1))
+        return np.where(num_payments > 0, payment, 0)
+
+    @staticmethod
+    def remaining_balance(principal, monthly_rate, payment, month):
+        """Remaining principal after the given number of payments"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = (1 + monthly_rate) ** month
+            balance = np.where(monthly_rate == 0, principal - payment * month,
+                               principal * growth - payment * (growth - 1) / monthly_rate)
+        return np.maximum(balance, 0)
+
+    def capital_gains_tax(self, purchase_price, notary_fees, net_sale_price, years_held, reintegrated=0):
+        """Plus-value tax with holding-period abatements, vectorized over exit years"""
+        years_held = np.asarray(years_held)
+        acquisition_fees = np.maximum(notary_fees, purchase_price * self.ACQUISITION_FEES_FLAT_RATE)
+        works = np.where(years_held > 5, purchase_price * self.WORKS_FLAT_RATE, 0)
+        gain = np.maximum(net_sale_price - (purchase_price + acquisition_fees + works - reintegrated), 0)
+
+        extra_years = np.clip(years_held - 5, 0, None)
+        income_tax_abatement = np.where(years_held >= 22, 1.0, 0.06 * np.minimum(extra_years, 16))
+        social_abatement = np.where(
+            years_held >= 30, 1.0,
+            0.0165 * np.minimum(extra_years, 16) + np.where(years_held >= 22, 0.016, 0) +
+            0.09 * np.clip(years_held - 22, 0, None)
+        )
+
+        return gain * (1 - income_tax_abatement) * self.CAPITAL_GAINS_INCOME_TAX_RATE + \
+            gain * (1 - social_abatement) * self.CAPITAL_GAINS_SOCIAL_CHARGES_RATE
+
+    @staticmethod
+    def npv(rate, flows):
+        """Net present value of monthly cash flows along the last axis"""
+        discount = (1 + np.asarray(rate, dtype=float)[..., np.newaxis]) ** -np.arange(flows.shape[-1])
+        return (flows * discount).sum(axis=-1)
+
+    @classmethod
+    def irr(cls, flows, tolerance=1e-10, max_iterations=100):
+        """Monthly IRR along the last axis with a bracketed Newton solver.
+
+        Newton steps are taken while they stay inside the current bracket and
+        fall back to bisection otherwise; rows without a sign change in the
+        bracket get NaN.
+        """
+        shape = flows.shape[:-1]
+        flows = flows.reshape(-1, flows.shape[-1])
+        periods = np.arange(flows.shape[-1])
+        scale = np.abs(flows).sum(axis=-1)
+
+        def evaluate(rate, rows):
+            discount = (1 + rate[:, np.newaxis]) ** -periods
+            value = (flows[rows] * discount).sum(axis=-1)
+            derivative = -(flows[rows] * periods * discount).sum(axis=-1) / (1 + rate)
+            return value, derivative
+
+        all_rows = np.arange(len(flows))
+        lower = np.full(len(flows), cls.IRR_LOWER_BOUND)
+        upper = np.full(len(flows), cls.IRR_UPPER_BOUND)
+        lower_value, _ = evaluate(lower, all_rows)
+        upper_value, _ = evaluate(upper, all_rows)
+        bracketed = np.sign(lower_value) * np.sign(upper_value) < 0
+
+        rate = np.full(len(flows), 0.005)
+        active = np.flatnonzero(bracketed)
+        for _ in range(max_iterations):
+            if not len(active):
+                break
+            value, derivative = evaluate(rate[active], active)
+            at_root = np.abs(value) <= tolerance * scale[active]
+
+            # Shrink the bracket around the root
+            same_side = np.sign(value) == np.sign(lower_value[active])
+            lower[active] = np.where(same_side, rate[active], lower[active])
+            lower_value[active] = np.where(same_side, value, lower_value[active])
+            upper[active] = np.where(same_side, upper[active], rate[active])
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                candidate = rate[active] - value / derivative
+            inside = np.isfinite(candidate) & (candidate > lower[active]) & (candidate < upper[active])
+            step = np.where(inside, candidate, (lower[active] + upper[active]) / 2)
+            rate[active] = np.where(at_root, rate[active], step)
+
+            converged = at_root | (upper[active] - lower[active] <= tolerance)
+            active = active[~converged]
+
+        return np.where(bracketed, rate, np.nan).reshape(shape)
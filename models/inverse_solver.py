@@ -0,0 +1,223 @@
+import numpy as np
+
+from models.validation import ValidationError
+
+
+class InverseSolver:
+    """Inverse questions on the loan and cash-flow models.
+
+    The annuity formula and the before-tax cash-flow are inverted in closed
+    form; the after-tax cash-flow, whose tax depends on price through interest
+    and depreciation, is inverted with a vectorized bisection. Every argument
+    may be a scalar or an array, and arrays broadcast against each other so a
+    whole grid of income or rate assumptions is solved in one call.
+    """
+
+    HCSF_DEBT_RATIO = 0.35        # Taux d'endettement maximal, assurance comprise
+    RENTAL_INCOME_WEIGHT = 0.7    # Part des loyers retenue par les banques
+    BISECTION_ITERATIONS = 60
+
+    # Request parameters accepted by each solver
+    SOLVERS = {
+        'borrowing-capacity': ('borrowing_capacity', ('monthly_income', 'interest_rate', 'term_years',
+                                                      'existing_debts', 'debt_ratio', 'insurance_rate',
+                                                      'rental_income')),
+        'max-price-yield': ('max_price_for_yield', ('rental_income', 'target_yield', 'monthly_expenses',
+                                                    'notary_fees_rate', 'net')),
+        'max-price-cashflow': ('max_price_for_cashflow', ('rental_income', 'monthly_expenses', 'target_cashflow',
+                                                          'interest_rate', 'term_years', 'personal_deposit',
+                                                          'notary_fees_rate', 'after_tax', 'tax_regime',
+                                                          'tax_bracket', 'annual_expenses')),
+        'min-deposit': ('min_deposit', ('purchase_price', 'rental_income', 'monthly_expenses', 'target_cashflow',
+                                        'interest_rate', 'term_years', 'notary_fees_rate', 'monthly_income',
+                                        'existing_debts', 'debt_ratio', 'insurance_rate'))
+    }
+    FLAGS = ('net', 'after_tax')
+
+    def __init__(self, investment_calculator):
+        self.calculator = investment_calculator
+        self.tax_engine = investment_calculator.tax_engine
+
+    def solve(self, solver, params):
+        """Run a solver on request parameters.
+
+        Each parameter is a scalar or a list. With 'grid' set, every list gets
+        its own axis so the result covers all combinations; otherwise lists are
+        matched element by element.
+        """
+        _, result = self.solve_arrays(solver, params)
+        return {key: self._to_json(values) for key, values in result.items()}
+
+    def solve_arrays(self, solver, params):
+        """Run a solver on request parameters, returning the shaped inputs and the result arrays"""
+        if solver not in self.SOLVERS:
+            raise ValueError(f"Unknown solver: {solver}")
+        method_name, accepted = self.SOLVERS[solver]
+
+        kwargs = {}
+        # Flags are single switches, never an axis of the result
+        list_params = [key for key in accepted if key not in self.FLAGS and isinstance(params.get(key), list)]
+        if not params.get('grid'):
+            lengths = {len(params[key]) for key in list_params}
+            if len(lengths) > 1:
+                raise ValidationError("les listes doivent avoir la même longueur, ou 'grid' être activé",
+                                      [list_params[0]])
+        for key in accepted:
+            if key not in params:
+                continue
+            value = params[key] if key in self.FLAGS else np.asarray(params[key])
+            if params.get('grid') and key in list_params:
+                shape = [1] * len(list_params)
+                shape[list_params.index(key)] = -1
+                value = value.reshape(shape)
+            kwargs[key] = value
+
+        result = getattr(self, method_name)(**kwargs)
+        if not isinstance(result, dict):
+            result = {'purchase_price': result}
+        # Inputs the result does not depend on still give it their axis, e.g. tax_regime before tax
+        shape = np.broadcast_shapes(*(np.shape(kwargs[key]) for key in list_params))
+        return kwargs, {key: np.broadcast_to(values, np.broadcast_shapes(np.shape(values), shape))
+                        for key, values in result.items()}
+
+    @staticmethod
+    def _to_json(values):
+        """Convert an array to a number or nested lists, replacing undefined values with None"""
+        values = np.asarray(values, dtype=float)
+        return np.where(np.isfinite(values), values, None).tolist()
+
+    @staticmethod
+    def annuity_factor(interest_rate, term_years):
+        """Monthly payment per unit of principal"""
+        monthly_rate = np.asarray(interest_rate, dtype=float) / 12
+        num_payments = np.asarray(term_years, dtype=float) * 12
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = monthly_rate / (1 - (1 + monthly_rate) ** -num_payments)
+        return np.where(monthly_rate == 0, 1 / num_payments, factor)
+
+    def borrowing_capacity(self, monthly_income, interest_rate, term_years, existing_debts=0,
+                           debt_ratio=HCSF_DEBT_RATIO, insurance_rate=0, rental_income=0):
+        """Maximum loan given income, existing monthly debts and a target debt ratio.
+
+        insurance_rate is the yearly borrower insurance as a share of the initial
+        capital; rental_income is the expected monthly rent of the new property,
+        counted at RENTAL_INCOME_WEIGHT.
+        """
+        income = np.asarray(monthly_income, dtype=float) + \
+            self.RENTAL_INCOME_WEIGHT * np.asarray(rental_income, dtype=float)
+        max_payment = np.maximum(income * debt_ratio - np.asarray(existing_debts, dtype=float), 0)
+        loan_amount = max_payment / (self.annuity_factor(interest_rate, term_years) +
+                                     np.asarray(insurance_rate, dtype=float) / 12)
+        return {
+            'max_monthly_payment': max_payment,
+            'loan_amount': loan_amount
+        }
+
+    @staticmethod
+    def max_price_for_yield(rental_income, target_yield, monthly_expenses=0, notary_fees_rate=0.08, net=False):
+        """Maximum purchase price reaching a target yield, in percent.
+
+        The gross yield is annual rent over purchase price; the net yield is
+        annual rent minus expenses over total cost, notary fees included.
+        """
+        target_yield = np.asarray(target_yield, dtype=float) / 100
+        if np.any(target_yield <= 0):
+            raise ValidationError('doit être strictement positif', ['target_yield'])
+        annual_rent = np.asarray(rental_income, dtype=float) * 12
+        if not net:
+            return annual_rent / target_yield
+        annual_net_income = annual_rent - np.asarray(monthly_expenses, dtype=float) * 12
+        return annual_net_income / (target_yield * (1 + np.asarray(notary_fees_rate, dtype=float)))
+
+    def max_price_for_cashflow(self, rental_income, monthly_expenses, target_cashflow, interest_rate, term_years,
+                               personal_deposit=0, notary_fees_rate=0.08, after_tax=False,
+                               tax_regime='micro_bic', tax_bracket=30, annual_expenses=None):
+        """Maximum purchase price whose monthly cash-flow after loan payment reaches the target.
+
+        Before tax, the loan is the available payment divided by the annuity
+        factor. After tax, the first-year tax is included and the price is
+        found by bisection below the before-tax price, since taxes only lower
+        the cash-flow.
+        """
+        notary_fees_rate = np.asarray(notary_fees_rate, dtype=float)
+        available_payment = np.asarray(rental_income, dtype=float) - \
+            np.asarray(monthly_expenses, dtype=float) - np.asarray(target_cashflow, dtype=float)
+        loan_amount = np.maximum(available_payment, 0) / self.annuity_factor(interest_rate, term_years)
+        price = (loan_amount + np.asarray(personal_deposit, dtype=float)) / (1 + notary_fees_rate)
+        if not after_tax:
+            return price
+
+        args = np.broadcast_arrays(price, rental_income, monthly_expenses, target_cashflow, interest_rate,
+                                   term_years, personal_deposit, notary_fees_rate, tax_regime, tax_bracket,
+                                   annual_expenses if annual_expenses is not None
+                                   else np.asarray(monthly_expenses, dtype=float) * 12)
+        shape = args[0].shape
+        (upper, rental_income, monthly_expenses, target_cashflow, interest_rate, term_years, personal_deposit,
+         notary_fees_rate, tax_regime, tax_bracket, annual_expenses) = [np.ravel(arg) for arg in args]
+
+        def shortfall(candidate_price):
+            cashflow = self.monthly_cashflow(candidate_price, rental_income, monthly_expenses, interest_rate,
+                                             term_years, personal_deposit, notary_fees_rate, tax_regime,
+                                             tax_bracket, annual_expenses)
+            return cashflow - target_cashflow
+
+        lower = np.zeros_like(upper)
+        feasible = shortfall(lower) >= 0
+        for _ in range(self.BISECTION_ITERATIONS):
+            middle = (lower + upper) / 2
+            reached = shortfall(middle) >= 0
+            lower = np.where(reached, middle, lower)
+            upper = np.where(reached, upper, middle)
+        return np.where(feasible, lower, np.nan).reshape(shape)
+
+    def monthly_cashflow(self, purchase_price, rental_income, monthly_expenses, interest_rate, term_years,
+                         personal_deposit=0, notary_fees_rate=0.08, tax_regime='micro_bic', tax_bracket=30,
+                         annual_expenses=None):
+        """First-year monthly cash-flow after loan payment and taxes, vectorized over scenarios"""
+        purchase_price = np.atleast_1d(np.asarray(purchase_price, dtype=float))
+        notary_fees = purchase_price * notary_fees_rate
+        loan_amount = np.maximum(purchase_price + notary_fees - personal_deposit, 0)
+        factor = self.annuity_factor(interest_rate, term_years)
+        payment = loan_amount * factor
+
+        # First-year interest in closed form
+        monthly_rate = np.asarray(interest_rate, dtype=float) / 12
+        first_year_principal = np.where(
+            monthly_rate == 0, payment * 12,
+            (payment - loan_amount * monthly_rate) * ((1 + monthly_rate) ** 12 - 1) /
+            np.where(monthly_rate == 0, 1, monthly_rate)
+        )
+        first_year_interest = payment * 12 - np.minimum(first_year_principal, loan_amount)
+
+        depreciation = self.calculator.calculate_depreciation(purchase_price, notary_fees)
+        if annual_expenses is None:
+            annual_expenses = np.asarray(monthly_expenses, dtype=float) * 12
+        taxes = self.tax_engine.project(
+            rental_income,
+            annual_expenses,
+            first_year_interest[:, np.newaxis],
+            depreciation['full_year'][:, np.newaxis],
+            years=1,
+            regime=tax_regime,
+            tax_bracket=tax_bracket
+        )
+        return rental_income - monthly_expenses - payment - taxes['total_tax'][:, 0] / 12
+
+    def min_deposit(self, purchase_price, rental_income, monthly_expenses, target_cashflow, interest_rate,
+                    term_years, notary_fees_rate=0.08, monthly_income=None, existing_debts=0,
+                    debt_ratio=HCSF_DEBT_RATIO, insurance_rate=0):
+        """Minimum personal deposit reaching the target before-tax cash-flow and, when income is given,
+        keeping the debt ratio under the limit"""
+        total_cost = np.asarray(purchase_price, dtype=float) * (1 + np.asarray(notary_fees_rate, dtype=float))
+        available_payment = np.asarray(rental_income, dtype=float) - \
+            np.asarray(monthly_expenses, dtype=float) - np.asarray(target_cashflow, dtype=float)
+        max_loan = np.maximum(available_payment, 0) / self.annuity_factor(interest_rate, term_years)
+        if monthly_income is not None:
+            capacity = self.borrowing_capacity(monthly_income, interest_rate, term_years, existing_debts,
+                                               debt_ratio, insurance_rate, rental_income)
+            max_loan = np.minimum(max_loan, capacity['loan_amount'])
+        deposit = np.clip(total_cost - max_loan, 0, total_cost)
+        return {
+            'personal_deposit': deposit,
+            'loan_amount': total_cost - deposit
+        }
@@ -1,10 +1,26 @@
+import numpy as np
+
+from models.analysis_graph import AnalysisGraph
+from models.depreciation import DepreciationModel
+from models.tax_engine import TaxEngine
+
+
 class InvestmentCalculator:
+    # Keys of each yearly_tax_data entry, per regime
+    MICRO_BIC_YEARLY_KEYS = ('rental_income', 'taxable_income', 'income_tax', 'social_charges', 'total_tax',
+                             'deductions', 'effective_tax_rate')
+    REEL_YEARLY_KEYS = MICRO_BIC_YEARLY_KEYS + ('interest_deduction', 'depreciation_deduction',
+                                                'expenses_deduction', 'depreciation_used', 'deficit_used',
+                                                'deficit_carryforward', 'depreciation_carryforward')
+
     def __init__(self):
         self.tax_regimes = {
             'micro_bic': {'rate': 0.5},  # 50% abattement
             'reel': {'rate': 1.0}  # Pas d'abattement, charges réelles
         }
         self.social_charges_rate = 0.172  # 17.2% prélèvements sociaux
+        self.tax_engine = TaxEngine(self.tax_regimes['micro_bic']['rate'], self.social_charges_rate)
+        self.depreciation_model = DepreciationModel()
         
     def calculate_purchase_costs(self, purchase_price, notary_fees_rate=0.08):
         """Calculate total purchase costs including notary fees"""
@@ -26,19 +42,62 @@ class InvestmentCalculator:
             return 0
         return (annual_cashflow / total_investment) * 100
     
-    def calculate_depreciation(self, purchase_price, notary_fees):
-        """Calculate annual depreciation amounts"""
-        building_value = purchase_price * 0.8  # Assume 80% of price is building
-        land_value = purchase_price * 0.2      # Assume 20% of price is land
-        
+    def calculate_depreciation(self, purchase_price, notary_fees, acquisition_month=1):
+        """Calculate the component depreciation schedule, with yearly totals and first-year amounts.
+
+        'total' is the first year's depreciation, prorated from the acquisition
+        month; 'full_year' is a whole year of it, used by the headline metrics.
+        """
+        model = self.depreciation_model
+        matrix = model.schedule(purchase_price, notary_fees, acquisition_month)
+        yearly = matrix.sum(axis=-2)
+        furniture_yearly = matrix[..., model.bases == 'furniture', :].sum(axis=-2)
+
         return {
-            'building': building_value * 0.02,  # 2% annual depreciation for building
-            'notary_fees': notary_fees * 0.02,  # 2% annual depreciation for notary fees
-            'furniture': purchase_price * 0.1 * 0.2,  # 20% depreciation on 10% furniture value
-            'total': (building_value * 0.02) + (notary_fees * 0.02) + (purchase_price * 0.1 * 0.2)
+            'matrix': matrix,                      # (components, years) from the acquisition year
+            'yearly': yearly,
+            'furniture_yearly': furniture_yearly,  # Not reintegrated into capital gains
+            'building': matrix[..., model.bases == 'building', 0].sum(axis=-1),
+            'notary_fees': matrix[..., model.bases == 'fees', 0].sum(axis=-1),
+            'furniture': furniture_yearly[..., 0],
+            'total': yearly[..., 0],
+            'full_year': (matrix.sum(axis=-1) / model.durations).sum(axis=-1)
         }
-    
-    def calculate_tax_impact(self, rental_income, expenses, regime='micro_bic', tax_bracket=30, loan_interest=0):
+
+    def calculate_annual_expenses(self, expenses):
+        """Calculate deductible yearly expenses, excluding loan interest"""
+        yearly_expenses = {
+            'management_fees': expenses.get('management_fees', 0) * 12,
+            'property_tax': expenses.get('property_tax', 0),  # Already annual
+            'insurance': expenses.get('insurance', 0) * 12,
+            'maintenance': expenses.get('maintenance', 0) * 12,
+            'condo_fees': expenses.get('condo_fees', 0) * 12,
+            'other': expenses.get('other', 0) * 12
+        }
+        return sum(yearly_expenses.values())
+
+    def calculate_expense_breakdown(self, expenses):
+        """Calculate monthly expense breakdown"""
+        return {
+            'management_fees': expenses.get('management_fees', 0),
+            'property_tax': expenses.get('property_tax', 0) / 12,  # Convert to monthly
+            'insurance': expenses.get('insurance', 0),
+            'maintenance': expenses.get('maintenance', 0),
+            'condo_fees': expenses.get('condo_fees', 0),
+            'other': expenses.get('other', 0),
+            'total_monthly': expenses.get('total_monthly', 0)
+        }
+
+    def calculate_yearly_interest(self, amortization_schedule, years=None):
+        """Sum loan interest per year of the amortization schedule (full years only by default)"""
+        monthly_interest = np.fromiter((entry['interest'] for entry in amortization_schedule),
+                                       dtype=float, count=len(amortization_schedule))
+        if years is None:
+            years = len(monthly_interest) // 12
+        return self.tax_engine.yearly_interest(monthly_interest, years)
+
+    def calculate_tax_impact(self, rental_income, expenses, regime='micro_bic', tax_bracket=30, loan_interest=0,
+                             depreciation=None):
         """Calculate taxable income and tax amount based on regime and tax bracket"""
         annual_rental_income = rental_income * 12
         tax_bracket_rate = tax_bracket / 100
@@ -58,13 +117,14 @@ class InvestmentCalculator:
                 'loan_interest': loan_interest * 12
             }
             
-            # Calculate depreciation
-            depreciation = self.calculate_depreciation(
-                expenses.get('purchase_price', 0),
-                expenses.get('notary_fees', 0)
-            )
+            # Calculate depreciation unless already known
+            if depreciation is None:
+                depreciation = self.calculate_depreciation(
+                    expenses.get('purchase_price', 0),
+                    expenses.get('notary_fees', 0)
+                )
             
-            total_annual_expenses = sum(annual_expenses.values()) + depreciation['total']
+            total_annual_expenses = sum(annual_expenses.values()) + depreciation['full_year']
             taxable_income = max(0, annual_rental_income - total_annual_expenses)
         
         # Calculate taxes
@@ -82,91 +142,48 @@ class InvestmentCalculator:
             'effective_tax_rate': (total_tax / annual_rental_income * 100) if annual_rental_income > 0 else 0
         }
     
-    def calculate_yearly_tax_impact(self, rental_income, expenses, loan_data, regime='micro_bic', tax_bracket=30):
-        """Calculate tax impact for each year of the investment, considering decreasing interest payments"""
-        tax_bracket_rate = tax_bracket / 100
-        yearly_tax_data = []
-        
-        # Calculate constant yearly depreciation
-        depreciation = self.calculate_depreciation(
-            expenses.get('purchase_price', 0),
-            expenses.get('notary_fees', 0)
+    def calculate_yearly_tax_impact(self, rental_income, expenses, loan_data, regime='micro_bic', tax_bracket=30,
+                                    depreciation=None, yearly_interest=None, years=None,
+                                    rent_indexation=0, expense_indexation=0):
+        """Calculate tax impact for each year of the investment, considering decreasing interest payments,
+        indexation and the carry-forward of deficits and unused depreciation"""
+        if years is None:
+            years = loan_data['term_years']
+
+        # Calculate the depreciation schedule unless already known
+        if depreciation is None:
+            depreciation = self.calculate_depreciation(
+                expenses.get('purchase_price', 0),
+                expenses.get('notary_fees', 0)
+            )
+
+        # Get yearly interest payments from amortization schedule
+        if yearly_interest is None:
+            yearly_interest = self.calculate_yearly_interest(loan_data.get('amortization_schedule', []), years)
+        interest = np.zeros(years)
+        known_years = min(years, len(yearly_interest))
+        interest[:known_years] = yearly_interest[:known_years]
+
+        projection = self.tax_engine.project(
+            rental_income,
+            self.calculate_annual_expenses(expenses),
+            interest,
+            self.depreciation_model.per_year(depreciation['yearly'], years),
+            years=years,
+            regime=regime,
+            tax_bracket=tax_bracket,
+            rent_indexation=rent_indexation,
+            expense_indexation=expense_indexation
         )
-        yearly_depreciation = depreciation['total']
-        
-        # Get yearly expenses (excluding loan interest)
-        yearly_expenses = {
-            'management_fees': expenses.get('management_fees', 0) * 12,
-            'property_tax': expenses.get('property_tax', 0),  # Already annual
-            'insurance': expenses.get('insurance', 0) * 12,
-            'maintenance': expenses.get('maintenance', 0) * 12,
-            'condo_fees': expenses.get('condo_fees', 0) * 12,
-            'other': expenses.get('other', 0) * 12
-        }
-        constant_yearly_expenses = sum(yearly_expenses.values())
-        annual_rental_income = rental_income * 12
-        
+
         if regime == 'micro_bic':
-            # Micro-BIC: flat 50% deduction, same every year
-            for year in range(loan_data['term_years']):
-                taxable_income = annual_rental_income * (1 - self.tax_regimes['micro_bic']['rate'])
-                income_tax = taxable_income * tax_bracket_rate
-                social_charges = taxable_income * self.social_charges_rate
-                
-                yearly_tax_data.append({
-                    'year': year + 1,
-                    'taxable_income': taxable_income,
-                    'income_tax': income_tax,
-                    'social_charges': social_charges,
-                    'total_tax': income_tax + social_charges,
-                    'deductions': annual_rental_income * self.tax_regimes['micro_bic']['rate'],
-                    'effective_tax_rate': ((income_tax + social_charges) / annual_rental_income * 100) if annual_rental_income > 0 else 0
-                })
+            keys = self.MICRO_BIC_YEARLY_KEYS
         else:  # régime réel
-            # Get yearly interest payments from amortization schedule
-            yearly_interest = []
-            current_year_interest = 0
-            payment_num = 0
-            
-            for entry in loan_data['amortization_schedule']:
-                current_year_interest += entry['interest']
-                payment_num += 1
-                
-                if payment_num % 12 == 0:
-                    yearly_interest.append(current_year_interest)
-                    current_year_interest = 0
-            
-            # Calculate tax impact for each year
-            for year in range(loan_data['term_years']):
-                # Total deductions for this year
-                year_interest = yearly_interest[year] if year < len(yearly_interest) else 0
-                total_deductions = (
-                    constant_yearly_expenses +
-                    yearly_depreciation +
-                    year_interest
-                )
-                
-                # Calculate taxable income (can't be negative in real life)
-                taxable_income = max(0, annual_rental_income - total_deductions)
-                income_tax = taxable_income * tax_bracket_rate
-                social_charges = taxable_income * self.social_charges_rate
-                
-                yearly_tax_data.append({
-                    'year': year + 1,
-                    'taxable_income': taxable_income,
-                    'income_tax': income_tax,
-                    'social_charges': social_charges,
-                    'total_tax': income_tax + social_charges,
-                    'deductions': total_deductions,
-                    'interest_deduction': year_interest,
-                    'depreciation_deduction': yearly_depreciation,
-                    'expenses_deduction': constant_yearly_expenses,
-                    'effective_tax_rate': ((income_tax + social_charges) / annual_rental_income * 100) if annual_rental_income > 0 else 0
-                })
-        
-        return yearly_tax_data
-    
-    def calculate_total_roi(self, params, annual_cashflow, total_investment, loan_data=None):
+            keys = self.REEL_YEARLY_KEYS
+        columns = [range(1, years + 1)] + [projection[key][0].tolist() for key in keys]
+        return [dict(zip(('year',) + keys, row)) for row in zip(*columns)]
+
+    def calculate_total_roi(self, params, annual_cashflow, total_investment, loan_data=None, depreciation=None):
         """Calculate comprehensive Return on Investment including all components"""
         # 1. Cash Flow Return (already annualized)
         cash_flow_roi = (annual_cashflow / total_investment) * 100 if total_investment > 0 else 0
@@ -191,10 +208,11 @@ class InvestmentCalculator:
         tax_benefits = 0
         if params.get('tax_regime') == 'reel':
             # Include depreciation benefit
-            depreciation = self.calculate_depreciation(params['purchase_price'], 
-                                                     total_investment - params['purchase_price'])
+            if depreciation is None:
+                depreciation = self.calculate_depreciation(params['purchase_price'],
+                                                           total_investment - params['purchase_price'])
             tax_bracket = params.get('tax_bracket', 30) / 100
-            annual_tax_savings = depreciation['total'] * tax_bracket
+            annual_tax_savings = depreciation['full_year'] * tax_bracket
             tax_benefits = (annual_tax_savings / total_investment) * 100
         
         # Calculate Total ROI
@@ -216,77 +234,47 @@ class InvestmentCalculator:
 
     def analyze_investment(self, params):
         """Comprehensive investment analysis with detailed expenses and tax impact"""
-        purchase_costs = self.calculate_purchase_costs(
-            params['purchase_price'],
-            params.get('notary_fees_rate', 0.08)
-        )
-        
-        monthly_cashflow = self.calculate_monthly_cashflow(
-            params['rental_income'],
-            params['expenses']
-        )
-        
-        annual_cashflow = monthly_cashflow * 12
-        roi = self.calculate_roi(annual_cashflow, purchase_costs['total_cost'])
-        
-        # Calculate tax impact with loan interest if available
-        tax_impact = self.calculate_tax_impact(
-            params['rental_income'],
-            {**params['expenses'], 
-             'purchase_price': params['purchase_price'],
-             'notary_fees': purchase_costs['notary_fees']},
-            params.get('tax_regime', 'micro_bic'),
-            params.get('tax_bracket', 30),
-            params.get('loan_interest', 0)
-        )
-        
-        # Calculate after-tax monthly cashflow
-        monthly_tax_impact = tax_impact['total_tax'] / 12
-        after_tax_monthly_cashflow = monthly_cashflow - monthly_tax_impact
-        
-        # Calculate expense breakdown
-        monthly_expenses = params['expenses']
-        expense_breakdown = {
-            'management_fees': monthly_expenses.get('management_fees', 0),
-            'property_tax': monthly_expenses.get('property_tax', 0) / 12,  # Convert to monthly
-            'insurance': monthly_expenses.get('insurance', 0),
-            'maintenance': monthly_expenses.get('maintenance', 0),
-            'condo_fees': monthly_expenses.get('condo_fees', 0),
-            'other': monthly_expenses.get('other', 0),
-            'total_monthly': monthly_expenses.get('total_monthly', 0)
-        }
-        
-        # Calculate year-by-year tax impact
-        yearly_tax_data = self.calculate_yearly_tax_impact(
-            params['rental_income'],
-            {**params['expenses'], 
-             'purchase_price': params['purchase_price'],
-             'notary_fees': purchase_costs['notary_fees']},
-            params.get('loan_data', {'term_years': 20, 'amortization_schedule': []}),
-            params.get('tax_regime', 'micro_bic'),
-            params.get('tax_bracket', 30)
-        )
-        
-        # Calculate total ROI with all components
-        total_roi = self.calculate_total_roi(
-            params,
-            annual_cashflow,
-            purchase_costs['total_cost'],
-            params.get('loan_data')
+        return AnalysisGraph(self).analyze(params)
+
+    def analyze_batch(self, purchase_price, rental_income, monthly_expenses, notary_fees_rate=0.08,
+                      regime='micro_bic', tax_bracket=30, yearly_interest=0, monthly_loan_payment=0):
+        """Vectorized first-year analysis of many properties at once.
+
+        Every argument is a scalar or a (properties,) array; monthly_expenses
+        is the total monthly charges, also used as the deductible expenses.
+        Returns a dict of (properties,) arrays.
+        """
+        purchase_price = np.asarray(purchase_price, dtype=float)
+        rental_income = np.asarray(rental_income, dtype=float)
+        monthly_expenses = np.asarray(monthly_expenses, dtype=float)
+        purchase_costs = self.calculate_purchase_costs(purchase_price, np.asarray(notary_fees_rate, dtype=float))
+        depreciation = self.calculate_depreciation(purchase_price, purchase_costs['notary_fees'])
+
+        taxes = self.tax_engine.project(
+            rental_income,
+            monthly_expenses * 12,
+            np.atleast_1d(yearly_interest)[:, np.newaxis] if np.ndim(yearly_interest) else yearly_interest,
+            np.atleast_1d(depreciation['full_year'])[:, np.newaxis],
+            years=1,
+            regime=regime,
+            tax_bracket=tax_bracket
         )
-        
+        annual_tax = taxes['total_tax'][:, 0]
+
+        monthly_cashflow = rental_income - monthly_expenses
+        after_tax_monthly_cashflow = monthly_cashflow - annual_tax / 12
+        total_cost = purchase_costs['total_cost']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gross_yield = np.where(purchase_price > 0, rental_income * 12 / purchase_price * 100, np.nan)
+            after_tax_roi = np.where(total_cost > 0, after_tax_monthly_cashflow * 12 / total_cost * 100, np.nan)
+
         return {
-            'purchase_costs': purchase_costs,
+            'total_cost': total_cost,
+            'notary_fees': purchase_costs['notary_fees'],
             'monthly_cashflow': monthly_cashflow,
+            'annual_tax': annual_tax,
             'after_tax_monthly_cashflow': after_tax_monthly_cashflow,
-            'annual_cashflow': annual_cashflow,
-            'after_tax_annual_cashflow': after_tax_monthly_cashflow * 12,
-            'roi': total_roi['total_roi'],
-            'roi_breakdown': total_roi['components'],
-            'after_tax_roi': self.calculate_roi(after_tax_monthly_cashflow * 12, purchase_costs['total_cost']),
-            'tax_impact': tax_impact,
-            'yearly_tax_data': yearly_tax_data,  # Include year-by-year tax data
-            'expense_breakdown': expense_breakdown,
-            'rental_income': params['rental_income'],
-            'tax_regime': params.get('tax_regime', 'micro_bic')  # Include tax regime in response
+            'net_monthly_cashflow': after_tax_monthly_cashflow - monthly_loan_payment,
+            'gross_yield': gross_yield,
+            'after_tax_roi': after_tax_roi
         }
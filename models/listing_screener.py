@@ -0,0 +1,174 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from models.holding_period import HoldingPeriodAnalyzer
+from models.validation import ValidationError
+
+
+class ListingScreener:
+    """Streams a CSV of property listings and keeps the best ones by a chosen metric.
+
+    The file is read in chunks; each chunk is evaluated at once through the
+    vectorized calculator path and only its best rows are offered to a
+    bounded heap of size top_k, so memory stays flat whatever the file size.
+    """
+
+    COLUMNS = ('price', 'rent', 'charges', 'city', 'surface')
+    NUMERIC_COLUMNS = ('price', 'rent', 'charges', 'surface')
+    REQUIRED_COLUMNS = ('price', 'rent')
+    METRICS = ('gross_yield', 'after_tax_yield', 'cashflow', 'irr')
+    MAX_TOP_K = 1000
+
+    DEFAULT_ASSUMPTIONS = {
+        'notary_fees_rate': 0.08,
+        'deposit_rate': 0.1,       # Share of the total cost paid from the deposit
+        'interest_rate': 0.04,
+        'term_years': 20,
+        'tax_regime': 'micro_bic',
+        'tax_bracket': 30,
+        'appreciation_rate': 2.0,  # Percent per year, as in the investment analysis
+        'holding_years': 10        # Exit year used for the IRR
+    }
+
+    def __init__(self, investment_calculator):
+        self.calculator = investment_calculator
+        self.holding_period = HoldingPeriodAnalyzer(investment_calculator)
+
+    def read_assumptions(self, params):
+        """Financing and tax assumptions applied to every listing, from values validated by SCREEN"""
+        assumptions = dict(self.DEFAULT_ASSUMPTIONS)
+        for key, default in self.DEFAULT_ASSUMPTIONS.items():
+            if params.get(key) not in (None, ''):
+                value = params[key]
+                assumptions[key] = value if isinstance(default, str) else type(default)(float(value))
+        return assumptions
+
+    def evaluate_chunk(self, chunk, assumptions, include_irr=False):
+        """Metrics for every listing of a chunk, as (listings,) arrays"""
+        price = chunk['price'].to_numpy(dtype=float)
+        rent = chunk['rent'].to_numpy(dtype=float)
+        charges = chunk['charges'].to_numpy(dtype=float)
+
+        # Financing, identical for every listing
+        total_cost = price * (1 + assumptions['notary_fees_rate'])
+        personal_deposit = total_cost * assumptions['deposit_rate']
+        loan_amount = total_cost - personal_deposit
+        monthly_rate = assumptions['interest_rate'] / 12
+        num_payments = assumptions['term_years'] * 12
+        payment = HoldingPeriodAnalyzer.annuity_payment(loan_amount, monthly_rate, num_payments)
+        first_year_principal = loan_amount - HoldingPeriodAnalyzer.remaining_balance(
+            loan_amount, monthly_rate, payment, min(12, num_payments))
+        first_year_interest = payment * min(12, num_payments) - first_year_principal
+
+        analysis = self.calculator.analyze_batch(
+            price, rent, charges,
+            notary_fees_rate=assumptions['notary_fees_rate'],
+            regime=assumptions['tax_regime'],
+            tax_bracket=assumptions['tax_bracket'],
+            yearly_interest=first_year_interest,
+            monthly_loan_payment=payment
+        )
+        metrics = {
+            'gross_yield': analysis['gross_yield'],
+            'after_tax_yield': analysis['after_tax_roi'],
+            'cashflow': analysis['net_monthly_cashflow'],
+            'monthly_payment': payment
+        }
+
+        if include_irr:
+            count = len(price)
+            scenario = {
+                'purchase_price': price,
+                'notary_fees_rate': np.full(count, assumptions['notary_fees_rate']),
+                'personal_deposit': personal_deposit,
+                'loan_amount': loan_amount,
+                'interest_rate': np.full(count, assumptions['interest_rate']),
+                'term_years': np.full(count, assumptions['term_years']),
+                'rental_income': rent,
+                'monthly_expenses': charges,
+                'annual_expenses': charges * 12,
+                'tax_regime': np.full(count, assumptions['tax_regime']),
+                'tax_bracket': np.full(count, assumptions['tax_bracket']),
+                'appreciation_rate': np.full(count, assumptions['appreciation_rate'] / 100),
+                'resale_fees_rate': np.zeros(count),
+                'rent_indexation': np.zeros(count),
+                'expense_indexation': np.zeros(count)
+            }
+            evaluation = self.holding_period.evaluate(scenario, np.array([assumptions['holding_years']]))
+            metrics['irr'] = evaluation['irr'][:, 0] * 100
+        return metrics
+
+    def iter_chunks(self, source, chunksize=5000):
+        """Read listings in chunks, coercing numbers and dropping unusable rows"""
+        reader = pd.read_csv(source, chunksize=chunksize, usecols=lambda column: column in self.COLUMNS,
+                             dtype={'city': str})
+        for index, chunk in enumerate(reader):
+            if index == 0:
+                for column in self.REQUIRED_COLUMNS:
+                    if column not in chunk:
+                        raise ValidationError('colonne absente du fichier CSV', [column])
+            for column in self.NUMERIC_COLUMNS:
+                if column in chunk:
+                    chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+            if 'charges' not in chunk:
+                chunk['charges'] = 0.0
+            chunk['charges'] = chunk['charges'].fillna(0.0)
+            valid = (chunk['price'] > 0) & (chunk['rent'] > 0)
+            yield chunk[valid], int((~valid).sum())
+
+    def screen(self, source, metric='after_tax_yield', top_k=20, params=None, chunksize=5000):
+        """Rank the listings of a CSV file or stream by metric, keeping the top_k best"""
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        top_k = max(1, min(int(float(top_k)), self.MAX_TOP_K))
+        assumptions = self.read_assumptions(params or {})
+
+        heap = []  # (value, row number, listing): the worst kept listing on top
+        rows_read = 0
+        rows_rejected = 0
+        for chunk, rejected in self.iter_chunks(source, chunksize):
+            rows_read += len(chunk) + rejected
+            rows_rejected += rejected
+            if chunk.empty:
+                continue
+
+            metrics = self.evaluate_chunk(chunk, assumptions, include_irr=metric == 'irr')
+            values = metrics[metric]
+            finite = np.flatnonzero(np.isfinite(values))
+            rows_rejected += len(values) - len(finite)
+
+            # Only the chunk's own best rows can enter the heap
+            if len(finite) > top_k:
+                finite = finite[np.argpartition(values[finite], -top_k)[-top_k:]]
+            for position in finite:
+                value = float(values[position])
+                if len(heap) == top_k and value <= heap[0][0]:
+                    continue
+                listing = self._listing(chunk.iloc[position], metrics, position)
+                entry = (value, int(chunk.index[position]), listing)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heapreplace(heap, entry)
+
+        ranked = [listing for _, _, listing in sorted(heap, key=lambda entry: (-entry[0], entry[1]))]
+        return {
+            'metric': metric,
+            'assumptions': assumptions,
+            'rows_read': rows_read,
+            'rows_rejected': rows_rejected,
+            'listings': ranked
+        }
+
+    def _listing(self, row, metrics, position):
+        listing = {'row': int(row.name) + 1}
+        for column in self.COLUMNS:
+            if column in row.index and not pd.isna(row[column]):
+                value = row[column]
+                listing[column] = value if column == 'city' else float(value)
+        for key, values in metrics.items():
+            value = float(values[position])
+            listing[key] = value if np.isfinite(value) else None
+        return listing
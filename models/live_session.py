@@ -0,0 +1,201 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from models.analysis_graph import AnalysisCancelled
+
+
+class LiveSession:
+    """Current scenario of a client, edited through field deltas"""
+
+    def __init__(self):
+        self.params = {}
+        self.version = 0
+        self.updated_at = 0.0  # Monotonic time of the last delta
+        self.subscribers = 0   # Open event streams, counted under the store lock
+        self.changed = threading.Condition()
+
+    @staticmethod
+    def merge(params, delta):
+        """Apply a field delta, nested dicts such as expenses or loan_data being merged key by key"""
+        merged = dict(params)
+        for key, value in delta.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = LiveSession.merge(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
+
+    def apply(self, delta, replace=False):
+        """Apply a delta, or replace the whole scenario, returning the new version"""
+        with self.changed:
+            self.params = dict(delta) if replace else self.merge(self.params, delta)
+            self.version += 1
+            self.updated_at = time.monotonic()
+            self.changed.notify_all()
+            return self.version
+
+    def wait_for_change(self, seen_version, timeout):
+        """Wait until the version differs from seen_version, returning False on timeout"""
+        with self.changed:
+            return self.changed.wait_for(lambda: self.params and self.version != seen_version, timeout)
+
+    def snapshot(self, quiet_period):
+        """Wait until no delta arrived for quiet_period seconds, then return (version, params)"""
+        with self.changed:
+            while True:
+                remaining = self.updated_at + quiet_period - time.monotonic()
+                if remaining <= 0:
+                    return self.version, copy.deepcopy(self.params)
+                self.changed.wait(remaining)
+
+
+class LiveSessionStore:
+    """Live recalculation channel over Server-Sent Events.
+
+    Clients post field deltas; the event stream coalesces bursts of deltas,
+    runs the analysis on the session's incremental graph, abandons a run as
+    soon as a newer delta arrives, and pushes only the result sections that
+    differ from what this stream has already sent. Chart figures are built
+    from the same graph and sent one by one, only those that changed.
+
+    Sessions live in the memory of the worker holding the event stream.
+    Deltas are only accepted for a session with an open stream here; a delta
+    landing on another worker is refused rather than applied to a session
+    nobody listens to, and the client then falls back to a full calculation.
+    Sessions with an open stream are never evicted, and each worker serves
+    at most max_streams streams, each holding one of its threads.
+    """
+
+    COALESCE_SECONDS = 0.05   # Quiet period closing a burst of deltas
+    HEARTBEAT_SECONDS = 15    # Comment line keeping idle connections open
+    RETRY_MILLISECONDS = 1000
+    PARTIAL_SECTIONS = ('charts',)  # Sections whose entries are sent separately
+
+    def __init__(self, analysis_sessions, chart_builder=None, max_sessions=1000, max_streams=4):
+        self.analysis_sessions = analysis_sessions
+        self.chart_builder = chart_builder
+        self.max_sessions = max_sessions
+        self.max_streams = max_streams
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.stats = {'computed': 0, 'cancelled': 0, 'superseded': 0, 'refused': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _subscribe(self, session_id):
+        """Live session of a client, created on first use, with one more open stream; None when this
+        worker already serves max_streams streams. The cap is checked and the slot taken under one lock."""
+        with self._lock:
+            if self.streams >= self.max_streams:
+                return None
+            live = self._sessions.pop(session_id, None) or LiveSession()
+            self._sessions[session_id] = live
+            live.subscribers += 1
+            self.streams += 1
+            # Least recently used first, sessions with an open stream are kept
+            idle = [key for key, session in self._sessions.items() if not session.subscribers]
+            for key in idle[:max(len(self._sessions) - self.max_sessions, 0)]:
+                del self._sessions[key]
+            return live
+
+    def _unsubscribe(self, live):
+        with self._lock:
+            live.subscribers -= 1
+            self.streams -= 1
+
+    def update(self, session_id, delta, replace=False):
+        """Apply a field delta to a client's scenario, returning its new version, or None when the
+        session has no open stream in this worker"""
+        with self._lock:
+            live = self._sessions.get(session_id)
+            if live is None or not live.subscribers:
+                self.stats['refused'] += 1
+                return None
+            self._sessions.move_to_end(session_id)
+        return live.apply(delta, replace)
+
+    def compute(self, session_id, params, cancelled=None):
+        """Analysis of a scenario, with its chart figures when there is a chart builder"""
+        if self.chart_builder is None:
+            return self.analysis_sessions.analyze(session_id, params, cancelled)
+        result, charts = self.analysis_sessions.analyze_with(session_id, params, self.chart_builder.graph_figures,
+                                                             cancelled)
+        return {**result, 'charts': charts}
+
+    def changed_sections(self, sent, result):
+        """Result sections that differ from the ones already sent, only the changed entries of partial ones"""
+        sections = {}
+        for key, value in result.items():
+            if key in self.PARTIAL_SECTIONS and isinstance(value, dict):
+                previous = sent.get(key) or {}
+                changed = {name: entry for name, entry in value.items()
+                           if name not in previous or previous[name] != entry}
+                if changed:
+                    sections[key] = changed
+            elif key not in sent or sent[key] != value:
+                sections[key] = value
+        return sections
+
+    @staticmethod
+    def format_event(event, data, event_id=None):
+        lines = [f'event: {event}']
+        if event_id is not None:
+            lines.append(f'id: {event_id}')
+        lines.append(f'data: {json.dumps(data)}')
+        return '\n'.join(lines) + '\n\n'
+
+    def open_stream(self, session_id):
+        """Server-Sent Events stream of result updates for a client session, its slot reserved right
+        away; None when this worker has no thread to spare for one more stream"""
+        live = self._subscribe(session_id)
+        if live is None:
+            return None
+        stream = self._stream(session_id, live)
+        next(stream)  # Enter the try block, so closing the stream before its first read frees the slot
+        return stream
+
+    def _stream(self, session_id, live):
+        try:
+            yield
+            yield f'retry: {self.RETRY_MILLISECONDS}\n\n'
+            yield from self._events(session_id, live)
+        finally:
+            self._unsubscribe(live)
+
+    def _events(self, session_id, live):
+        sent = {}
+        computed_version = 0
+        while True:
+            if not live.wait_for_change(computed_version, self.HEARTBEAT_SECONDS):
+                yield ': heartbeat\n\n'
+                continue
+
+            version, params = live.snapshot(self.COALESCE_SECONDS)
+            try:
+                result = self.compute(session_id, params, cancelled=lambda: live.version != version)
+            except AnalysisCancelled:
+                self._count('cancelled')
+                continue
+            except Exception:
+                computed_version = version
+                yield self.format_event('error', {'version': version,
+                                                  'error': 'Paramètres incomplets ou invalides'}, version)
+                continue
+
+            computed_version = version
+            if live.version != version:
+                # A delta arrived while the result was assembled
+                self._count('superseded')
+                continue
+
+            self._count('computed')
+            sections = self.changed_sections(sent, result)
+            sent.update(result)
+            if sections:
+                yield self.format_event('update', {'version': version, 'sections': sections}, version)
@@ -1,5 +1,7 @@
 import numpy as np
 
+from models.money import amortization_cents, cents_to_euros
+
 class LoanCalculator:
     def __init__(self):
         pass
@@ -16,8 +18,11 @@ class LoanCalculator:
                          ((1 + monthly_rate)**num_payments - 1)
         return monthly_payment
     
-    def generate_amortization_schedule(self, principal, annual_rate, years):
+    def generate_amortization_schedule(self, principal, annual_rate, years, money_mode='float'):
         """Generate complete amortization schedule"""
+        if money_mode == 'cents':
+            return self.generate_cents_amortization_schedule(principal, annual_rate, years)
+
         monthly_rate = annual_rate / 12
         num_payments = years * 12
         monthly_payment = self.calculate_monthly_payment(principal, annual_rate, years)
@@ -50,7 +55,26 @@ class LoanCalculator:
             })
         
         return schedule
+
+    def generate_cents_amortization_schedule(self, principal, annual_rate, years):
+        """Generate amortization schedule computed in integer cents, rounded like a bank"""
+        cents = amortization_cents(principal, annual_rate, years)
+        keys = ('payment', 'principal', 'interest', 'remaining_balance', 'total_interest', 'total_principal')
+        columns = [range(1, years * 12 + 1)] + [cents_to_euros(cents[key][0]).tolist() for key in keys]
+        return [dict(zip(('payment_num',) + keys, row)) for row in zip(*columns)]
     
+    def with_schedule(self, loan_data):
+        """Loan data completed with its amortization schedule and monthly payment when missing"""
+        loan_data = dict(loan_data or {})
+        loan_amount = float(loan_data.get('loan_amount', 0) or 0)
+        term_years = int(loan_data.get('term_years', 0) or 0)
+        if not loan_data.get('amortization_schedule') and loan_amount > 0 and term_years > 0:
+            loan_data['amortization_schedule'] = self.generate_amortization_schedule(
+                loan_amount, float(loan_data.get('interest_rate', 0)), term_years)
+            loan_data.setdefault('monthly_payment', loan_data['amortization_schedule'][0]['payment'])
+        loan_data['loan_amount'] = loan_amount
+        return loan_data
+
     def calculate_loan_metrics(self, params):
         """Calculate comprehensive loan metrics"""
         try:
@@ -58,25 +82,38 @@ class LoanCalculator:
             interest_rate = float(params.get('interest_rate', 0))
             term_years = int(params.get('term_years', 30))
             personal_deposit = float(params.get('personal_deposit', 0))
+            money_mode = params.get('money_mode', 'float')
             
             if loan_amount <= 0 or term_years <= 0:
                 raise ValueError("Loan amount and term must be positive")
                 
-            monthly_payment = self.calculate_monthly_payment(loan_amount, interest_rate, term_years)
-            schedule = self.generate_amortization_schedule(loan_amount, interest_rate, term_years)
+            if money_mode not in ('float', 'cents'):
+                raise ValueError(f"Unknown money mode: {money_mode}")
+
+            schedule = self.generate_amortization_schedule(loan_amount, interest_rate, term_years, money_mode)
+            if money_mode == 'cents':
+                # Regular instalment, the last one absorbs the rounding
+                monthly_payment = schedule[0]['payment']
+            else:
+                monthly_payment = self.calculate_monthly_payment(loan_amount, interest_rate, term_years)
             
             # Get the last entry of the schedule for total interest
             total_interest = schedule[-1]['total_interest'] if schedule else 0
+            if money_mode == 'cents':
+                total_cost = round(schedule[-1]['total_principal'] + total_interest, 2)
+            else:
+                total_cost = loan_amount + total_interest
             
             return {
                 'monthly_payment': float(monthly_payment),
                 'total_interest': float(total_interest),
-                'total_cost': float(loan_amount + total_interest),
+                'total_cost': float(total_cost),
                 'annual_payment': float(monthly_payment * 12),
                 'term_years': term_years,
                 'interest_rate': interest_rate,
                 'loan_amount': loan_amount,
                 'personal_deposit': personal_deposit,
+                'money_mode': money_mode,
                 'amortization_schedule': schedule
             }
             
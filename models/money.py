@@ -0,0 +1,84 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Annual rates are held as integer millionths so monthly interest is exact integer arithmetic
+RATE_SCALE = 1_000_000
+
+
+def to_cents(amount) -> int:
+    """Convert an amount in euros to integer cents, rounding half up"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def round_half_up(values):
+    """Round non-negative float amounts already expressed in cents to int64, half up"""
+    return np.floor(np.asarray(values, dtype=float) + 0.5).astype(np.int64)
+
+
+def cents_to_euros(cents):
+    """Convert integer cents to euros as floats, exact to the cent"""
+    return np.asarray(cents, dtype=np.int64) / 100
+
+
+def format_cents(cents: int) -> str:
+    """Format integer cents as a euro amount with two decimals"""
+    sign = '-' if cents < 0 else ''
+    euros, remainder = divmod(abs(int(cents)), 100)
+    return f"{sign}{euros}.{remainder:02d} €"
+
+
+def amortization_cents(principal, annual_rate, years):
+    """Bank-style amortization schedules in int64 cents, vectorized over loans.
+
+    The constant payment is rounded to the cent, each monthly interest is
+    rounded half up to the cent, and the last payment is adjusted so the
+    principal parts add up exactly to the borrowed amount. Returns
+    (loans, months) arrays padded with zeros after each loan's term.
+    """
+    principal, annual_rate, years = np.broadcast_arrays(np.atleast_1d(principal),
+                                                        np.atleast_1d(annual_rate),
+                                                        np.atleast_1d(years))
+    principal_cents = round_half_up(np.asarray(principal, dtype=float) * 100)
+    rate_millionths = np.rint(np.asarray(annual_rate, dtype=float) * RATE_SCALE).astype(np.int64)
+    num_payments = np.asarray(years, dtype=np.int64) * 12
+    denominator = 12 * RATE_SCALE
+
+    # Constant payment from the annuity formula, rounded to the cent
+    monthly_rate = rate_millionths / denominator
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + monthly_rate) ** num_payments
+        annuity = np.where(monthly_rate == 0, principal_cents / num_payments,
+                           principal_cents * monthly_rate * growth / (growth - 1))
+    payment_cents = round_half_up(annuity)
+
+    # The rounding makes each month depend on the previous balance, so only the
+    # balance recurrence is iterated; a single loan iterates on Python ints,
+    # which is much cheaper than numpy operations on one-element arrays
+    half = denominator // 2
+    if len(principal_cents) == 1:
+        balance, rate, payment = int(principal_cents[0]), int(rate_millionths[0]), int(payment_cents[0])
+    else:
+        balance, rate, payment = principal_cents, rate_millionths, payment_cents
+    opening_balances = []
+    for _ in range(int(num_payments.max())):
+        opening_balances.append(balance)
+        balance = balance - payment + (balance * rate + half) // denominator
+
+    # Everything else is derived from the opening balances at once
+    opening = np.array(opening_balances, dtype=np.int64).reshape(len(opening_balances), -1).T
+    month = np.arange(opening.shape[1])
+    active = month < num_payments[:, np.newaxis]
+    interest = np.where(active, (opening * rate_millionths[:, np.newaxis] + half) // denominator, 0)
+    principal_part = np.where(month == num_payments[:, np.newaxis] - 1, opening,
+                              payment_cents[:, np.newaxis] - interest)
+    principal_part = np.where(active, principal_part, 0)
+
+    return {
+        'payment': principal_part + interest,
+        'interest': interest,
+        'principal': principal_part,
+        'remaining_balance': np.where(active, opening - principal_part, 0),
+        'total_interest': np.cumsum(interest, axis=1),
+        'total_principal': np.cumsum(principal_part, axis=1)
+    }
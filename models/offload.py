@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Calculators of the current process: the app's own in the web workers, built on first use in the pool processes
+_calculators = {}
+
+
+def _calculator(name):
+    if name not in _calculators:
+        from models.holding_period import HoldingPeriodAnalyzer
+        from models.investment_calculator import InvestmentCalculator
+        from models.inverse_solver import InverseSolver
+
+        investment_calculator = InvestmentCalculator()
+        _calculators.update({
+            'holding_period': HoldingPeriodAnalyzer(investment_calculator),
+            'inverse_solver': InverseSolver(investment_calculator)
+        })
+    return _calculators[name]
+
+
+def use_calculators(holding_period, inverse_solver):
+    """Run the inline calculations with the given calculators, sharing their caches"""
+    _calculators.update({'holding_period': holding_period, 'inverse_solver': inverse_solver})
+
+
+def load_calculators():
+    """Build the calculators of the current process"""
+    _calculator('holding_period')
+
+
+def holding_period(params, max_exit_years, discount_rate):
+    """Holding-period analysis of one scenario or of a 'scenarios' batch"""
+    analyzer = _calculator('holding_period')
+    if 'scenarios' in params:
+        return analyzer.analyze_batch(params['scenarios'], max_exit_years, discount_rate)
+    return analyzer.analyze(params, max_exit_years, discount_rate)
+
+
+def solve(solver, params):
+    """Inverse solver run on request parameters"""
+    return _calculator('inverse_solver').solve(solver, params)
+
+
+class Offloader:
+    """Runs CPU-bound calculations in a pool of processes.
+
+    Threaded workers otherwise serialize the NumPy-light parts of batch
+    calculations on the GIL. Only stateless calculations taking and returning
+    plain JSON-like values are offloaded. With no processes, calculations run
+    inline. The pool is started on first use in each worker, using spawn so
+    it never forks a threaded process.
+    """
+
+    def __init__(self, processes=0):
+        self.processes = processes
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._pool
+
+    def run(self, function, *args):
+        """Result of function(*args), computed in the pool when there is one"""
+        if not self.processes:
+            return function(*args)
+        return self._executor().submit(function, *args).result()
+
+    def warm_up(self):
+        """Start the pool processes, so the first requests don't pay for it"""
+        if self.processes:
+            executor = self._executor()
+            for future in [executor.submit(load_calculators) for _ in range(self.processes)]:
+                future.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
@@ -1,12 +1,14 @@
 from docxtpl import DocxTemplate
-from docx2pdf import convert
 import os
 from datetime import datetime
 from typing import Dict, Optional
 import locale
 import sys
-import pythoncom
 import re
+import uuid
+
+from models.downloads import store_content_addressed
+from models.money import to_cents, format_cents
 
 class RentReceipt:
     # Mapping for French number words
@@ -78,8 +80,10 @@ class RentReceipt:
         if number == 0:
             return 'zéro'
 
+        # Split into euros and centimes exactly, without float drift
+        integer_part, decimal_part = divmod(to_cents(number), 100)
+
         # Handle the integer part
-        integer_part = int(number)
         parts = _split_by_thousands(integer_part)
         words = []
 
@@ -97,7 +101,6 @@ class RentReceipt:
                         words.append(thou)
 
         # Handle decimal part (centimes)
-        decimal_part = round((number - integer_part) * 100)
         result = ' '.join(w for w in words if w)
 
         if decimal_part:
@@ -220,10 +223,10 @@ class RentReceipt:
                           period: str,
                           charges: Optional[Dict[str, float]] = None) -> Dict:
         """Format receipt data without generating PDF"""
-        # Calculate total amount
-        total_amount = rent_amount
-        if charges:
-            total_amount += sum(charges.values())
+        # Calculate total amount in integer cents so totals never drift
+        rent_cents = to_cents(rent_amount)
+        charges_cents = {desc: to_cents(amount) for desc, amount in charges.items()} if charges else {}
+        total_cents = rent_cents + sum(charges_cents.values())
 
         # Parse addresses
         landlord_address_components = self.parse_address(landlord_address)
@@ -248,27 +251,27 @@ class RentReceipt:
             'payment': {
                 'date': self.format_date(payment_date),
                 'period': self.format_period(period),
-                'rent_amount': f"{rent_amount:.2f} €",
-                'rent_amount_letters': self.number_to_french_words(rent_amount),
-                'total_amount': f"{total_amount:.2f} €",
-                'total_amount_letters': self.number_to_french_words(total_amount)
+                'rent_amount': format_cents(rent_cents),
+                'rent_amount_letters': self.number_to_french_words(rent_cents / 100),
+                'total_amount': format_cents(total_cents),
+                'total_amount_letters': self.number_to_french_words(total_cents / 100)
             }
         }
 
         if charges:
-            total_charges = sum(charges.values())
+            total_charges_cents = sum(charges_cents.values())
             formatted_charges = [
                 {
                     'description': desc,
-                    'amount': f"{amount:.2f} €",
-                    'amount_letters': self.number_to_french_words(amount)
+                    'amount': format_cents(amount_cents),
+                    'amount_letters': self.number_to_french_words(amount_cents / 100)
                 }
-                for desc, amount in charges.items()
+                for desc, amount_cents in charges_cents.items()
             ]
             formatted_data['charges'] = {
                 'items': formatted_charges,
-                'total': f"{total_charges:.2f} €",
-                'total_letters': self.number_to_french_words(total_charges)
+                'total': format_cents(total_charges_cents),
+                'total_letters': self.number_to_french_words(total_charges_cents / 100)
             }
 
         return formatted_data
@@ -283,8 +286,13 @@ class RentReceipt:
                         period: str,
                         charges: Optional[Dict[str, float]] = None) -> str:
         """Generate a rent receipt PDF"""
+        # PDF conversion drives Word, only imported when a PDF is generated so the app loads on any platform
+        from docx2pdf import convert
+
         # Initialize COM for Windows
         if sys.platform == 'win32':
+            import pythoncom
+
             pythoncom.CoInitialize()
         
         try:
@@ -327,7 +335,7 @@ class RentReceipt:
             os.makedirs(output_dir, exist_ok=True)
 
             # Generate unique filename
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
             docx_path = os.path.join(output_dir, f'receipt_{timestamp}.docx')
             pdf_path = os.path.join(output_dir, f'receipt_{timestamp}.pdf')
 
@@ -341,7 +349,8 @@ class RentReceipt:
             # Clean up the temporary docx file
             os.remove(docx_path)
 
-            return pdf_path
+            # Named after its content so downloads can be cached as immutable
+            return store_content_addressed(pdf_path)
 
         finally:
             # Uninitialize COM
@@ -0,0 +1,212 @@
+import json
+import operator
+from datetime import datetime, timezone
+
+import numpy as np
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, select
+from sqlalchemy.orm import deferred, undefer
+
+db = SQLAlchemy()
+
+
+class Scenario(db.Model):
+    """A saved investment scenario with its precomputed analysis.
+
+    Scalar metrics used for filtering live in indexed columns; the yearly
+    series are stored as one packed float64 array (columns x years) instead of
+    a JSON list of dicts. Inputs, results and series are deferred so listings
+    only read the summary columns.
+    """
+    __tablename__ = 'scenarios'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False, default='')
+    city = db.Column(db.String(100), index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+
+    purchase_price = db.Column(db.Float, nullable=False)
+    rental_income = db.Column(db.Float, nullable=False)
+    tax_regime = db.Column(db.String(20), nullable=False)
+    gross_yield = db.Column(db.Float, nullable=False, index=True)
+    roi = db.Column(db.Float, nullable=False)
+    after_tax_roi = db.Column(db.Float, nullable=False, index=True)
+    after_tax_monthly_cashflow = db.Column(db.Float, nullable=False)
+    net_monthly_cashflow = db.Column(db.Float, nullable=False, index=True)  # After tax and loan payment
+
+    inputs = deferred(db.Column(db.Text, nullable=False))
+    result = deferred(db.Column(db.Text, nullable=False))           # Analysis without the yearly series
+    series_columns = deferred(db.Column(db.Text, nullable=False))   # Comma-separated yearly keys
+    series = deferred(db.Column(db.LargeBinary, nullable=False))    # float64, columns x years
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'city': self.city,
+            'created_at': self.created_at.replace(tzinfo=timezone.utc).isoformat(),  # Stored as naive UTC
+            'purchase_price': self.purchase_price,
+            'rental_income': self.rental_income,
+            'tax_regime': self.tax_regime,
+            'gross_yield': self.gross_yield,
+            'roi': self.roi,
+            'after_tax_roi': self.after_tax_roi,
+            'after_tax_monthly_cashflow': self.after_tax_monthly_cashflow,
+            'net_monthly_cashflow': self.net_monthly_cashflow
+        }
+
+
+class ScenarioStore:
+    """Saves scenarios with their precomputed results so reopening them needs no recomputation"""
+
+    # Filters accepted by list_scenarios: request parameter -> (column, comparison)
+    FILTERS = {
+        'city': (Scenario.city, operator.eq),
+        'min_gross_yield': (Scenario.gross_yield, operator.ge),
+        'max_gross_yield': (Scenario.gross_yield, operator.le),
+        'min_after_tax_roi': (Scenario.after_tax_roi, operator.ge),
+        'min_cashflow': (Scenario.net_monthly_cashflow, operator.ge),
+        'max_cashflow': (Scenario.net_monthly_cashflow, operator.le)
+    }
+    SORTS = {
+        'created_at': Scenario.created_at,
+        'gross_yield': Scenario.gross_yield,
+        'after_tax_roi': Scenario.after_tax_roi,
+        'cashflow': Scenario.net_monthly_cashflow
+    }
+    MAX_PER_PAGE = 100
+    MAX_COMPARE = 50
+
+    def __init__(self, investment_calculator):
+        self.calculator = investment_calculator
+
+    @staticmethod
+    def pack_series(yearly_data):
+        """Pack a list of yearly dicts into column names and a float64 buffer"""
+        if not yearly_data:
+            return '', b''
+        columns = [key for key in yearly_data[0] if key != 'year']
+        values = np.array([[entry[key] for entry in yearly_data] for key in columns], dtype=np.float64)
+        return ','.join(columns), values.tobytes()
+
+    @staticmethod
+    def unpack_series(columns, packed):
+        """Rebuild the list of yearly dicts from a packed buffer"""
+        if not columns:
+            return []
+        names = columns.split(',')
+        values = np.frombuffer(packed, dtype=np.float64).reshape(len(names), -1)
+        rows = zip(range(1, values.shape[1] + 1), *[column.tolist() for column in values])
+        return [dict(zip(['year'] + names, row)) for row in rows]
+
+    def build_row(self, params, result=None):
+        """Compute the analysis once and flatten it into a scenario row"""
+        inputs = params['inputs']
+        if result is None:
+            result = self.calculator.analyze_investment(inputs)
+        # Payment computed by the analysis, the inputs may only give the amount, rate and term
+        monthly_payment = (result.get('loan') or {}).get('monthly_payment', 0)
+        series_columns, series = self.pack_series(result['yearly_tax_data'])
+        summary = {key: value for key, value in result.items() if key != 'yearly_tax_data'}
+        return {
+            'name': params.get('name', ''),
+            'city': params.get('city') or inputs.get('city'),
+            'created_at': datetime.now(timezone.utc),
+            'purchase_price': inputs['purchase_price'],
+            'rental_income': inputs['rental_income'],
+            'tax_regime': result['tax_regime'],
+            'gross_yield': (inputs['rental_income'] * 12 / inputs['purchase_price'] * 100)
+            if inputs['purchase_price'] else 0,
+            'roi': result['roi'],
+            'after_tax_roi': result['after_tax_roi'],
+            'after_tax_monthly_cashflow': result['after_tax_monthly_cashflow'],
+            'net_monthly_cashflow': result['after_tax_monthly_cashflow'] - monthly_payment,
+            'inputs': json.dumps(inputs),
+            'result': json.dumps(summary),
+            'series_columns': series_columns,
+            'series': series
+        }
+
+    def save(self, params):
+        """Save one scenario, returning its summary"""
+        scenario = Scenario(**self.build_row(params))
+        db.session.add(scenario)
+        db.session.commit()
+        return scenario.summary()
+
+    def bulk_save(self, params_list):
+        """Save many scenarios in a single executemany insert, returning their count"""
+        rows = [self.build_row(params) for params in params_list]
+        if rows:
+            db.session.execute(insert(Scenario), rows)
+            db.session.commit()
+        return len(rows)
+
+    def query(self, args):
+        """Scenario query filtered and sorted on indexed columns"""
+        query = select(Scenario)
+        for key, (column, comparison) in self.FILTERS.items():
+            if args.get(key) in (None, ''):
+                continue
+            value = args[key] if key == 'city' else float(args[key])
+            query = query.where(comparison(column, value))
+
+        sort_column = self.SORTS.get(args.get('sort', 'created_at'), Scenario.created_at)
+        query = query.order_by(sort_column.asc() if args.get('order') == 'asc' else sort_column.desc(),
+                               Scenario.id.desc())
+        return query
+
+    def list_scenarios(self, args):
+        """Paginated scenario summaries, filtered and sorted on indexed columns"""
+        page = db.paginate(self.query(args), page=int(float(args.get('page', 1))),
+                           per_page=min(int(float(args.get('per_page', 20))), self.MAX_PER_PAGE),
+                           error_out=False)
+        return {
+            'items': [scenario.summary() for scenario in page.items],
+            'page': page.page,
+            'per_page': page.per_page,
+            'pages': page.pages,
+            'total': page.total
+        }
+
+    def iter_summaries(self, args, batch_size=500):
+        """All matching scenario summaries, fetched from the database in batches"""
+        rows = db.session.execute(self.query(args).execution_options(yield_per=batch_size)).scalars()
+        for scenario in rows:
+            yield scenario.summary()
+
+    @staticmethod
+    def _full(scenario):
+        return {
+            **scenario.summary(),
+            'inputs': json.loads(scenario.inputs),
+            'result': {
+                **json.loads(scenario.result),
+                'yearly_tax_data': ScenarioStore.unpack_series(scenario.series_columns, scenario.series)
+            }
+        }
+
+    def get(self, scenario_id):
+        """Saved inputs and precomputed results of a scenario, or None"""
+        scenario = db.session.execute(
+            select(Scenario).options(undefer('*')).where(Scenario.id == scenario_id)
+        ).scalar_one_or_none()
+        return self._full(scenario) if scenario is not None else None
+
+    def compare(self, scenario_ids):
+        """Saved scenarios loaded in one query, in the requested order"""
+        scenario_ids = list(scenario_ids)[:self.MAX_COMPARE]
+        scenarios = db.session.execute(
+            select(Scenario).options(undefer('*')).where(Scenario.id.in_(scenario_ids))
+        ).scalars().all()
+        by_id = {scenario.id: scenario for scenario in scenarios}
+        return [self._full(by_id[scenario_id]) for scenario_id in scenario_ids if scenario_id in by_id]
+
+    def delete(self, scenario_id):
+        """Delete a scenario, returning whether it existed"""
+        scenario = db.session.get(Scenario, scenario_id)
+        if scenario is None:
+            return False
+        db.session.delete(scenario)
+        db.session.commit()
+        return True
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import closing, contextmanager
+
+
+class SingleFlight:
+    """Coalesces identical concurrent computations into one.
+
+    Requests are keyed on the hash of their canonical JSON. Within a worker,
+    the first caller for a key runs the computation and concurrent duplicates
+    wait on its Future. Across workers, the running caller holds a lease row
+    in a shared SQLite file; duplicates in other workers poll the row and
+    reuse the result stored there when the lease owner finishes. Stored
+    results are kept for result_ttl seconds so followers that poll a little
+    late still find them, then purged. Results must be JSON-serializable to
+    be shared across workers and treated as read-only by callers.
+
+    The lease costs a few SQLite transactions per call, which only pays off
+    for slow computations such as PDF generation; millisecond calculations
+    should use an instance without a path. Followers poll with plain reads,
+    only taking a write transaction to claim a free or expired lease, and
+    old rows are purged at most every purge_interval seconds.
+    """
+
+    def __init__(self, path=None, lease_seconds=60, result_ttl=2.0, poll_interval=0.02, purge_interval=5.0):
+        self.path = path  # None keeps coalescing within this worker only
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+        self._token = uuid.uuid4().hex
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'computed': 0, 'shared_local': 0, 'shared_remote': 0, 'failed': 0,
+                      'computed_seconds': 0.0, 'saved_seconds': 0.0}
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as connection:
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('CREATE TABLE IF NOT EXISTS flights ('
+                                   'key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL, '
+                                   'result TEXT, duration REAL, done_at REAL)')
+
+    @staticmethod
+    def key(namespace, payload):
+        """Hash of a namespace and the canonical JSON of a request payload"""
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(f'{namespace}:{canonical}'.encode('utf-8')).hexdigest()
+
+    @property
+    def owner(self):
+        # Workers forked from a preloaded app share the token, the pid tells them apart
+        return f'{os.getpid()}:{self._token}'
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=10, isolation_level=None)) as connection:
+            # Leases don't need to survive a power loss, WAL commits then skip the fsync
+            connection.execute('PRAGMA synchronous=NORMAL')
+            yield connection
+
+    def _count(self, name, seconds_name=None, seconds=0.0):
+        with self._lock:
+            self.stats[name] += 1
+            if seconds_name:
+                self.stats[seconds_name] += seconds
+
+    def metrics(self):
+        """Counters of this worker, with the number of computations saved"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['saved'] = stats['shared_local'] + stats['shared_remote']
+        total = stats['computed'] + stats['saved']
+        stats['saved_ratio'] = stats['saved'] / total if total else 0.0
+        return stats
+
+    def run(self, namespace, payload, compute):
+        """Return compute(), sharing one execution between identical concurrent calls"""
+        key = self.key(namespace, payload)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            result, duration = future.result()  # Re-raises the leader's exception
+            self._count('shared_local', 'saved_seconds', duration)
+            return result
+
+        try:
+            result, duration = self._run_leased(key, compute)
+            future.set_result((result, duration))
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _run_leased(self, key, compute):
+        """Run compute under the cross-worker lease, or reuse another worker's result"""
+        leased = self.path is not None
+        while leased:
+            try:
+                state, result, duration = self._acquire(key)
+            except sqlite3.Error:
+                # The lease file is unavailable, compute without cross-worker coalescing
+                leased = False
+                break
+            if state == 'done':
+                self._count('shared_remote', 'saved_seconds', duration)
+                return result, 0.0
+            if state == 'lead':
+                break
+            time.sleep(self.poll_interval)
+
+        start = time.perf_counter()
+        try:
+            result = compute()
+        except BaseException:
+            self._count('failed')
+            if leased:
+                self._release(key)
+            raise
+        duration = time.perf_counter() - start
+        self._count('computed', 'computed_seconds', duration)
+        if leased:
+            self._store(key, result, duration)
+        return result, duration
+
+    def _state(self, connection, key, now):
+        """('done'|'wait', result, duration) for a live row of the key, None when it is free"""
+        row = connection.execute('SELECT result, duration, expires, done_at FROM flights WHERE key = ?',
+                                 (key,)).fetchone()
+        if row is None:
+            return None
+        result, duration, expires, done_at = row
+        if result is not None and done_at >= now - self.result_ttl:
+            return 'done', json.loads(result), duration
+        if result is None and expires >= now:
+            return 'wait', None, 0.0
+        return None  # Stale result or expired lease
+
+    def _acquire(self, key):
+        """Take the lease for a key, returning ('lead'|'wait'|'done', result, duration)"""
+        now = time.time()
+        with self._connect() as connection:
+            state = self._state(connection, key, now)
+            if state is not None:
+                return state
+
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                state = self._state(connection, key, now)  # Another worker may have claimed it meanwhile
+                if state is not None:
+                    return state
+                if now - self._purged_at >= self.purge_interval:
+                    self._purged_at = now
+                    connection.execute('DELETE FROM flights WHERE (result IS NOT NULL AND done_at < ?) '
+                                       'OR (result IS NULL AND expires < ?)', (now - self.result_ttl, now))
+                connection.execute('INSERT OR REPLACE INTO flights (key, owner, expires) VALUES (?, ?, ?)',
+                                   (key, self.owner, now + self.lease_seconds))
+                return 'lead', None, 0.0
+            finally:
+                connection.execute('COMMIT')
+
+    def _store(self, key, result, duration):
+        try:
+            serialized = json.dumps(result)
+        except (TypeError, ValueError):
+            self._release(key)
+            return
+        try:
+            with self._connect() as connection:
+                connection.execute('UPDATE flights SET result = ?, duration = ?, done_at = ? '
+                                   'WHERE key = ? AND owner = ?',
+                                   (serialized, duration, time.time(), key, self.owner))
+        except sqlite3.Error:
+            pass  # Followers take over once the lease expires
+
+    def _release(self, key):
+        try:
+            with self._connect() as connection:
+                connection.execute('DELETE FROM flights WHERE key = ? AND owner = ?', (key, self.owner))
+        except sqlite3.Error:
+            pass
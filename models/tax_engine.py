@@ -0,0 +1,196 @@
+import numpy as np
+
+
+class TaxEngine:
+    """Vectorized multi-year LMNP tax projection.
+
+    Every computation works on (scenarios x years) arrays so that a 30-year
+    projection of many scenarios costs a handful of NumPy operations.
+
+    Under the régime réel, the order of imputation each year is:
+    1. expenses and loan interest, a negative result creating a deficit
+       that can be carried forward for 10 years;
+    2. the year's depreciation, limited to the remaining positive result;
+    3. prior deficits, oldest first;
+    4. deferred depreciation (amortissements réputés différés), which
+       carries forward indefinitely.
+    """
+
+    DEFICIT_CARRYFORWARD_YEARS = 10
+
+    def __init__(self, micro_bic_rate=0.5, social_charges_rate=0.172):
+        self.micro_bic_rate = micro_bic_rate  # Abattement forfaitaire Micro-BIC
+        self.social_charges_rate = social_charges_rate
+
+    @staticmethod
+    def yearly_interest(monthly_interest, years):
+        """Sum monthly interest into yearly totals, padding or truncating to the given number of years"""
+        monthly_interest = np.asarray(monthly_interest, dtype=float)
+        months = years * 12
+        lead_shape = monthly_interest.shape[:-1]
+        if monthly_interest.shape[-1] >= months:
+            monthly_interest = monthly_interest[..., :months]
+        else:
+            padding = np.zeros(lead_shape + (months - monthly_interest.shape[-1],))
+            monthly_interest = np.concatenate([monthly_interest, padding], axis=-1)
+        return monthly_interest.reshape(lead_shape + (years, 12)).sum(axis=-1)
+
+    @staticmethod
+    def indexation_factors(rates, years):
+        """Compounded yearly indexation factors, 1 for the first year"""
+        rates = np.asarray(rates, dtype=float)[..., np.newaxis]
+        return (1 + rates) ** np.arange(years)
+
+    def project(self, rental_income, annual_expenses, yearly_interest=0, depreciation=0, years=20,
+                regime='reel', tax_bracket=30, rent_indexation=0, expense_indexation=0,
+                building_depreciation=None):
+        """Project yearly taxes for one or many scenarios.
+
+        rental_income is monthly and annual_expenses yearly, both for the first
+        year; scalars or (scenarios,) arrays. yearly_interest and depreciation
+        are scalars, (years,) arrays shared by all scenarios, or 2-D arrays of
+        shape (scenarios, years), or (scenarios, 1) for per-scenario constants.
+        building_depreciation, shaped the same, is the part of depreciation
+        reintegrated into capital gains on resale; its deducted amounts are
+        then returned as 'building_depreciation_used'.
+        Returns a dict of (scenarios, years) arrays.
+        """
+        rental_income = np.atleast_1d(np.asarray(rental_income, dtype=float))
+        annual_expenses = np.atleast_1d(np.asarray(annual_expenses, dtype=float))
+        regime = np.atleast_1d(np.asarray(regime))
+        tax_bracket = np.atleast_1d(np.asarray(tax_bracket, dtype=float))
+        rent_indexation = np.atleast_1d(np.asarray(rent_indexation, dtype=float))
+        expense_indexation = np.atleast_1d(np.asarray(expense_indexation, dtype=float))
+        per_year_shapes = [np.shape(values)[:1] for values in (yearly_interest, depreciation)
+                           if np.ndim(values) == 2]
+        num_scenarios = np.broadcast_shapes(rental_income.shape, annual_expenses.shape, regime.shape,
+                                            tax_bracket.shape, rent_indexation.shape,
+                                            expense_indexation.shape, *per_year_shapes)[0]
+        shape = (num_scenarios, years)
+
+        annual_rental_income = (rental_income * 12)[:, np.newaxis] * self.indexation_factors(rent_indexation, years)
+        annual_rental_income = np.broadcast_to(annual_rental_income, shape)
+        expenses = np.broadcast_to(
+            annual_expenses[:, np.newaxis] * self.indexation_factors(expense_indexation, years), shape)
+        interest = self._per_year(yearly_interest, shape)
+        year_depreciation = self._per_year(depreciation, shape)
+
+        building = None if building_depreciation is None else self._per_year(building_depreciation, shape)
+
+        reel = self._reel(annual_rental_income, expenses, interest, year_depreciation, building)
+
+        is_reel = np.broadcast_to(regime == 'reel', (num_scenarios,))[:, np.newaxis]
+        micro_deductions = annual_rental_income * self.micro_bic_rate
+        taxable_income = np.where(is_reel, reel['taxable_income'], annual_rental_income - micro_deductions)
+        tax_bracket_rate = np.broadcast_to(tax_bracket / 100, (num_scenarios,))[:, np.newaxis]
+        income_tax = taxable_income * tax_bracket_rate
+        social_charges = taxable_income * self.social_charges_rate
+        total_tax = income_tax + social_charges
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            effective_tax_rate = np.where(annual_rental_income > 0,
+                                          total_tax / annual_rental_income * 100, 0.0)
+
+        zeros = np.zeros(shape)
+        taxes = {
+            'rental_income': annual_rental_income,
+            'taxable_income': taxable_income,
+            'income_tax': income_tax,
+            'social_charges': social_charges,
+            'total_tax': total_tax,
+            'deductions': np.where(is_reel, expenses + interest + year_depreciation, micro_deductions),
+            'interest_deduction': np.where(is_reel, interest, zeros),
+            'depreciation_deduction': np.where(is_reel, year_depreciation, zeros),
+            'expenses_deduction': np.where(is_reel, expenses, zeros),
+            'depreciation_used': np.where(is_reel, reel['depreciation_used'], zeros),
+            'deficit_used': np.where(is_reel, reel['deficit_used'], zeros),
+            'deficit_carryforward': np.where(is_reel, reel['deficit_carryforward'], zeros),
+            'depreciation_carryforward': np.where(is_reel, reel['depreciation_carryforward'], zeros),
+            'effective_tax_rate': effective_tax_rate
+        }
+        if building is not None:
+            taxes['building_depreciation_used'] = np.where(is_reel, reel['building_depreciation_used'], zeros)
+        return taxes
+
+    @staticmethod
+    def _per_year(values, shape):
+        """Broadcast scalar, per-year or 2-D per-scenario values to (scenarios, years)"""
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1 and values.shape[0] != shape[1]:
+            # A 1-D array is always per year; per-scenario values must be given as (scenarios, 1)
+            raise ValueError(f"Expected {shape[1]} yearly values, got {values.shape[0]}; "
+                             "pass per-scenario values as a (scenarios, 1) array")
+        return np.broadcast_to(values, shape)
+
+    def _reel(self, rental_income, expenses, interest, depreciation, building=None):
+        """Carry-forward ledger for the régime réel, one vectorized pass per year.
+
+        With building depreciation, the building part of the deferred
+        depreciation is tracked too: each year's deduction takes it in
+        proportion to the building share of the year's depreciation and of
+        the deferred balance.
+        """
+        num_scenarios, years = rental_income.shape
+        window = self.DEFICIT_CARRYFORWARD_YEARS
+        result = rental_income - expenses - interest
+
+        deficits = np.zeros((num_scenarios, years))  # Remaining deficits by year of origin
+        deferred_depreciation = np.zeros(num_scenarios)
+        taxable_income = np.zeros((num_scenarios, years))
+        depreciation_used = np.zeros((num_scenarios, years))
+        deficit_used = np.zeros((num_scenarios, years))
+        deficit_carryforward = np.zeros((num_scenarios, years))
+        depreciation_carryforward = np.zeros((num_scenarios, years))
+        if building is not None:
+            deferred_building = np.zeros(num_scenarios)
+            building_used = np.zeros((num_scenarios, years))
+
+        for year in range(years):
+            profit = np.maximum(result[:, year], 0)
+            deficits[:, year] = np.maximum(-result[:, year], 0)
+
+            # Depreciation of the year can't create a deficit
+            current_depreciation = np.minimum(depreciation[:, year], profit)
+            profit = profit - current_depreciation
+
+            # Prior deficits, oldest first, within the carry-forward window
+            start = max(0, year - window)
+            available = deficits[:, start:year]
+            if available.shape[1]:
+                consumed = np.minimum(np.cumsum(available, axis=1), profit[:, np.newaxis])
+                used = np.diff(consumed, axis=1, prepend=0)
+                deficits[:, start:year] -= used
+                deficit_used[:, year] = consumed[:, -1]
+                profit = profit - consumed[:, -1]
+
+            # Deferred depreciation, then defer what the year couldn't absorb
+            deferred_used = np.minimum(deferred_depreciation, profit)
+            profit = profit - deferred_used
+            if building is not None:
+                current_building = current_depreciation * np.divide(
+                    building[:, year], depreciation[:, year],
+                    out=np.zeros(num_scenarios), where=depreciation[:, year] > 0)
+                deferred_building_used = deferred_used * np.divide(
+                    deferred_building, deferred_depreciation,
+                    out=np.zeros(num_scenarios), where=deferred_depreciation > 0)
+                deferred_building = deferred_building - deferred_building_used + \
+                    (building[:, year] - current_building)
+                building_used[:, year] = current_building + deferred_building_used
+            deferred_depreciation = deferred_depreciation - deferred_used + \
+                (depreciation[:, year] - current_depreciation)
+
+            taxable_income[:, year] = profit
+            depreciation_used[:, year] = current_depreciation + deferred_used
+            deficit_carryforward[:, year] = deficits[:, max(0, year + 1 - window):year + 1].sum(axis=1)
+            depreciation_carryforward[:, year] = deferred_depreciation
+
+        ledger = {
+            'taxable_income': taxable_income,
+            'depreciation_used': depreciation_used,
+            'deficit_used': deficit_used,
+            'deficit_carryforward': deficit_carryforward,
+            'depreciation_carryforward': depreciation_carryforward
+        }
+        if building is not None:
+            ledger['building_depreciation_used'] = building_used
+        return ledger
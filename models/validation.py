@@ -0,0 +1,429 @@
+import math
+
+
+class ValidationError(ValueError):
+    """Invalid request field, with the path of the field in the payload"""
+
+    def __init__(self, message, path=None):
+        super().__init__(message)
+        self.message = message
+        self.path = path or []
+
+    @property
+    def field(self):
+        field = ''
+        for part in self.path:
+            field += f'[{part}]' if isinstance(part, int) else (f'.{part}' if field else part)
+        return field
+
+    def __str__(self):
+        return f'{self.field} : {self.message}' if self.path else self.message
+
+    def __reduce__(self):
+        # Keep the path when raised in a calculation process
+        return self.__class__, (self.message, self.path)
+
+
+# Schemas are compiled once into nested closures; each validator takes a value,
+# raises ValidationError on the first problem and lets the value through as is.
+# Containers add their key to the error path on the way up, so the happy path
+# never builds path strings.
+
+def number(minimum=None, maximum=None, integer=False, coerce=False, exclusive_minimum=False):
+    """Finite int or float within [minimum, maximum], or (minimum, maximum] with exclusive_minimum;
+    numeric strings too with coerce"""
+    if exclusive_minimum:
+        range_message = f'doit être strictement supérieur à {minimum}' + \
+            (f' et inférieur ou égal à {maximum}' if maximum is not None else '')
+    elif minimum is not None and maximum is not None:
+        range_message = f'doit être compris entre {minimum} et {maximum}'
+    elif minimum is not None:
+        range_message = f'doit être supérieur ou égal à {minimum}'
+    else:
+        range_message = f'doit être inférieur ou égal à {maximum}'
+
+    def validate(value):
+        if value.__class__ not in (int, float):
+            if not (coerce and isinstance(value, str)):
+                raise ValidationError('doit être un nombre')
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValidationError('doit être un nombre') from None
+        if not math.isfinite(value):
+            raise ValidationError('doit être un nombre fini')
+        if integer and value != int(value):
+            raise ValidationError('doit être un entier')
+        if (minimum is not None and (value <= minimum if exclusive_minimum else value < minimum)) \
+                or (maximum is not None and value > maximum):
+            raise ValidationError(range_message)
+        return value
+    return validate
+
+
+def string(max_length=200, choices=None):
+    """String of at most max_length characters, optionally one of choices"""
+    choices = frozenset(choices) if choices else None
+    choices_message = f"doit être l'une des valeurs : {', '.join(sorted(choices))}" if choices else ''
+
+    def validate(value):
+        if not isinstance(value, str):
+            raise ValidationError('doit être une chaîne de caractères')
+        if len(value) > max_length:
+            raise ValidationError(f'longueur maximale {max_length} caractères')
+        if choices is not None and value not in choices:
+            raise ValidationError(choices_message)
+        return value
+    return validate
+
+
+def boolean():
+    def validate(value):
+        if value.__class__ is not bool:
+            raise ValidationError('doit être un booléen')
+        return value
+    return validate
+
+
+def array(items, max_items, min_items=0):
+    """List of at most max_items values, each checked by the items validator"""
+    def validate(value):
+        if not isinstance(value, list):
+            raise ValidationError('doit être une liste')
+        if len(value) > max_items:
+            raise ValidationError(f'au plus {max_items} éléments')
+        if len(value) < min_items:
+            raise ValidationError(f'au moins {min_items} éléments')
+        index = 0
+        try:
+            for index, item in enumerate(value):
+                items(item)
+        except ValidationError as e:
+            e.path.insert(0, index)
+            raise
+        return value
+    return validate
+
+
+def record(fields, required=(), check=None):
+    """Object with known fields; unknown keys are ignored and null optional fields count as absent.
+
+    check is an optional callable run on the whole object once its fields are
+    valid, for constraints spanning several fields.
+    """
+    fields = tuple(fields.items())
+    required = frozenset(required)
+
+    def validate(value):
+        if not isinstance(value, dict):
+            raise ValidationError('doit être un objet')
+        for name, validator in fields:
+            field = value.get(name)
+            if field is None:
+                if name in required:
+                    raise ValidationError('champ obligatoire', [name])
+                continue
+            try:
+                validator(field)
+            except ValidationError as e:
+                e.path.insert(0, name)
+                raise
+        if check is not None:
+            check(value)
+        return value
+    return validate
+
+
+def numeric_rows(columns, max_items, required=()):
+    """List of at most max_items objects of bounded numbers, such as a loan schedule.
+
+    columns maps each column to its (minimum, maximum) bounds. Rows are checked
+    in one loop with inlined comparisons, several times faster than a record
+    per row on schedules of hundreds of months; the first failing value is then
+    run through number() for the precise message.
+    """
+    columns = tuple((name, minimum, maximum, number(minimum, maximum)) for name, (minimum, maximum) in columns.items())
+    required = frozenset(required)
+    numeric = (int, float)
+
+    def validate(value):
+        if not isinstance(value, list):
+            raise ValidationError('doit être une liste')
+        if len(value) > max_items:
+            raise ValidationError(f'au plus {max_items} éléments')
+        for index, row in enumerate(value):
+            if row.__class__ is not dict:
+                raise ValidationError('doit être un objet', [index])
+            for name, minimum, maximum, validator in columns:
+                field = row.get(name)
+                if field is None:
+                    if name in required:
+                        raise ValidationError('champ obligatoire', [index, name])
+                elif field.__class__ not in numeric or not minimum <= field <= maximum:
+                    # NaN fails the comparison as well
+                    try:
+                        validator(field)
+                    except ValidationError as e:
+                        e.path[:0] = [index, name]
+                        raise
+        return value
+    return validate
+
+
+# Field types shared by the schemas
+AMOUNT = number(0, 1e9)
+MONTHLY_AMOUNT = number(0, 1e7)
+RATE = number(0, 1)
+SIGNED_RATE = number(-1, 1)
+PERCENT = number(0, 100)
+YEARS = number(1, 50, integer=True)
+MAX_SCHEDULE_MONTHS = 50 * 12
+
+# Columns the calculators and charts read from a client-supplied schedule
+SCHEDULE = numeric_rows({
+    'payment_num': (1, MAX_SCHEDULE_MONTHS),
+    'payment': (-1e9, 1e9),
+    'principal': (-1e9, 1e9),
+    'interest': (-1e9, 1e9),
+    'remaining_balance': (-1e9, 1e9),
+    'total_interest': (-1e9, 1e9),
+    'total_principal': (-1e9, 1e9)
+}, MAX_SCHEDULE_MONTHS, required=('interest',))
+
+# term_years defaults to 20 years in the calculations when a loan is given without it
+LOAN_DATA = record({
+    'loan_amount': AMOUNT,
+    'personal_deposit': AMOUNT,
+    'interest_rate': RATE,
+    'term_years': YEARS,
+    'monthly_payment': MONTHLY_AMOUNT,
+    'amortization_schedule': SCHEDULE
+})
+
+EXPENSES = record({key: MONTHLY_AMOUNT for key in (
+    'management_fees', 'property_tax', 'insurance', 'maintenance', 'condo_fees', 'other', 'total_monthly')})
+
+
+def investment_fields():
+    return {
+        'purchase_price': AMOUNT,
+        'notary_fees_rate': number(0, 0.5),
+        'rental_income': MONTHLY_AMOUNT,
+        'expenses': EXPENSES,
+        'tax_regime': string(20, ('micro_bic', 'reel')),
+        'tax_bracket': PERCENT,
+        'loan_interest': AMOUNT,
+        'loan_data': LOAN_DATA,
+        'appreciation_rate': number(-50, 50),
+        'projection_years': YEARS,
+        'rent_indexation': SIGNED_RATE,
+        'expense_indexation': SIGNED_RATE,
+        'personal_deposit': AMOUNT,
+        'city': string(100),
+        'resale_fees_rate': RATE,
+        'acquisition_month': number(1, 12, integer=True)
+    }
+
+
+INVESTMENT = record(investment_fields(), required=('purchase_price', 'rental_income', 'expenses'))
+
+# Receipt amounts arrive as form strings
+RECEIPT = record({
+    'landlord_name': string(200),
+    'landlord_address': string(500),
+    'tenant_name': string(200),
+    'property_address': string(500),
+    'rent_amount': number(0, 1e6, coerce=True),
+    'payment_date': string(20),
+    'period': string(100),
+    'charges': array(record({'description': string(200), 'amount': number(0, 1e6, coerce=True)},
+                            required=('description', 'amount')), 20)
+}, required=('landlord_name', 'landlord_address', 'tenant_name', 'property_address', 'rent_amount',
+             'payment_date', 'period'))
+
+
+def _required_without(key, fields):
+    """Check requiring fields when the object doesn't carry a key such as a scenarios batch"""
+    def check(value):
+        if value.get(key) is None:
+            for name in fields:
+                if value.get(name) is None:
+                    raise ValidationError('champ obligatoire', [name])
+    return check
+
+
+# Cells of the (scenarios, exit years, months) cash-flow matrix of a holding-period evaluation,
+# about 36 bytes each at the peak of the evaluation
+MAX_CASHFLOW_CELLS = 5_000_000
+DEFAULT_MAX_EXIT_YEARS = 30
+
+
+def cashflow_cells(scenarios, max_exit_years):
+    """Size of the cash-flow matrix evaluating scenarios for every exit year up to max_exit_years"""
+    return scenarios * max_exit_years * (max_exit_years * 12 + 1)
+
+
+def _holding_period_size(max_cells):
+    """Check bounding the cash-flow matrix, scenarios x exit years x months, of a holding-period request"""
+    required = _required_without('scenarios', ('purchase_price', 'rental_income'))
+
+    def check(value):
+        required(value)
+        scenarios = len(value.get('scenarios') or [value])
+        max_exit_years = int(value.get('max_exit_years') or DEFAULT_MAX_EXIT_YEARS)
+        if cashflow_cells(scenarios, max_exit_years) > max_cells:
+            raise ValidationError(f'trop de scénarios pour {max_exit_years} années de sortie '
+                                  f'(au plus {max_cells // cashflow_cells(1, max_exit_years)})', ['scenarios'])
+    return check
+
+
+MAX_SOLVER_VALUES = 1000
+MAX_SOLVER_GRID = 100000
+
+
+def _solver_grid_size(params):
+    sizes = [len(value) for value in params.values() if isinstance(value, list)]
+    if params.get('grid'):
+        total = math.prod(sizes)
+    else:
+        total = max(sizes, default=1)
+    if total > MAX_SOLVER_GRID:
+        raise ValidationError(f'au plus {MAX_SOLVER_GRID} combinaisons', ['grid'])
+
+
+def _solver_value(validator):
+    """Solver parameter: a single value, or a list of values to sweep"""
+    values = array(validator, MAX_SOLVER_VALUES)
+
+    def validate(value):
+        return values(value) if isinstance(value, list) else validator(value)
+    return validate
+
+
+_SOLVER_FIELDS = {
+    **{key: _solver_value(validator) for key, validator in (
+        ('monthly_income', MONTHLY_AMOUNT),
+        ('interest_rate', RATE),
+        ('term_years', YEARS),
+        ('existing_debts', MONTHLY_AMOUNT),
+        ('debt_ratio', RATE),
+        ('insurance_rate', RATE),
+        ('rental_income', MONTHLY_AMOUNT),
+        ('target_yield', number(0, 100, exclusive_minimum=True)),
+        ('monthly_expenses', MONTHLY_AMOUNT),
+        ('notary_fees_rate', RATE),
+        ('target_cashflow', number(-1e7, 1e7)),
+        ('personal_deposit', AMOUNT),
+        ('tax_bracket', PERCENT),
+        ('annual_expenses', AMOUNT),
+        ('purchase_price', AMOUNT))},
+    'tax_regime': _solver_value(string(20, ('micro_bic', 'reel'))),
+    'grid': boolean(),
+    'net': boolean(),
+    'after_tax': boolean()
+}
+SOLVER = record(_SOLVER_FIELDS, check=_solver_grid_size)
+# Parameters each solver cannot do without, the arguments of its method that have no default
+SOLVER_SCHEMAS = {solver: record(_SOLVER_FIELDS, required=required, check=_solver_grid_size)
+                  for solver, required in (
+                      ('borrowing-capacity', ('monthly_income', 'interest_rate', 'term_years')),
+                      ('max-price-yield', ('rental_income', 'target_yield')),
+                      ('max-price-cashflow', ('rental_income', 'monthly_expenses', 'target_cashflow',
+                                              'interest_rate', 'term_years')),
+                      ('min-deposit', ('purchase_price', 'rental_income', 'monthly_expenses', 'target_cashflow',
+                                       'interest_rate', 'term_years')))}
+
+
+def _solver_parameters(params):
+    SOLVER_SCHEMAS.get(params['solver'], SOLVER)(params)
+
+HOLDING_PERIOD_FIELDS = {
+    **investment_fields(),
+    'max_exit_years': YEARS,
+    'discount_rate': SIGNED_RATE
+}
+SCENARIO = record({'name': string(200), 'city': string(100), 'inputs': INVESTMENT}, required=('inputs',))
+CALCULATE_LOAN = record({
+    'loan_amount': number(0, 1e9, exclusive_minimum=True),
+    'interest_rate': RATE,
+    'term_years': YEARS,
+    'personal_deposit': AMOUNT,
+    'money_mode': string(10, ('float', 'cents'))
+}, required=('loan_amount', 'interest_rate', 'term_years'))
+
+# Filters and sorting of saved scenarios; query string values are numeric strings
+SCENARIO_FILTERS = {
+    'city': string(100),
+    'sort': string(20, ('created_at', 'gross_yield', 'after_tax_roi', 'cashflow')),
+    'order': string(4, ('asc', 'desc'))
+}
+SCENARIO_QUERY = record({
+    **SCENARIO_FILTERS,
+    **{key: number(-1e9, 1e9, coerce=True) for key in ('min_gross_yield', 'max_gross_yield', 'min_after_tax_roi',
+                                                       'min_cashflow', 'max_cashflow')},
+    'page': number(1, 1e6, integer=True, coerce=True),
+    'per_page': number(1, 1000, integer=True, coerce=True)
+})
+
+# Listing screening options and the assumptions applied to every listing, sent as form fields
+SCREEN = record({
+    'metric': string(20, ('gross_yield', 'after_tax_yield', 'cashflow', 'irr')),
+    'top_k': number(1, 1000, integer=True, coerce=True),
+    'notary_fees_rate': number(0, 1, coerce=True),
+    'deposit_rate': number(0, 1, coerce=True),
+    'interest_rate': number(0, 1, coerce=True),
+    'term_years': number(1, 50, integer=True, coerce=True),
+    'tax_regime': string(20, ('micro_bic', 'reel')),
+    'tax_bracket': number(0, 100, coerce=True),
+    'appreciation_rate': number(-50, 50, coerce=True),
+    'holding_years': number(1, 50, integer=True, coerce=True)
+})
+
+CHART_FIELDS = {
+    'max_points': number(3, 2000, integer=True),
+    'format': string(10, ('series', 'plotly'))
+}
+
+SCHEMAS = {
+    'calculate-investment': record({
+        **investment_fields(),
+        'charts': record(CHART_FIELDS)
+    }, required=('purchase_price', 'rental_income', 'expenses')),
+    'calculate-loan': CALCULATE_LOAN,
+    'charts': record({
+        **investment_fields(),
+        **CHART_FIELDS
+    }, required=('purchase_price', 'rental_income', 'expenses')),
+    'live-update': record({
+        'fields': record(investment_fields()),
+        'replace': boolean()
+    }, required=('fields',)),
+    'holding-period': record({
+        **HOLDING_PERIOD_FIELDS,
+        'scenarios': array(INVESTMENT, 1000, min_items=1)
+    }, check=_holding_period_size(MAX_CASHFLOW_CELLS)),
+    'solve': SOLVER,
+    'scenarios': record({
+        'name': string(200),
+        'city': string(100),
+        'inputs': INVESTMENT,
+        'scenarios': array(SCENARIO, 1000, min_items=1)
+    }, check=_required_without('scenarios', ('inputs',))),
+    'receipt': RECEIPT
+}
+
+# Exports accept larger batches, their rows being streamed
+EXPORT_SCHEMAS = {
+    'loan-schedule': CALCULATE_LOAN,
+    'yearly-tax': INVESTMENT,
+    'holding-period': record({
+        **HOLDING_PERIOD_FIELDS,
+        'scenarios': array(INVESTMENT, 10000, min_items=1)
+    }, check=_holding_period_size(10 * MAX_CASHFLOW_CELLS)),
+    'solver-grid': record({'solver': string(50)}, required=('solver',), check=_solver_parameters),
+    'scenarios': record({
+        **{key: number(-1e9, 1e9) for key in ('min_gross_yield', 'max_gross_yield', 'min_after_tax_roi',
+                                              'min_cashflow', 'max_cashflow')},
+        **SCENARIO_FILTERS
+    })
+}
@@ -25,14 +25,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
 async function calculateAll() {
     try {
-        // Get investment data
         const purchasePrice = parseFloat(document.getElementById('purchasePrice').value);
-        const notaryFeesRate = parseFloat(document.getElementById('notaryFeesRate').value) || 8.0;
         const rentalIncome = parseFloat(document.getElementById('rentalIncome').value);
-        const charges = calculateMonthlyCharges();
-        const personalDeposit = parseFloat(document.getElementById('personalDeposit').value) || 0;
-        const taxRegime = document.getElementById('taxRegime').value;
-        const taxBracket = parseFloat(document.getElementById('taxBracket').value);
 
         // Validate required fields
         if (!purchasePrice || !rentalIncome) {
@@ -40,70 +34,30 @@ async function calculateAll() {
             return;
         }
 
-        // Calculate loan amount
-        const totalPurchaseCost = purchasePrice * (1 + notaryFeesRate / 100);
-        const loanAmount = totalPurchaseCost - personalDeposit;
-        
-        // Get loan data
-        const interestRate = parseFloat(document.getElementById('interestRate').value) || 0;
-        const loanTerm = parseInt(document.getElementById('loanTerm').value) || 25;
-
-        // First get loan calculation
-        const loanResponse = await fetch('/api/calculate-loan', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                loan_amount: loanAmount,
-                interest_rate: interestRate / 100,
-                term_years: loanTerm,
-                personal_deposit: personalDeposit
-            })
-        });
-        const loanResult = await loanResponse.json();
-
-        if (!loanResponse.ok || !loanResult.success) {
-            throw new Error(loanResult.error || 'Loan calculation failed');
-        }
-
-        // Then include loan data in investment calculation
-        const investmentResponse = await fetch('/api/calculate-investment', {
+        // One request: the server generates the loan schedule and prepares the chart
+        // figures from the same analysis, the schedule never leaves it
+        const response = await fetch('/api/calculate-investment', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
-                purchase_price: purchasePrice,
-                notary_fees_rate: notaryFeesRate / 100,
-                rental_income: rentalIncome,
-                expenses: {
-                    management_fees: charges.managementFees,
-                    property_tax: charges.propertyTax,
-                    insurance: charges.insurance,
-                    maintenance: charges.maintenanceProvision,
-                    condo_fees: charges.condoFees,
-                    other: charges.otherCharges,
-                    total_monthly: charges.total
-                },
-                tax_regime: taxRegime,
-                tax_bracket: taxBracket,
-                loan_data: {
-                    term_years: loanResult.data.term_years,
-                    interest_rate: loanResult.data.interest_rate,
-                    monthly_payment: loanResult.data.monthly_payment,
-                    amortization_schedule: loanResult.data.amortization_schedule || []
-                }
+                ...collectLiveParams(),
+                charts: { format: 'plotly' }
             })
         });
-        const investmentResult = await investmentResponse.json();
+        const result = await response.json();
 
-        if (!investmentResponse.ok || !investmentResult.success) {
-            throw new Error(investmentResult.error || 'Investment calculation failed');
+        if (!response.ok || !result.success) {
+            throw new Error(result.error || 'Investment calculation failed');
         }
 
-        console.log('Investment Result:', investmentResult);
-        console.log('Loan Result:', loanResult);
+        const { charts, loan, ...investmentData } = result.data;
+        const loanData = loan || {};
+        console.log('Investment Result:', result);
         // Add debug logging for tax data
-        console.log('Tax Data:', investmentResult.data.yearly_tax_data);
+        console.log('Tax Data:', investmentData.yearly_tax_data);
 
-        updateResults(investmentResult.data, loanResult.data);
+        updateResults(investmentData, loanData, charts);
+        startLiveRecalc(investmentData, loanData);
         document.getElementById('results').style.display = 'block';
         document.getElementById('results').scrollIntoView({ behavior: 'smooth' });
     } catch (error) {
@@ -112,7 +66,131 @@ async function calculateAll() {
     }
 }
 
-function updateResults(investmentData, loanData) {
+function collectInvestmentParams() {
+    const charges = calculateMonthlyCharges();
+    return {
+        purchase_price: parseFloat(document.getElementById('purchasePrice').value),
+        notary_fees_rate: (parseFloat(document.getElementById('notaryFeesRate').value) || 8.0) / 100,
+        rental_income: parseFloat(document.getElementById('rentalIncome').value),
+        expenses: {
+            management_fees: charges.managementFees,
+            property_tax: charges.propertyTax,
+            insurance: charges.insurance,
+            maintenance: charges.maintenanceProvision,
+            condo_fees: charges.condoFees,
+            other: charges.otherCharges,
+            total_monthly: charges.total
+        },
+        tax_regime: document.getElementById('taxRegime').value,
+        tax_bracket: parseFloat(document.getElementById('taxBracket').value)
+    };
+}
+
+// Live recalculation: once a full calculation has run, edited fields are
+// posted as deltas and the server pushes back the result sections that changed.
+// The session lives in the server worker holding the event stream; when a delta
+// reaches another worker it is refused, the edit goes through a full calculation
+// and the next post sends the whole scenario again.
+const liveState = { source: null, params: null, timer: null, investmentData: null, loanData: null, resync: false };
+
+function collectLiveParams() {
+    const params = collectInvestmentParams();
+    const totalCost = params.purchase_price * (1 + params.notary_fees_rate);
+    const personalDeposit = parseFloat(document.getElementById('personalDeposit').value) || 0;
+    params.appreciation_rate = parseFloat(document.getElementById('appreciationRate').value) || 2.0;
+    params.loan_data = {
+        loan_amount: Math.max(0, totalCost - personalDeposit),
+        interest_rate: (parseFloat(document.getElementById('interestRate').value) || 0) / 100,
+        term_years: parseInt(document.getElementById('loanTerm').value) || 25,
+        personal_deposit: personalDeposit
+    };
+    return params;
+}
+
+function diffParams(previous, current) {
+    const delta = {};
+    for (const [key, value] of Object.entries(current)) {
+        if (value && typeof value === 'object') {
+            const nested = diffParams(previous[key] || {}, value);
+            if (Object.keys(nested).length > 0) delta[key] = nested;
+        } else if (previous[key] !== value) {
+            delta[key] = value;
+        }
+    }
+    return delta;
+}
+
+async function postLiveFields(fields, replace = false) {
+    if (liveState.resync) {
+        fields = liveState.params;
+        replace = true;
+    }
+    const response = await fetch('/api/live/update', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ fields, replace })
+    });
+    liveState.resync = !response.ok;
+    if (response.status === 409) recalculateFully();
+}
+
+async function recalculateFully() {
+    try {
+        const response = await fetch('/api/calculate-investment', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...liveState.params, charts: { format: 'plotly' } })
+        });
+        const result = await response.json();
+        if (!response.ok || !result.success) return;
+        const { charts, loan, ...investmentData } = result.data;
+        Object.assign(liveState.investmentData, investmentData);
+        Object.assign(liveState.loanData, loan || {});
+        updateResults(liveState.investmentData, liveState.loanData, charts);
+    } catch (error) {
+        console.error('Error:', error);
+    }
+}
+
+function startLiveRecalc(investmentData, loanData) {
+    liveState.investmentData = investmentData;
+    liveState.loanData = loanData;
+    liveState.params = collectLiveParams();
+
+    if (liveState.source) {
+        postLiveFields(liveState.params, true);
+        return;
+    }
+    liveState.source = new EventSource('/api/live/stream');
+    // The whole scenario is sent once the stream is open, again after each reconnection
+    liveState.source.addEventListener('open', () => postLiveFields(liveState.params, true));
+    liveState.source.addEventListener('update', (event) => {
+        const { sections } = JSON.parse(event.data);
+        const { loan, charts, ...investmentSections } = sections;
+        Object.assign(liveState.investmentData, investmentSections);
+        if (loan) {
+            Object.assign(liveState.loanData, loan);
+            updateLoanResults(liveState.loanData);
+        }
+        updateInvestmentResults({ investmentData: liveState.investmentData, loanData: liveState.loanData });
+        updateCharts(liveState.investmentData, liveState.loanData, charts || {});
+    });
+
+    ['investmentForm', 'loanForm'].forEach(formId => {
+        document.getElementById(formId).addEventListener('input', () => {
+            clearTimeout(liveState.timer);
+            liveState.timer = setTimeout(() => {
+                const params = collectLiveParams();
+                if (!params.purchase_price || !params.rental_income) return;
+                const delta = diffParams(liveState.params, params);
+                liveState.params = params;
+                if (Object.keys(delta).length > 0) postLiveFields(delta);
+            }, 150);
+        });
+    });
+}
+
+function updateResults(investmentData, loanData, charts) {
     console.log('Updating results with:', { investmentData, loanData });
 
     // Update loan results with loan data
@@ -122,12 +200,23 @@ function updateResults(investmentData, loanData) {
     updateInvestmentResults({ investmentData, loanData });
 
     // Create all charts
-    createAmortizationChart(loanData.amortization_schedule);
-    createEquityChart(loanData, investmentData);
-    createTaxImpactChart(investmentData);
+    updateCharts(investmentData, loanData, charts);
+}
+
+// Server figures are redrawn when present, live updates only carrying the ones that changed
+const CHART_ELEMENTS = {
+    amortization: 'amortizationChart',
+    equity: 'equityChart',
+    tax_impact: 'taxChart',
+    cashflow: 'cashflowChart'
+};
+
+function updateCharts(investmentData, loanData, charts) {
+    for (const [name, figure] of Object.entries(charts)) {
+        if (CHART_ELEMENTS[name]) drawChart(CHART_ELEMENTS[name], figure);
+    }
     createReturnMetricsChart(investmentData, loanData);
     createExpensesChart(investmentData.expense_breakdown);
-    createCashflowChart(investmentData, loanData);
 }
 
 function updateLoanResults(data) {
@@ -145,11 +234,6 @@ function updateLoanResults(data) {
 
     // Show the loan summary div
     document.getElementById('loanSummary').style.display = 'block';
-
-    // Create amortization schedule chart if we have schedule data
-    if (data.amortization_schedule && data.amortization_schedule.length > 0) {
-        createAmortizationChart(data.amortization_schedule);
-    }
 }
 
 function updateInvestmentResults({ investmentData, loanData }) {
@@ -535,225 +619,18 @@ async function calculateLoan() {
     }
 }
 
-function createCashflowChart(investmentData, loanData) {
-    // Format number function using French locale
-    const formatNumber = (value) => {
-        return new Intl.NumberFormat('fr-FR', {
-            minimumFractionDigits: 0,
-            maximumFractionDigits: 0,
-            style: 'decimal'
-        }).format(Math.abs(value)) + ' €';
-    };
-
-    // Prepare data for waterfall chart
-    const items = [
-        { name: 'Loyer', value: investmentData.rental_income, color: '#28a745' },  // Green for income
-        { name: 'Frais de gestion', value: -investmentData.expense_breakdown.management_fees, color: '#dc3545' },
-        { name: 'Taxe foncière', value: -investmentData.expense_breakdown.property_tax, color: '#dc3545' },
-        { name: 'Assurance', value: -investmentData.expense_breakdown.insurance, color: '#dc3545' },
-        { name: 'Provision travaux', value: -investmentData.expense_breakdown.maintenance, color: '#dc3545' },
-        { name: 'Charges copro', value: -investmentData.expense_breakdown.condo_fees, color: '#dc3545' },
-        { name: 'Autres charges', value: -investmentData.expense_breakdown.other, color: '#dc3545' },
-        { name: 'Mensualité prêt', value: -loanData.monthly_payment, color: '#ffc107' },  // Yellow for loan
-        { name: 'Cash-flow net', value: investmentData.after_tax_monthly_cashflow, color: '#007bff' }  // Blue for result
-    ];
-
-    // Filter out items with zero value
-    const filteredItems = items.filter(item => item.value !== 0);
-
-    const trace = {
-        type: 'waterfall',
-        name: "Cash Flow",
-        orientation: "v",
-        measure: filteredItems.map((_, i) => i === filteredItems.length - 1 ? "total" : "relative"),
-        x: filteredItems.map(item => item.name),
-        textposition: "outside",
-        text: filteredItems.map(item => formatNumber(item.value)),
-        y: filteredItems.map(item => item.value),
-        connector: {
-            line: {
-                color: "rgb(63, 63, 63)"
-            }
-        },
-        decreasing: { marker: { color: "#dc3545" } },  // Red for expenses
-        increasing: { marker: { color: "#28a745" } },  // Green for income
-        totals: { marker: { color: "#007bff" } }      // Blue for total
-    };
-
-    const layout = {
-        xaxis: {
-            type: 'category',
-            tickangle: -45
-        },
-        yaxis: {
-            title: 'Euros (€)',
-            tickformat: ' ,.0f',  // Space before comma for French thousands separator
-            automargin: true,
-            hoverformat: ' ,.0f €'  // Consistent hover format
-        },
-        showlegend: false,
-        margin: { t: 20, b: 80, l: 40, r: 40 },
-        height: 400,
-        width: null,
-        autosize: true,
-        responsive: true
-    };
-
+// Draw a Plotly figure prepared by the server
+function drawChart(elementId, figure) {
     const config = {
         responsive: true,
         displayModeBar: false,
-        displaylogo: false,
-        modeBarButtons: [['zoom2d', 'pan2d', 'resetScale2d', 'toImage']]
+        displaylogo: false
     };
 
-    Plotly.newPlot('cashflowChart', [trace], layout, config);
-}
-
-function createTaxImpactChart(investmentData) {
-    // Validate input data
-    if (!investmentData || !investmentData.yearly_tax_data || !Array.isArray(investmentData.yearly_tax_data)) {
-        console.error('Invalid investment data for tax impact chart:', investmentData);
-        return;
-    }
-
-    const yearlyData = investmentData.yearly_tax_data;
-    const regime = investmentData.tax_regime;  // Get tax regime from response
-    console.log('Creating tax impact chart with regime:', regime);  // Debug log
-    
-    // Prepare data arrays
-    const years = yearlyData.map(d => d.year);
-    const annualRentalIncome = yearlyData.map(d => investmentData.rental_income * 12); // Convert monthly to annual
-    
-    const data = [];
-    
-    // Add rental income bar (positive)
-    data.push({
-        x: years,
-        y: annualRentalIncome,
-        name: 'Revenu Locatif',
-        type: 'bar',
-        marker: { color: '#2ecc71' }  // Green
-    });
-    
-    if (regime === 'reel') {
-        // Add deduction bars for Régime Réel (negative)
-        const expensesDeduction = yearlyData.map(d => -d.expenses_deduction);
-        const interestDeduction = yearlyData.map(d => -d.interest_deduction);
-        const depreciationDeduction = yearlyData.map(d => -d.depreciation_deduction);
-
-        // Only add bars if they have non-zero values
-        if (expensesDeduction.some(v => v !== 0)) {
-            data.push({
-                x: years,
-                y: expensesDeduction,
-                name: 'Charges',
-                type: 'bar',
-                marker: { color: '#e74c3c' }  // Red
-            });
-        }
-
-        if (interestDeduction.some(v => v !== 0)) {
-            data.push({
-                x: years,
-                y: interestDeduction,
-                name: 'Intérêts',
-                type: 'bar',
-                marker: { color: '#3498db' }  // Blue
-            });
-        }
-
-        if (depreciationDeduction.some(v => v !== 0)) {
-            data.push({
-                x: years,
-                y: depreciationDeduction,
-                name: 'Amortissements',
-                type: 'bar',
-                marker: { color: '#f1c40f' }  // Yellow
-            });
-        }
-    } else {
-        // Add single flat deduction bar for Micro-BIC (negative)
-        const flatDeduction = annualRentalIncome.map(income => -income * 0.5);  // 50% flat deduction
-        data.push({
-            x: years,
-            y: flatDeduction,
-            name: 'Abattement 50%',
-            type: 'bar',
-            marker: { color: '#e74c3c' }  // Red
-        });
-    }
-    
-    // Add taxable income line
-    data.push({
-        x: years,
-        y: yearlyData.map(d => d.taxable_income),
-        name: 'Revenu Net Imposable',
-        type: 'scatter',
-        mode: 'lines+markers',
-        line: { color: '#8e44ad', width: 3 },  // Purple
-        marker: { size: 8 }
-    });
-    
-    // Add total tax line
-    data.push({
-        x: years,
-        y: yearlyData.map(d => d.total_tax),
-        name: 'Impôts Totaux',
-        type: 'scatter',
-        mode: 'lines+markers',
-        line: { color: '#e67e22', width: 3 },  // Orange
-        marker: { size: 8 }
-    });
-    
-    // Add effective tax rate line on secondary axis
-    data.push({
-        x: years,
-        y: yearlyData.map(d => d.effective_tax_rate),
-        name: 'Taux Effectif (%)',
-        type: 'scatter',
-        yaxis: 'y2',
-        mode: 'lines+markers',
-        line: { color: '#16a085', width: 3, dash: 'dot' },  // Turquoise
-        marker: { size: 8 }
-    });
-    
-    const layout = {
-        barmode: 'relative',
-        showlegend: true,
-        legend: {
-            orientation: 'h',
-            y: -0.2
-        },
-        margin: { t: 20, b: 80, l: 40, r: 40 },
-        height: 400,
-        width: null,
-        autosize: true,
-        responsive: true,
-        yaxis: {
-            title: 'Montant (€)',
-            tickformat: ',.0f',
-            side: 'left'
-        },
-        yaxis2: {
-            title: 'Taux Effectif (%)',
-            tickformat: ',.1f',
-            overlaying: 'y',
-            side: 'right',
-            rangemode: 'tozero'
-        }
-    };
-    
-    const config = {
-        responsive: true,
-        displayModeBar: false,
-        displaylogo: false,
-        modeBarButtons: [['zoom2d', 'pan2d', 'resetScale2d', 'toImage']]
-    };
-    
     try {
-        Plotly.newPlot('taxChart', data, layout, config);
+        Plotly.newPlot(elementId, figure.data, figure.layout, config);
     } catch (error) {
-        console.error('Error creating tax impact chart:', error);
+        console.error(`Error creating chart ${elementId}:`, error);
     }
 }
 
@@ -821,139 +698,6 @@ function createReturnMetricsChart(investmentData, loanData) {
     Plotly.newPlot('returnMetricsChart', data, layout, config);
 }
 
-function createAmortizationChart(schedule) {
-    const trace1 = {
-        x: schedule.map(item => item.payment_num),
-        y: schedule.map(item => item.principal),
-        name: 'Principal',
-        type: 'scatter'
-    };
-
-    const trace2 = {
-        x: schedule.map(item => item.payment_num),
-        y: schedule.map(item => item.interest),
-        name: 'Intérêts',
-        type: 'scatter'
-    };
-
-    const layout = {
-        showlegend: true,
-        legend: {
-            orientation: 'h',
-            y: -0.2
-        },
-        margin: { t: 20, b: 80, l: 40, r: 40 },
-        height: 400,
-        width: null,
-        autosize: true,
-        responsive: true,
-        xaxis: {
-            title: 'Numéro de paiement',
-            automargin: true
-        },
-        yaxis: {
-            title: 'Euros (€)',
-            automargin: true,
-            tickformat: ',.0f'
-        }
-    };
-
-    const config = {
-        responsive: true,
-        displayModeBar: false,
-        displaylogo: false
-    };
-
-    Plotly.newPlot('amortizationChart', [trace1, trace2], layout, config);
-}
-
-function createEquityChart(loanData, investmentData) {
-    const purchasePrice = investmentData.purchase_costs.purchase_price;
-    const appreciationRate = parseFloat(document.getElementById('appreciationRate').value) / 100 || 0.02;
-    const years = loanData.term_years;
-    const loanAmount = loanData.loan_amount;
-    const schedule = loanData.amortization_schedule;
-    
-    // Create yearly data points from 0 to loan term
-    const xValues = Array.from({length: years}, (_, i) => i);
-    
-    // Calculate property value with appreciation for each year
-    const propertyValues = xValues.map(year => 
-        purchasePrice * Math.pow(1 + appreciationRate, year)
-    );
-    
-    // Get remaining loan balance at each year
-    // Start with initial loan amount, then add yearly balances
-    const yearlyData = schedule.filter(entry => entry.payment_num % 12 === 0);
-    const loanBalance = [loanAmount, ...yearlyData.slice(0, years).map(entry => entry.remaining_balance)];
-    
-    // Calculate equity (property value - loan balance)
-    const equity = propertyValues.map((value, index) => 
-        value - (loanBalance[index] || 0)  // Use 0 if balance undefined (loan fully paid)
-    );
-    
-    const data = [
-        {
-            x: xValues,
-            y: propertyValues,
-            name: 'Valeur du bien',
-            type: 'scatter',
-            mode: 'lines',
-            line: { color: '#2ecc71' }
-        },
-        {
-            x: xValues,
-            y: loanBalance,
-            name: 'Solde du prêt',
-            type: 'scatter',
-            mode: 'lines',
-            line: { color: '#e74c3c' }
-        },
-        {
-            x: xValues,
-            y: equity,
-            name: 'Fonds propres',
-            type: 'scatter',
-            mode: 'lines',
-            line: { color: '#3498db' }
-        }
-    ];
-    
-    const layout = {
-        showlegend: true,
-        legend: {
-            orientation: 'h',
-            y: -0.2
-        },
-        margin: { t: 20, b: 80, l: 40, r: 40 },
-        height: 400,
-        width: null,
-        autosize: true,
-        responsive: true,
-        xaxis: {
-            title: 'Années',
-            tickformat: 'd',
-            range: [0, years],
-            dtick: Math.ceil(years / 10),
-            automargin: true
-        },
-        yaxis: {
-            title: 'Montant (€)',
-            tickformat: ',.0f',
-            range: [0, Math.max(...propertyValues)],
-            automargin: true
-        }
-    };
-
-    const config = {
-        responsive: true,
-        displayModeBar: false,
-        displaylogo: false
-    };
-
-    Plotly.newPlot('equityChart', data, layout, config);
-}
-
 function showError(message) {
     const errorDiv = document.getElementById('errorMessage') || createErrorDiv();
     errorDiv.textContent = message;
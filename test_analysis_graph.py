@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from models.analysis_graph import AnalysisGraph, AnalysisSessionStore
+from models.investment_calculator import InvestmentCalculator
+from models.loan_calculator import LoanCalculator
+
+
+def test_tax_bracket_change_only_recomputes_tax_nodes(build_params):
+    graph = AnalysisGraph(InvestmentCalculator())
+    graph.analyze(build_params())
+    assert len(graph.recomputed) == len(graph.nodes)
+
+    result = graph.analyze(build_params(tax_bracket=41))
+    assert sorted(graph.recomputed) == ['tax_impact', 'total_roi', 'yearly_tax']
+    assert result == InvestmentCalculator().analyze_investment(build_params(tax_bracket=41))
+
+
+def test_unchanged_inputs_recompute_nothing(build_params):
+    graph = AnalysisGraph(InvestmentCalculator())
+    graph.analyze(build_params())
+    graph.analyze(build_params())
+    assert graph.recomputed == []
+
+
+def test_purchase_price_change_invalidates_downstream(build_params):
+    graph = AnalysisGraph(InvestmentCalculator())
+    graph.analyze(build_params())
+    graph.analyze(build_params(purchase_price=250000))
+    assert 'depreciation' in graph.recomputed
+    assert 'yearly_tax' in graph.recomputed
+    assert 'expenses' not in graph.recomputed
+    assert 'yearly_interest' not in graph.recomputed
+
+
+def test_session_store_evicts_least_recently_used(build_params):
+    store = AnalysisSessionStore(InvestmentCalculator(), max_sessions=2)
+    for session_id in ('a', 'b', 'c'):
+        store.analyze(session_id, build_params())
+    assert list(store._graphs) == ['b', 'c']
+
+
+def test_loan_without_term_defaults_to_twenty_years(build_params):
+    graph = AnalysisGraph(InvestmentCalculator(), LoanCalculator())
+    result = graph.analyze(build_params(loan_data={'loan_amount': 150000, 'interest_rate': 0.035}))
+    assert result['loan']['term_years'] == 20
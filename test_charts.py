@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from models.analysis_graph import AnalysisSessionStore
+from models.charts import ChartBuilder
+from models.investment_calculator import InvestmentCalculator
+from models.loan_calculator import LoanCalculator
+
+
+@pytest.fixture
+def build_chart_params(build_params):
+    return lambda **overrides: build_params(loan_data={'loan_amount': 200000, 'interest_rate': 0.04,
+                                                       'term_years': 25}, **overrides)
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000)
+    y = np.sin(x / 50)
+    y[437] = 10  # Spike
+    kept = ChartBuilder.lttb(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 437 in kept
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_series_are_downsampled_and_aggregated(build_chart_params):
+    builder = ChartBuilder(InvestmentCalculator(), LoanCalculator())
+    series = builder.series(build_chart_params(), max_points=60)
+    schedule = LoanCalculator().generate_amortization_schedule(200000, 0.04, 25)
+    assert len(series['amortization']['interest']['x']) == 60
+    assert len(series['amortization']['yearly']['years']) == 25
+    assert np.isclose(sum(series['amortization']['yearly']['interest']), schedule[-1]['total_interest'])
+    assert series['equity']['loan_balance'][0] == 200000
+    assert np.isclose(series['equity']['loan_balance'][1], schedule[11]['remaining_balance'])
+    assert [deduction['name'] for deduction in series['tax_impact']['deductions']] == \
+        ['Charges', 'Intérêts', 'Amortissements']
+
+
+def test_figures_are_cached_per_input(build_chart_params):
+    builder = ChartBuilder(InvestmentCalculator(), LoanCalculator())
+    figures = builder.figures(build_chart_params())
+    assert builder.figures(build_chart_params()) is figures
+    assert builder.figures(build_chart_params(tax_regime='micro_bic')) is not figures
+    assert 'template' not in figures['equity']['layout']
+
+
+def test_charts_read_the_session_graph_without_a_schedule(build_params):
+    calculator = InvestmentCalculator()
+    builder = ChartBuilder(calculator, LoanCalculator())
+    sessions = AnalysisSessionStore(calculator)
+    params = build_params(loan_data={'loan_amount': 200000, 'interest_rate': 0.04, 'term_years': 25})
+    result, series = sessions.analyze_with('client', params, builder.graph_series)
+    assert series == builder.series(params)
+    assert result['loan']['total_interest'] > 0
+    assert 'amortization_schedule' not in result['loan']
+
+    # No loan at all, or a loan without its term
+    without_loan = builder.series(build_params(loan_data=None))
+    assert without_loan['amortization']['principal']['x'] == []
+    assert len(without_loan['equity']['years']) == 21
+    without_term = builder.series(build_params(loan_data={'loan_amount': 200000, 'interest_rate': 0.04}))
+    assert len(without_term['amortization']['yearly']['years']) == 20
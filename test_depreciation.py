@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from models.depreciation import DepreciationModel
+from models.investment_calculator import InvestmentCalculator
+
+
+def test_components_are_fully_depreciated_with_a_first_year_prorata():
+    model = DepreciationModel()
+    matrix = model.schedule(200000, 16000, acquisition_month=10)
+    assert matrix.shape == (len(model.COMPONENTS), model.horizon)
+    assert np.isclose(matrix.sum(), 200000 * (1 - model.LAND_SHARE) + 16000)
+
+    furniture = matrix[model.keys.index('mobilier')]
+    assert np.allclose(furniture[:7], [1000, 4000, 4000, 4000, 4000, 3000, 0])
+
+
+def test_schedules_are_shared_by_identical_purchases():
+    model = DepreciationModel()
+    first = model.schedule(200000, 16000)
+    assert model.schedule(200000.0, 16000) is first
+    assert not first.flags.writeable
+    assert model.cache_info().hits == 1
+
+    batch = model.schedule(np.array([100000, 200000]), np.array([8000, 16000]), np.array([3, 1]))
+    assert np.allclose(batch[1], first)
+    assert np.allclose(batch[0], model.schedule(100000, 8000, 3))
+
+
+def test_yearly_tax_follows_the_component_schedule(build_params):
+    calculator = InvestmentCalculator()
+    result = calculator.analyze_investment(build_params(tax_regime='reel', acquisition_month=7,
+                                                        projection_years=30))
+    deductions = [year['depreciation_deduction'] for year in result['yearly_tax_data']]
+    expected = calculator.calculate_depreciation(200000, 16000, 7)['yearly'][:30]
+    assert np.allclose(deductions, expected)
+    assert deductions[0] < deductions[1]
+    assert deductions[4] > deductions[5] > deductions[6]  # Furniture written off mid-year 6
+
+
+def test_headline_tax_uses_a_full_year_of_depreciation(build_params):
+    calculator = InvestmentCalculator()
+    january = calculator.analyze_investment(build_params(tax_regime='reel'))
+    october = calculator.analyze_investment(build_params(tax_regime='reel', acquisition_month=10))
+    assert october['yearly_tax_data'][0]['depreciation_deduction'] < \
+        january['yearly_tax_data'][0]['depreciation_deduction']
+    assert october['tax_impact'] == january['tax_impact']
+    assert october['roi_breakdown'] == january['roi_breakdown']
+    depreciation = calculator.calculate_depreciation(200000, 16000, 10)
+    assert np.isclose(depreciation['full_year'], calculator.calculate_depreciation(200000, 16000)['total'])
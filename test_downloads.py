@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+from flask import Flask, request
+
+from models.downloads import DownloadServer, store_content_addressed
+
+
+def client_for(directory, offload=None):
+    app = Flask(__name__)
+    server = DownloadServer(directory, offload)
+
+    @app.route('/download/<path:filename>')
+    def download(filename):
+        return server.response(filename, request.environ) or ('', 404)
+
+    return app.test_client()
+
+
+@pytest.fixture
+def receipts(tmp_path):
+    directory = tmp_path / 'receipts'
+    directory.mkdir()
+    (tmp_path / 'secret.txt').write_text('secret')
+    pdf = directory / 'receipt_draft.pdf'
+    pdf.write_bytes(b'%PDF-1.4 ' + bytes(range(256)) * 4)
+    return directory
+
+
+def test_validators_and_ranges(receipts):
+    client = client_for(receipts)
+    response = client.get('/download/receipt_draft.pdf')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].startswith('attachment')
+    assert 'no-cache' in response.headers['Cache-Control']
+
+    again = client.get('/download/receipt_draft.pdf', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+
+    partial = client.get('/download/receipt_draft.pdf', headers={'Range': 'bytes=9-18'})
+    assert partial.status_code == 206
+    assert partial.data == bytes(range(10))
+
+
+def test_content_addressed_files_are_immutable(receipts):
+    path = store_content_addressed(str(receipts / 'receipt_draft.pdf'))
+    name = os.path.basename(path)
+    assert not (receipts / 'receipt_draft.pdf').exists()
+
+    response = client_for(receipts).get(f'/download/{name}')
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['ETag'].strip('"') in name
+
+
+def test_paths_are_confined_to_the_directory(receipts):
+    os.symlink(receipts.parent / 'secret.txt', receipts / 'link.pdf')
+    client = client_for(receipts)
+    for filename in ('../secret.txt', '%2e%2e/secret.txt', 'link.pdf', 'missing.pdf', ''):
+        assert client.get(f'/download/{filename}').status_code == 404
+
+
+def test_offload_to_the_reverse_proxy(receipts):
+    accel = client_for(receipts, 'x-accel').get('/download/receipt_draft.pdf')
+    assert accel.headers['X-Accel-Redirect'] == '/protected/receipts/receipt_draft.pdf'
+    assert accel.data == b''
+
+    sendfile = client_for(receipts, 'x-sendfile').get('/download/receipt_draft.pdf')
+    assert sendfile.headers['X-Sendfile'] == str(receipts / 'receipt_draft.pdf')
+    cached = client_for(receipts, 'x-sendfile').get('/download/receipt_draft.pdf',
+                                                   headers={'If-None-Match': sendfile.headers['ETag']})
+    assert cached.status_code == 304
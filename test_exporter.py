@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+
+import numpy as np
+import pytest
+
+from models.exporter import Exporter
+from models.holding_period import HoldingPeriodAnalyzer
+from models.investment_calculator import InvestmentCalculator
+from models.inverse_solver import InverseSolver
+from models.loan_calculator import LoanCalculator
+
+
+def build_exporter():
+    calculator = InvestmentCalculator()
+    return Exporter(calculator, LoanCalculator(), HoldingPeriodAnalyzer(calculator), InverseSolver(calculator), None)
+
+
+def read_csv(exporter, table, params):
+    columns, chunks = exporter.table(table, params)
+    return list(csv.DictReader(io.StringIO(''.join(exporter.stream_csv(columns, chunks)))))
+
+
+def test_loan_schedule_csv_matches_schedule():
+    rows = read_csv(build_exporter(), 'loan-schedule',
+                    {'loan_amount': 200000, 'interest_rate': 0.04, 'term_years': 20})
+    schedule = LoanCalculator().generate_amortization_schedule(200000, 0.04, 20)
+    assert len(rows) == 240
+    assert float(rows[-1]['total_interest']) == schedule[-1]['total_interest']
+
+
+def test_holding_period_export_is_batched(build_params):
+    exporter = build_exporter()
+    exporter.BATCH_SIZE = 2
+    scenarios = [build_params(personal_deposit=deposit) for deposit in (16000, 20000, 30000)]
+    columns, chunks = exporter.table('holding-period', {'scenarios': scenarios, 'max_exit_years': 5})
+    chunks = list(chunks)
+    assert [len(chunk['scenario']) for chunk in chunks] == [10, 5]
+    expected = exporter.holding_period_analyzer.analyze_batch(scenarios, 5)
+    assert np.allclose(chunks[1]['npv'], expected['npv'][2])
+
+
+def test_solver_grid_has_one_row_per_combination():
+    rows = read_csv(build_exporter(), 'solver-grid', {
+        'solver': 'borrowing-capacity',
+        'monthly_income': [3000, 4000],
+        'interest_rate': [0.03, 0.04, 0.05],
+        'term_years': 25,
+        'grid': True
+    })
+    assert len(rows) == 6
+    assert {(row['monthly_income'], row['interest_rate']) for row in rows} == \
+        {(income, rate) for income in ('3000', '4000') for rate in ('0.03', '0.04', '0.05')}
+
+
+def test_parquet_schema_survives_empty_first_chunk():
+    pq = pytest.importorskip('pyarrow.parquet')
+    exporter = build_exporter()
+    columns = ['scenario', 'city', 'irr']
+    chunks = iter([{'scenario': [0], 'city': [None], 'irr': np.array([np.nan])},
+                   {'scenario': [1], 'city': ['Lyon'], 'irr': np.array([0.05])}])
+    table = pq.read_table(exporter.write_file('parquet', columns, chunks))
+    assert [str(field.type) for field in table.schema] == ['int64', 'string', 'double']
+    assert table.column('irr').to_pylist() == [None, 0.05]
+
+
+def test_xlsx_export_has_header_and_rows():
+    openpyxl = pytest.importorskip('openpyxl')
+    exporter = build_exporter()
+    columns, chunks = exporter.table('loan-schedule', {'loan_amount': 200000, 'interest_rate': 0.04,
+                                                        'term_years': 20})
+    rows = list(openpyxl.load_workbook(exporter.write_file('xlsx', columns, chunks)).active.values)
+    assert rows[0] == tuple(columns)
+    assert len(rows) == 241
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from models.holding_period import HoldingPeriodAnalyzer
+from models.investment_calculator import InvestmentCalculator
+from models.loan_calculator import LoanCalculator
+
+
+def test_irr_solves_known_cash_flows():
+    flows = np.zeros((2, 122))
+    flows[:, 0] = -1000
+    flows[0, 1:121] = 10
+    flows[0, 120] += 1000
+    flows[1, 1:] = 1  # Never negative after the deposit: no root in the bracket
+    flows[1, 0] = 0
+    rates = HoldingPeriodAnalyzer.irr(flows)
+    assert np.isclose(rates[0], 0.01)
+    assert np.isnan(rates[1])
+
+
+def test_irr_keeps_converged_newton_iterate():
+    # A converged Newton iterate used to be replaced by a bisection step
+    flows = np.r_[-15096.456, [619.33] * 179, 140484.196][np.newaxis, :]
+    assert np.isclose(HoldingPeriodAnalyzer.irr(flows)[0], 0.04126, atol=1e-5)
+
+
+def test_remaining_balance_matches_schedule():
+    schedule = LoanCalculator().generate_amortization_schedule(200000, 0.04, 20)
+    payment = LoanCalculator().calculate_monthly_payment(200000, 0.04, 20)
+    balance = HoldingPeriodAnalyzer.remaining_balance(200000, 0.04 / 12, payment, np.array([12, 120]))
+    assert np.allclose(balance, [schedule[11]['remaining_balance'], schedule[119]['remaining_balance']])
+
+
+def test_capital_gains_exempt_after_thirty_years():
+    analyzer = HoldingPeriodAnalyzer(InvestmentCalculator())
+    tax = analyzer.capital_gains_tax(100000, 8000, 300000, np.array([5, 22, 30]))
+    assert tax[0] > tax[1] > tax[2] == 0
+
+
+def test_batch_analysis_over_exit_years(build_params):
+    analyzer = HoldingPeriodAnalyzer(InvestmentCalculator())
+    scenarios = [build_params(personal_deposit=deposit, loan_data={'interest_rate': 0.04, 'term_years': 20})
+                 for deposit in (16000, 40000)]
+    result = analyzer.analyze_batch(scenarios, max_exit_years=25)
+    assert len(result['irr']) == 2
+    assert len(result['irr'][0]) == 25
+    assert result['remaining_balance'][0][-1] == 0
+    # NPV at the IRR is zero
+    flows = analyzer.cash_flows({key: np.array([value]) for key, value in
+                                 analyzer.read_scenario(scenarios[0]).items()}, np.array([10]))['flows']
+    monthly_irr = (1 + result['irr'][0][9]) ** (1 / 12) - 1
+    assert abs(analyzer.npv(monthly_irr, flows)[0, 0]) < 1e-4
+
+
+def test_missing_deposit_covers_what_the_loan_does_not(build_params):
+    analyzer = HoldingPeriodAnalyzer(InvestmentCalculator())
+    params = build_params(loan_data={'loan_amount': 180000, 'interest_rate': 0.04, 'term_years': 20})
+    params.pop('personal_deposit', None)
+    scenario = analyzer.read_scenario(params)
+    assert scenario['personal_deposit'] == params['purchase_price'] * 1.08 - 180000
+    assert analyzer.read_scenario({**params, 'loan_data': {}})['loan_amount'] == params['purchase_price'] * 1.08
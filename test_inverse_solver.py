@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from models.investment_calculator import InvestmentCalculator
+from models.inverse_solver import InverseSolver
+from models.loan_calculator import LoanCalculator
+from models.validation import ValidationError
+
+
+def test_borrowing_capacity_inverts_monthly_payment():
+    solver = InverseSolver(InvestmentCalculator())
+    capacity = solver.borrowing_capacity(np.array([3000, 4000]), 0.04, 20, existing_debts=200)
+    for income, loan_amount in zip((3000, 4000), capacity['loan_amount']):
+        payment = LoanCalculator().calculate_monthly_payment(loan_amount, 0.04, 20)
+        assert np.isclose(payment, income * 0.35 - 200)
+
+
+def test_max_price_for_cashflow_reaches_target():
+    solver = InverseSolver(InvestmentCalculator())
+    targets = np.array([0, -100])
+    prices = solver.max_price_for_cashflow(1100, 290, targets, 0.04, 20, personal_deposit=20000,
+                                           after_tax=True, tax_regime='micro_bic')
+    cashflows = solver.monthly_cashflow(prices, 1100, 290, 0.04, 20, personal_deposit=20000,
+                                        tax_regime='micro_bic')
+    assert np.allclose(cashflows, targets, atol=1e-6)
+
+
+def test_grid_solve_covers_all_combinations():
+    solver = InverseSolver(InvestmentCalculator())
+    result = solver.solve('borrowing-capacity', {
+        'monthly_income': [3000, 4000, 5000],
+        'interest_rate': [0.03, 0.04],
+        'term_years': 25,
+        'grid': True
+    })
+    assert np.shape(result['loan_amount']) == (3, 2)
+
+
+def test_min_deposit_respects_debt_ratio():
+    solver = InverseSolver(InvestmentCalculator())
+    without_income = solver.min_deposit(200000, 1500, 200, 0, 0.04, 20)
+    with_income = solver.min_deposit(200000, 1500, 200, 0, 0.04, 20, monthly_income=2000)
+    assert with_income['personal_deposit'] > without_income['personal_deposit']
+
+
+def test_invalid_solver_inputs_raise_validation_errors():
+    solver = InverseSolver(InvestmentCalculator())
+    with pytest.raises(ValidationError):
+        solver.solve('borrowing-capacity', {'monthly_income': [3000, 4000], 'interest_rate': [0.03, 0.04, 0.05],
+                                            'term_years': 20})
+    with pytest.raises(ValidationError) as error:
+        solver.solve('max-price-yield', {'rental_income': 800, 'target_yield': 0})
+    assert error.value.field == 'target_yield'
+    # The before-tax price does not depend on the regime, which still gets its axis
+    result = solver.solve('max-price-cashflow', {
+        'rental_income': [900, 1000], 'monthly_expenses': 200, 'target_cashflow': 0, 'interest_rate': 0.04,
+        'term_years': 20, 'tax_regime': ['micro_bic', 'reel'], 'grid': True
+    })
+    assert np.shape(result['purchase_price']) == (2, 2)
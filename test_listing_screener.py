@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import io
+
+import numpy as np
+import pytest
+
+from models.investment_calculator import InvestmentCalculator
+from models.listing_screener import ListingScreener
+from models.validation import ValidationError
+
+
+def build_csv(count, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(80000, 400000, count).round()
+    rents = (prices * rng.uniform(0.003, 0.008, count)).round()
+    lines = ['price,rent,charges,city,surface']
+    lines += [f"{price},{rent},{rent * 0.1:.0f},Lyon,{price / 4000:.0f}" for price, rent in zip(prices, rents)]
+    lines.append('not a price,900,50,Paris,30')
+    return '\n'.join(lines)
+
+
+def test_top_k_matches_full_sort_across_chunks():
+    screener = ListingScreener(InvestmentCalculator())
+    csv = build_csv(500)
+    result = screener.screen(io.StringIO(csv), 'cashflow', top_k=10, chunksize=64)
+    full = screener.screen(io.StringIO(csv), 'cashflow', top_k=1000, chunksize=1000)
+    assert result['rows_read'] == 501
+    assert result['rows_rejected'] == 1
+    assert [listing['row'] for listing in result['listings']] == \
+        [listing['row'] for listing in full['listings'][:10]]
+
+
+def test_irr_is_realistic_for_leveraged_listing():
+    screener = ListingScreener(InvestmentCalculator())
+    result = screener.screen(io.StringIO(build_csv(50)), 'irr', top_k=5)
+    assert all(-100 < listing['irr'] < 100 for listing in result['listings'])
+
+
+def test_missing_required_column_is_named():
+    screener = ListingScreener(InvestmentCalculator())
+    with pytest.raises(ValidationError) as error:
+        screener.screen(io.StringIO('price,charges\n150000,50'), 'cashflow')
+    assert error.value.field == 'rent'
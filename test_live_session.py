@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+
+from models.analysis_graph import AnalysisCancelled, AnalysisGraph, AnalysisSessionStore
+from models.charts import ChartBuilder
+from models.investment_calculator import InvestmentCalculator
+from models.live_session import LiveSession, LiveSessionStore
+from models.loan_calculator import LoanCalculator
+
+
+def build_store():
+    calculator = InvestmentCalculator()
+    return LiveSessionStore(AnalysisSessionStore(calculator), ChartBuilder(calculator, LoanCalculator()))
+
+
+def read_event(stream):
+    lines = dict(line.split(': ', 1) for line in next(stream).strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+
+def test_merge_keeps_untouched_nested_fields(build_params):
+    params = build_params()
+    merged = LiveSession.merge(params, {'expenses': {'insurance': 45}, 'tax_bracket': 41})
+    assert merged['expenses']['insurance'] == 45
+    assert merged['expenses']['property_tax'] == params['expenses']['property_tax']
+    assert merged['tax_bracket'] == 41
+
+
+def test_burst_is_coalesced_and_only_changed_sections_pushed(build_params):
+    store = build_store()
+    stream = store.open_stream('client')
+    assert next(stream).startswith('retry:')
+
+    params = build_params(loan_data={'loan_amount': 200000, 'interest_rate': 0.04, 'term_years': 20})
+    store.update('client', params, replace=True)
+    for bracket in (11, 30, 41):
+        store.update('client', {'tax_bracket': bracket})
+    event, data = read_event(stream)
+    assert event == 'update'
+    assert data['version'] == 4
+    assert 'purchase_costs' in data['sections']
+    assert data['sections']['loan']['monthly_payment'] > 0
+    assert sorted(data['sections']['charts']) == ['amortization', 'cashflow', 'equity', 'tax_impact']
+
+    store.update('client', {'rental_income': 1300})
+    event, data = read_event(stream)
+    assert 'tax_impact' in data['sections']
+    assert 'purchase_costs' not in data['sections']
+    assert 'expense_breakdown' not in data['sections']
+    # The loan charts are not sent again
+    assert sorted(data['sections']['charts']) == ['cashflow', 'tax_impact']
+
+
+def test_analysis_stops_when_cancelled(build_params):
+    graph = AnalysisGraph(InvestmentCalculator())
+    with pytest.raises(AnalysisCancelled):
+        graph.analyze(build_params(), cancelled=lambda: True)
+    assert graph.analyze(build_params()) == InvestmentCalculator().analyze_investment(build_params())
+
+
+def test_deltas_need_an_open_stream_which_is_never_evicted(build_params):
+    store = build_store()
+    store.max_sessions = 1
+    store.max_streams = 2
+    assert store.update('elsewhere', build_params(), replace=True) is None
+
+    # Both kept past max_sessions, since their stream is open
+    streams = {session_id: store.open_stream(session_id) for session_id in ('client', 'other')}
+    assert store.update('client', build_params(), replace=True) == 1
+    assert store.open_stream('third') is None
+
+    streams['client'].close()  # Never read, the slot is freed all the same
+    third = store.open_stream('third')
+    assert third is not None
+    assert 'client' not in store._sessions
+    assert store.update('client', {'tax_bracket': 41}) is None
+
+
+def test_concurrent_streams_never_exceed_the_cap():
+    store = build_store()
+    store.max_streams = 2
+    barrier = threading.Barrier(8)
+    streams = []
+
+    def connect(index):
+        barrier.wait()
+        streams.append(store.open_stream(f'client-{index}'))
+
+    threads = [threading.Thread(target=connect, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(stream is not None for stream in streams) == 2
+    assert store.streams == 2
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from models.loan_calculator import LoanCalculator
+from models.money import amortization_cents, format_cents, to_cents
+
+
+def test_to_cents_rounds_half_up():
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(2.675) == 268
+    assert format_cents(93180) == '931.80 €'
+
+
+def test_cents_schedules_reconcile_exactly():
+    principals = np.array([200000, 150000.55, 99999.99])
+    schedules = amortization_cents(principals, [0.04, 0, 0.0385], [20, 10, 25])
+    assert schedules['principal'].sum(axis=1).tolist() == [20000000, 15000055, 9999999]
+    assert np.all(schedules['payment'] == schedules['principal'] + schedules['interest'])
+    assert np.all(schedules['remaining_balance'][:, -1] == 0)
+
+
+def test_loan_metrics_in_cents_mode():
+    metrics = LoanCalculator().calculate_loan_metrics({
+        'loan_amount': 200000,
+        'interest_rate': 0.04,
+        'term_years': 20,
+        'money_mode': 'cents'
+    })
+    schedule = metrics['amortization_schedule']
+    assert metrics['monthly_payment'] == 1211.96
+    assert schedule[-1]['total_principal'] == 200000
+    assert metrics['total_cost'] == round(200000 + metrics['total_interest'], 2)
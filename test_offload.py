@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from models import offload
+from models.holding_period import HoldingPeriodAnalyzer
+from models.investment_calculator import InvestmentCalculator
+from models.inverse_solver import InverseSolver
+from models.offload import Offloader
+
+
+def test_inline_offloader_runs_in_process():
+    params = {'monthly_income': [3000, 4000], 'interest_rate': 0.035, 'term_years': 20}
+    expected = InverseSolver(InvestmentCalculator()).solve('borrowing-capacity', params)
+    assert Offloader(0).run(offload.solve, 'borrowing-capacity', params) == expected
+
+
+def test_inline_calculations_use_the_given_calculators(build_params):
+    calculator = InvestmentCalculator()
+    analyzer = HoldingPeriodAnalyzer(calculator)
+    offload.use_calculators(analyzer, InverseSolver(calculator))
+    try:
+        result = Offloader(0).run(offload.holding_period, build_params(), 10, 0.03)
+        assert offload._calculator('holding_period') is analyzer
+        assert result == analyzer.analyze(build_params(), 10, 0.03)
+    finally:
+        offload._calculators.clear()
+
+
+def test_process_pool_matches_inline_results(build_params):
+    params = {'scenarios': [build_params(), build_params(purchase_price=250000)]}
+    expected = HoldingPeriodAnalyzer(InvestmentCalculator()).analyze_batch(params['scenarios'], 10, 0.03)
+    offloader = Offloader(1)
+    try:
+        offloader.warm_up()
+        assert offloader.run(offload.holding_period, params, 10, 0.03) == expected
+    finally:
+        offloader.shutdown()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from flask import Flask
+
+from models.investment_calculator import InvestmentCalculator
+from models.scenario_store import ScenarioStore, db
+
+
+def make_store():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    context = app.app_context()
+    context.push()
+    db.create_all()
+    return ScenarioStore(InvestmentCalculator()), context
+
+
+def test_saved_scenario_reopens_without_recomputation(build_params):
+    store, context = make_store()
+    try:
+        params = build_params()
+        saved = store.save({'name': 'T2 Lyon', 'city': 'Lyon', 'inputs': params})
+        store.calculator = None  # Reopening must not touch the calculator
+        reopened = store.get(saved['id'])
+        assert reopened['result'] == InvestmentCalculator().analyze_investment(params)
+        assert reopened['inputs'] == params
+        assert reopened['created_at'] == saved['created_at'] and saved['created_at'].endswith('+00:00')
+    finally:
+        context.pop()
+
+
+def test_net_cashflow_takes_off_the_computed_loan_payment(build_params):
+    store, context = make_store()
+    try:
+        params = build_params(loan_data={'loan_amount': 190000, 'interest_rate': 0.04, 'term_years': 25})
+        row = store.build_row({'inputs': params})
+        payment = InvestmentCalculator().analyze_investment(params)['loan']['monthly_payment']
+        assert payment > 0
+        assert row['net_monthly_cashflow'] == row['after_tax_monthly_cashflow'] - payment
+    finally:
+        context.pop()
+
+
+def test_bulk_insert_filter_and_paginate(build_params):
+    store, context = make_store()
+    try:
+        store.bulk_save([{'city': city, 'inputs': build_params(rental_income=rent)}
+                         for city in ('Paris', 'Lyon') for rent in range(800, 1400, 100)])
+        page = store.list_scenarios({'city': 'Lyon', 'min_gross_yield': '6', 'sort': 'gross_yield',
+                                     'per_page': '2'})
+        assert page['total'] == 4
+        assert page['pages'] == 2
+        assert [item['rental_income'] for item in page['items']] == [1300, 1200]
+
+        ids = [item['id'] for item in store.list_scenarios({'per_page': '50'})['items']]
+        compared = store.compare(ids)
+        assert [scenario['id'] for scenario in compared] == ids
+    finally:
+        context.pop()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models.single_flight import SingleFlight
+
+
+def run_concurrently(flights, payload, compute, count=8):
+    with ThreadPoolExecutor(count) as pool:
+        futures = [pool.submit(flights[i % len(flights)].run, 'calc', payload, compute) for i in range(count)]
+        return [future.result() for future in futures]
+
+
+def slow_counter():
+    calls = []
+    lock = threading.Lock()
+
+    def compute():
+        with lock:
+            calls.append(1)
+        time.sleep(0.2)
+        return {'total': 42}
+
+    return calls, compute
+
+
+def test_duplicates_in_one_worker_share_a_computation():
+    flight = SingleFlight()
+    calls, compute = slow_counter()
+    results = run_concurrently([flight], {'b': 2, 'a': 1}, compute)
+    assert results == [{'total': 42}] * 8
+    assert len(calls) == 1
+    metrics = flight.metrics()
+    assert metrics['computed'] == 1 and metrics['shared_local'] == 7
+    assert metrics['saved_seconds'] > 1
+
+
+def test_duplicates_across_workers_share_the_lease(tmp_path):
+    path = str(tmp_path / 'flights.db')
+    workers = [SingleFlight(path), SingleFlight(path)]
+    calls, compute = slow_counter()
+    results = run_concurrently(workers, {'a': 1}, compute)
+    assert results == [{'total': 42}] * 8
+    assert len(calls) == 1
+    assert sum(worker.metrics()['shared_remote'] for worker in workers) >= 1
+
+
+def test_failure_reaches_every_waiter_then_retries(tmp_path):
+    flight = SingleFlight(str(tmp_path / 'flights.db'))
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        run_concurrently([flight], {'a': 1}, failing, count=4)
+    assert flight.metrics()['failed'] == 1
+    assert flight.run('calc', {'a': 1}, lambda: 'ok') == 'ok'
+
+
+def test_expired_lease_is_taken_over_before_any_purge(tmp_path):
+    path = str(tmp_path / 'flights.db')
+    crashed, worker = SingleFlight(path, lease_seconds=0.05), SingleFlight(path, purge_interval=3600)
+    worker._purged_at = time.time()  # The next purge is an hour away
+    key = SingleFlight.key('calc', {'a': 1})
+    assert crashed._acquire(key)[0] == 'lead'  # Its owner never finishes
+    assert worker._acquire(key)[0] == 'wait'
+    time.sleep(0.1)
+    assert worker.run('calc', {'a': 1}, lambda: 'ok') == 'ok'
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from models.tax_engine import TaxEngine
+
+
+def test_yearly_interest_pads_and_truncates():
+    monthly_interest = np.arange(30, dtype=float)
+    assert TaxEngine.yearly_interest(monthly_interest, 3).tolist() == [66.0, 210.0, 159.0]
+    assert TaxEngine.yearly_interest(monthly_interest, 1).tolist() == [66.0]
+
+
+def test_deficit_and_depreciation_carry_forward():
+    # Year 1: 1200 rent - 2000 interest -> 800 deficit, depreciation deferred
+    result = TaxEngine().project(rental_income=100, annual_expenses=0, yearly_interest=[2000, 0, 0],
+                                 depreciation=100, years=3, regime='reel')
+    assert result['taxable_income'].tolist() == [[0.0, 200.0, 1100.0]]
+    assert result['deficit_used'].tolist() == [[0.0, 800.0, 0.0]]
+    assert result['depreciation_used'].tolist() == [[0.0, 200.0, 100.0]]
+    assert result['deficit_carryforward'].tolist() == [[800.0, 0.0, 0.0]]
+    assert result['depreciation_carryforward'].tolist() == [[100.0, 0.0, 0.0]]
+
+
+def test_deficits_expire_after_ten_years():
+    result = TaxEngine().project(rental_income=100, annual_expenses=0, yearly_interest=[21200] + [0] * 11,
+                                 years=12, regime='reel')
+    # 10 years of 1200 absorbed, the remaining 8000 expire
+    assert result['deficit_carryforward'][0, 10] == 0
+    assert result['taxable_income'][0, 11] == 1200
+
+
+def test_unused_depreciation_never_expires():
+    result = TaxEngine().project(rental_income=100, annual_expenses=1200, depreciation=[5000] + [0] * 29,
+                                 years=30, regime='reel', expense_indexation=-1)
+    assert result['depreciation_carryforward'][0, 0] == 5000
+    assert result['taxable_income'][0, :5].tolist() == [0.0, 0.0, 0.0, 0.0, 0.0]
+    assert result['depreciation_carryforward'][0, 4] == 200
+
+
+def test_deferred_depreciation_keeps_its_building_part():
+    # Year 1: furniture only, fully deferred; year 2: building depreciation then the deferred furniture
+    result = TaxEngine().project(rental_income=125, annual_expenses=0, yearly_interest=[1500, 0],
+                                 depreciation=[1000, 1000], building_depreciation=[0, 1000], years=2, regime='reel')
+    assert result['depreciation_used'].tolist() == [[0.0, 1500.0]]
+    assert result['building_depreciation_used'].tolist() == [[0.0, 1000.0]]
+    assert 'building_depreciation_used' not in TaxEngine().project(100, 0, years=2)
+
+
+def test_batch_projection_with_mixed_regimes():
+    result = TaxEngine().project(rental_income=np.array([1000.0, 1000.0]), annual_expenses=2000,
+                                 yearly_interest=0, depreciation=0, years=30,
+                                 regime=np.array(['micro_bic', 'reel']), tax_bracket=30,
+                                 rent_indexation=0.02)
+    assert result['taxable_income'].shape == (2, 30)
+    assert result['taxable_income'][0, 0] == 6000
+    assert result['taxable_income'][1, 0] == 10000
+    assert np.isclose(result['rental_income'][0, 1], 12240)
+
+
+def test_per_scenario_values_are_not_mistaken_for_years():
+    # As many scenarios as years: a 1-D array is per year, (scenarios, 1) is per scenario
+    rents = np.full(3, 1000.0)
+    per_year = TaxEngine().project(rents, 0, yearly_interest=[3000, 2000, 1000], years=3, regime='reel')
+    per_scenario = TaxEngine().project(rents, 0, yearly_interest=np.array([[3000], [2000], [1000]]), years=3,
+                                       regime='reel')
+    assert per_year['interest_deduction'][0].tolist() == [3000, 2000, 1000]
+    assert per_scenario['interest_deduction'][:, 0].tolist() == [3000, 2000, 1000]
+    assert per_scenario['interest_deduction'][0].tolist() == [3000, 3000, 3000]
+    with pytest.raises(ValueError):
+        TaxEngine().project(np.full(2, 1000.0), 0, yearly_interest=[3000, 2000], years=3)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from models.validation import SCENARIO_QUERY, SCHEMAS, SCREEN, SOLVER_SCHEMAS, MAX_SCHEDULE_MONTHS, ValidationError
+
+
+def test_valid_investment_passes_unchanged(build_params):
+    params = build_params()
+    assert SCHEMAS['calculate-investment'](params) is params
+
+
+def test_errors_carry_the_path_of_the_field(build_params):
+    schedule = [{'payment_num': month, 'interest': 100.0} for month in range(1, 13)]
+    schedule[4]['interest'] = float('inf')
+    with pytest.raises(ValidationError) as error:
+        SCHEMAS['calculate-investment'](build_params(loan_data={'amortization_schedule': schedule}))
+    assert error.value.field == 'loan_data.amortization_schedule[4].interest'
+
+    with pytest.raises(ValidationError) as error:
+        SCHEMAS['calculate-investment'](build_params(tax_bracket=300))
+    assert str(error.value) == 'tax_bracket : doit être compris entre 0 et 100'
+
+
+def test_lists_are_capped_before_their_items_are_checked(build_params):
+    schedule = [{'interest': 'x'}] * (MAX_SCHEDULE_MONTHS + 1)
+    with pytest.raises(ValidationError) as error:
+        SCHEMAS['calculate-investment'](build_params(loan_data={'amortization_schedule': schedule}))
+    assert error.value.field == 'loan_data.amortization_schedule'
+    assert 'au plus' in error.value.message
+
+
+def test_solver_grid_size_and_receipt_strings():
+    rates = [index / 1000 for index in range(1000)]
+    with pytest.raises(ValidationError) as error:
+        SCHEMAS['solve']({'monthly_income': list(range(1000)), 'interest_rate': rates, 'grid': True})
+    assert error.value.field == 'grid'
+    SCHEMAS['solve']({'monthly_income': list(range(1000)), 'interest_rate': rates})
+
+    receipt = {'landlord_name': 'A', 'landlord_address': 'B', 'tenant_name': 'C', 'property_address': 'D',
+               'rent_amount': '750.50', 'payment_date': '2024-01-05', 'period': 'Janvier 2024'}
+    SCHEMAS['receipt'](receipt)
+    with pytest.raises(ValidationError) as error:
+        SCHEMAS['receipt']({**receipt, 'charges': [{'description': 'Eau', 'amount': 'douze'}]})
+    assert error.value.field == 'charges[0].amount'
+
+
+def test_bodies_the_calculations_cannot_run_are_refused():
+    for validator, body, field in (
+            (SOLVER_SCHEMAS['borrowing-capacity'], {}, 'monthly_income'),
+            (SOLVER_SCHEMAS['max-price-yield'], {'rental_income': 800}, 'target_yield'),
+            (SOLVER_SCHEMAS['min-deposit'], {'purchase_price': 150000, 'rental_income': 800, 'monthly_expenses': 100,
+                                             'target_cashflow': 0, 'interest_rate': 0.035}, 'term_years'),
+            (SOLVER_SCHEMAS['borrowing-capacity'], {'monthly_income': 4000, 'interest_rate': 0.035,
+                                                    'term_years': 0}, 'term_years'),
+            (SOLVER_SCHEMAS['borrowing-capacity'], {'monthly_income': [4000, -1], 'interest_rate': 0.035,
+                                                    'term_years': 20}, 'monthly_income[1]'),
+            (SOLVER_SCHEMAS['borrowing-capacity'], {'monthly_income': 4000, 'interest_rate': -1e9,
+                                                    'term_years': 20, 'debt_ratio': -0.35}, 'interest_rate'),
+            (SCHEMAS['calculate-loan'], {'loan_amount': 0, 'interest_rate': 0.035, 'term_years': 20}, 'loan_amount')):
+        with pytest.raises(ValidationError) as error:
+            validator(body)
+        assert error.value.field == field
+    SOLVER_SCHEMAS['max-price-yield']({'rental_income': 800, 'target_yield': 5})
+
+
+def test_scenario_query_args_are_numeric_strings():
+    SCENARIO_QUERY({'page': '2', 'per_page': '20', 'min_gross_yield': '5.5', 'city': 'Lyon'})
+    for args, field in (({'page': 'abc'}, 'page'), ({'min_gross_yield': 'abc'}, 'min_gross_yield'),
+                        ({'page': '0'}, 'page'), ({'sort': 'name'}, 'sort')):
+        with pytest.raises(ValidationError) as error:
+            SCENARIO_QUERY(args)
+        assert error.value.field == field
+
+
+def test_screening_form_fields_are_checked():
+    SCREEN({'metric': 'irr', 'top_k': '50', 'interest_rate': '0.035', 'tax_regime': 'reel', 'term_years': '25'})
+    for form, field in (({'tax_regime': 'foo'}, 'tax_regime'), ({'interest_rate': '-5'}, 'interest_rate'),
+                        ({'top_k': '5000'}, 'top_k'), ({'metric': 'price'}, 'metric')):
+        with pytest.raises(ValidationError) as error:
+            SCREEN(form)
+        assert error.value.field == field
+
+
+def test_holding_period_batches_are_bounded_by_exit_years(build_params):
+    scenarios = [build_params()] * 200
+    SCHEMAS['holding-period']({'scenarios': scenarios, 'max_exit_years': 20})
+    with pytest.raises(ValidationError) as error:
+        SCHEMAS['holding-period']({'scenarios': scenarios, 'max_exit_years': 50})
+    assert error.value.field == 'scenarios'